@@ -0,0 +1,11 @@
+import subprocess
+
+
+def git_commit() -> str | None:
+    """Short hash of the checked out commit, recorded in the benchmark reports."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,210 @@
+"""
+In-process stand-ins for the services the app talks to, used by the load benchmark (benchmarks/load.py).
+
+Postgres is replaced by SQLite (aiosqlite), Kafka by `InMemoryKafka`, Stripe by `FakeStripeBackend`
+(visit_manager.stripe_utils.fake) and Google by `google_oauth_stub`.
+"""
+
+import asyncio
+import threading
+import uuid
+from typing import Any, Awaitable, Callable
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from starlette.requests import Request
+
+GOOGLE_ISSUER = "https://accounts.google.com"
+
+
+def create_sqlite_engine(path: str) -> AsyncEngine:
+    """
+    SQLite database file standing in for Postgres.
+
+    Transactions start with BEGIN IMMEDIATE, so concurrent writers queue on the database lock (up to the
+    busy timeout) instead of failing when a read transaction tries to upgrade to a write one.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 30})
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def connect(dbapi_connection: Any, connection_record: Any) -> None:
+        # server_default=func.gen_random_uuid() is Postgres-only
+        dbapi_connection.create_function("gen_random_uuid", 0, lambda: uuid.uuid4().hex)
+        # let SQLAlchemy emit BEGIN itself
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def begin(conn: Any) -> None:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return engine
+
+
+class FakeKafkaMessage:
+    """The parts of confluent_kafka.Message the consumer reads."""
+
+    def __init__(self, topic: str, offset: int, value: bytes, key: str | None, headers: dict[str, Any] | None):
+        self._topic = topic
+        self._offset = offset
+        self._value = value
+        self._key = key.encode("utf-8") if key is not None else None
+        self._headers = [
+            (name, value.encode("utf-8") if isinstance(value, str) else value)
+            for name, value in (headers or {}).items()
+        ]
+
+    def error(self) -> None:
+        return None
+
+    def value(self) -> bytes:
+        return self._value
+
+    def key(self) -> bytes | None:
+        return self._key
+
+    def headers(self) -> list[tuple[str, bytes | None]]:
+        return self._headers
+
+    def topic(self) -> str:
+        return self._topic
+
+    def partition(self) -> int:
+        return 0
+
+    def offset(self) -> int:
+        return self._offset
+
+
+class InMemoryKafka:
+    """
+    Single-partition topics kept in memory.
+
+    `producer()` has the interface of AsyncKafkaProducer and acknowledges each message `latency_s` after it was
+    produced; `consumer()` has the interface of confluent_kafka.Consumer the KafkaConsumerWorker uses.
+    """
+
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.topics: dict[str, list[FakeKafkaMessage]] = {}
+        self._appended = threading.Condition()
+
+    def _append(self, topic: str, value: bytes, key: str | None, headers: dict[str, Any] | None) -> FakeKafkaMessage:
+        with self._appended:
+            messages = self.topics.setdefault(topic, [])
+            message = FakeKafkaMessage(topic, len(messages), value, key, headers)
+            messages.append(message)
+            self._appended.notify_all()
+        return message
+
+    def producer(self) -> "FakeKafkaProducer":
+        return FakeKafkaProducer(self)
+
+    def consumer(self) -> "FakeKafkaConsumer":
+        return FakeKafkaConsumer(self)
+
+
+class FakeKafkaProducer:
+    def __init__(self, broker: InMemoryKafka):
+        self._broker = broker
+        self._pending = 0
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def produce(
+        self,
+        topic: str,
+        value: bytes,
+        key: str | None = None,
+        headers: dict[str, Any] | None = None,
+        trace_context: Any = None,
+    ) -> "asyncio.Future[Any]":
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Any] = loop.create_future()
+        self._pending += 1
+
+        def deliver() -> None:
+            self._pending -= 1
+            message = self._broker._append(topic, value, key, headers)
+            if not future.done():
+                future.set_result(message)
+
+        loop.call_later(self._broker.latency_s, deliver)
+        return future
+
+    def flush(self, timeout: float) -> int:
+        return self._pending
+
+    def close(self, timeout: float) -> int:
+        return self._pending
+
+
+class FakeKafkaConsumer:
+    """Reads every subscribed topic from its start, commits are no-ops."""
+
+    def __init__(self, broker: InMemoryKafka):
+        self._broker = broker
+        self._topics: list[str] = []
+        self._positions: dict[str, int] = {}
+
+    def subscribe(self, topics: list[str]) -> None:
+        self._topics = topics
+        self._positions = {topic: 0 for topic in topics}
+
+    def _fetch(self, num_messages: int) -> list[FakeKafkaMessage]:
+        messages: list[FakeKafkaMessage] = []
+        for topic in self._topics:
+            available = self._broker.topics.get(topic, [])
+            start = self._positions[topic]
+            batch = available[start : start + num_messages - len(messages)]
+            self._positions[topic] = start + len(batch)
+            messages.extend(batch)
+        return messages
+
+    def consume(self, num_messages: int, timeout: float) -> list[FakeKafkaMessage]:
+        with self._broker._appended:
+            messages = self._fetch(num_messages)
+            if not messages:
+                self._broker._appended.wait(timeout)
+                messages = self._fetch(num_messages)
+        return messages
+
+    def commit(self, asynchronous: bool) -> None:
+        pass
+
+    def seek(self, partition: Any) -> None:
+        self._positions[partition.topic] = partition.offset
+
+    def get_watermark_offsets(self, partition: Any, cached: bool) -> tuple[int, int]:
+        return 0, len(self._broker.topics.get(partition.topic, []))
+
+    def close(self) -> None:
+        pass
+
+
+def google_oauth_stub(email_domain: str) -> Callable[[Request], Awaitable[dict[str, Any]]]:
+    """
+    Replacement of the Google OAuth client's `authorize_access_token`: the authorization code in the `/auth`
+    callback is taken as the Google user id, and the user's email is derived from it.
+    """
+
+    async def authorize_access_token(request: Request) -> dict[str, Any]:
+        code = request.query_params["code"]
+        return {
+            "access_token": f"google-token-{code}",
+            "expires_in": 3600,
+            "userinfo": {"sub": code, "iss": GOOGLE_ISSUER, "email": f"{code}@{email_domain}"},
+        }
+
+    return authorize_access_token
+
+
+def google_userinfo_transport() -> httpx.MockTransport:
+    """Transport of the app's HTTP client answering Google's userinfo endpoint."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        token = request.headers["Authorization"].removeprefix("Bearer google-token-")
+        return httpx.Response(200, json={"id": token, "name": f"Load Test {token}"})
+
+    return httpx.MockTransport(handler)
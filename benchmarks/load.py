@@ -0,0 +1,365 @@
+"""
+Load benchmark of the whole app (visit_manager.app.main:app), in-process over ASGI.
+
+Every scenario (login, vendor and client registration, booking, visit listing, charge, refund) is run with
+each concurrency level in turn, by fresh users. Postgres, Kafka, Stripe and Google are replaced by the
+stand-ins of benchmarks/fakes.py, or pass `--database-url` to run against a real database (the schema is
+created in it). The report is JSON, with per scenario and concurrency level the p50/p95/p99 latency,
+the throughput and the SQL statements per request:
+
+    python -m benchmarks.load --concurrency 1 8 32 --requests 200 --output after.json
+    python -m benchmarks.load --compare before.json after.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import httpx
+import orjson
+
+# read when the app is imported, the stand-ins never talk to Google
+for _name in ("GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET", "JWT_SECRET_KEY", "FASTAPI_SECRET_KEY"):
+    os.environ.setdefault(_name, f"load-test-{_name.lower()}")
+# a log line per request would dominate the measurements
+os.environ.setdefault("VISIT_MANAGER_LOG_LEVEL", "WARNING")
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine  # noqa: E402
+
+from benchmarks import git_commit  # noqa: E402
+from benchmarks.fakes import (  # noqa: E402
+    InMemoryKafka,
+    create_sqlite_engine,
+    google_oauth_stub,
+    google_userinfo_transport,
+)
+from visit_manager.app.main import app  # noqa: E402
+from visit_manager.app.security.common import get_oauth  # noqa: E402
+from visit_manager.kafka_utils.consumer import create_kafka_consumer  # noqa: E402
+from visit_manager.kafka_utils.outbox import run_outbox_relay  # noqa: E402
+from visit_manager.package_utils.http_client import create_http_client  # noqa: E402
+from visit_manager.package_utils.settings import KafkaSettings, StripeSettings  # noqa: E402
+from visit_manager.postgres_utils.models import Base  # noqa: E402
+from visit_manager.postgres_utils.models.service_types import preload_service_types  # noqa: E402
+from visit_manager.postgres_utils.utils import create_service_types, get_session_factory, use_engine  # noqa: E402
+from visit_manager.stripe_utils.gateway import create_payment_gateway  # noqa: E402
+from visit_manager.stripe_utils.webhooks import create_payment_event_batcher  # noqa: E402
+
+EMAIL_DOMAIN = "loadtest.example.com"
+ADDRESS = {
+    "latitude": 52.2297,
+    "longitude": 21.0122,
+    "street": "Nowowiejska 15/19",
+    "city": "Warszawa",
+    "state_or_region": "mazowieckie",
+    "country": "PL",
+    "zip_code": "00-665",
+}
+FIRST_VISIT = datetime(2030, 1, 7, 8, 0)
+
+# SQL statements executed for the request in progress, None outside of measured requests
+_statements: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar("statements", default=None)
+
+
+def _count_statement(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    counter = _statements.get()
+    # the SQLite stand-in issues BEGIN itself, Postgres drivers do not count it either
+    if counter is not None and not statement.startswith("BEGIN"):
+        counter[0] += 1
+
+
+@dataclass
+class ScenarioResult:
+    scenario: str
+    concurrency: int
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    throughput_rps: float
+    queries_per_request: float
+
+
+@dataclass
+class Scenario:
+    name: str
+    expected_status: int
+    # sends the i-th request of the scenario
+    send: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+class VirtualUsers:
+    """Users of one concurrency level: `count` vendors and `count` clients, with their session cookies."""
+
+    def __init__(self, prefix: str, count: int):
+        self.vendors = [f"{prefix}-vendor-{i}" for i in range(count)]
+        self.clients = [f"{prefix}-client-{i}" for i in range(count)]
+        self.cookies: dict[str, str] = {}
+        self.charges: list[str] = [""] * count
+
+    def headers(self, user: str) -> dict[str, str]:
+        return {"Cookie": f"access_token={self.cookies[user]}"}
+
+
+def scenarios(users: VirtualUsers) -> list[Scenario]:
+    everyone = users.vendors + users.clients
+
+    async def login(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        response = await client.get("/auth", params={"code": everyone[i]})
+        if "access_token" in response.cookies:
+            users.cookies[everyone[i]] = response.cookies["access_token"]
+        return response
+
+    async def register_vendor(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        vendor = users.vendors[i]
+        return await client.post(
+            "/user/register_as_vendor",
+            json={
+                "vendor_name": f"Pipes {vendor}",
+                "address": ADDRESS,
+                "phone_number": "+48123456789",
+                "service_types": ["plumber"],
+            },
+            headers=users.headers(vendor),
+        )
+
+    async def register_client(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post(
+            "/user/register_as_client",
+            json={"phone_number": "+48111222333", "address": ADDRESS},
+            headers=users.headers(users.clients[i]),
+        )
+
+    async def book_visit(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        start = FIRST_VISIT + timedelta(hours=i)
+        return await client.post(
+            "/user/book_visit",
+            json={
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=30)).isoformat(),
+                "vendor_email": f"{users.vendors[i]}@{EMAIL_DOMAIN}",
+            },
+            headers=users.headers(users.clients[i]),
+        )
+
+    async def list_visits(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.get("/user/my_visits", headers=users.headers(users.clients[i]))
+
+    async def charge(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        user = users.clients[i]
+        response = await client.post(
+            "/payment/charge",
+            json={"amount": 1000},
+            headers=users.headers(user) | {"Idempotency-Key": f"{user}-deposit"},
+        )
+        if response.status_code == 201:
+            users.charges[i] = response.json()["charge_id"]
+        return response
+
+    async def refund(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post(f"/payment/refund/{users.charges[i]}", headers=users.headers(users.clients[i]))
+
+    return [
+        Scenario("login", 307, login),
+        Scenario("register_vendor", 200, register_vendor),
+        Scenario("register_client", 200, register_client),
+        Scenario("book_visit", 200, book_visit),
+        Scenario("list_visits", 200, list_visits),
+        Scenario("charge", 201, charge),
+        Scenario("refund", 200, refund),
+    ]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int
+) -> ScenarioResult:
+    latencies: list[float] = []
+    statements: list[int] = []
+    errors = 0
+    next_request = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in next_request:
+            counter = [0]
+            token = _statements.set(counter)
+            start = time.perf_counter()
+            try:
+                response = await scenario.send(client, i)
+            finally:
+                _statements.reset(token)
+            latencies.append(time.perf_counter() - start)
+            statements.append(counter[0])
+            if response.status_code != scenario.expected_status:
+                errors += 1
+                if errors == 1:
+                    print(f"{scenario.name}: {response.status_code} {response.text[:200]}", file=sys.stderr)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return ScenarioResult(
+        scenario=scenario.name,
+        concurrency=concurrency,
+        requests=requests,
+        errors=errors,
+        p50_ms=round(percentiles[49] * 1000, 3),
+        p95_ms=round(percentiles[94] * 1000, 3),
+        p99_ms=round(percentiles[98] * 1000, 3),
+        throughput_rps=round(requests / elapsed, 1),
+        queries_per_request=round(statistics.fmean(statements), 2),
+    )
+
+
+async def create_schema(engine: AsyncEngine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await create_service_types(conn)
+
+
+@contextlib.asynccontextmanager
+async def stand_ins(engine: AsyncEngine, kafka_latency_s: float, stripe_latency_s: float) -> AsyncIterator[None]:
+    """What the app's lifespan sets up, with the fakes in place of Kafka, Stripe and Google."""
+    use_engine(engine)
+    await create_schema(engine)
+    await preload_service_types()
+    get_oauth().auth_demo.authorize_access_token = google_oauth_stub(EMAIL_DOMAIN)
+
+    kafka = InMemoryKafka(latency_s=kafka_latency_s)
+    kafka_settings = KafkaSettings(TOPIC="visits", BOOTSTRAP_URL="in-memory")
+    app.state.http_client = create_http_client(transport=google_userinfo_transport())
+    gateway = create_payment_gateway(StripeSettings(BACKEND="fake", FAKE_LATENCY_S=stripe_latency_s))
+    assert gateway is not None
+    app.state.payment_gateway = gateway
+    app.state.payment_event_batcher = create_payment_event_batcher()
+    app.state.payment_event_batcher.start()
+    consumer = create_kafka_consumer(kafka_settings, consumer=kafka.consumer())
+    consumer.start()
+    stop_outbox_relay = asyncio.Event()
+    outbox_relay = asyncio.create_task(
+        run_outbox_relay(stop_outbox_relay, kafka_settings, get_session_factory(), kafka.producer())  # type: ignore[arg-type]
+    )
+    try:
+        yield
+    finally:
+        await app.state.payment_event_batcher.stop()
+        await consumer.stop()
+        stop_outbox_relay.set()
+        await outbox_relay
+        await app.state.http_client.aclose()
+        await gateway.close()
+
+
+async def run_benchmark(
+    database_url: str | None,
+    concurrency_levels: list[int],
+    requests: int,
+    kafka_latency_s: float,
+    stripe_latency_s: float,
+) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(database_url) if database_url else create_sqlite_engine(f"{tmp}/load.db")
+        event.listen(engine.sync_engine, "before_cursor_execute", _count_statement)
+        results: list[ScenarioResult] = []
+        async with stand_ins(engine, kafka_latency_s, stripe_latency_s):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                # a unique prefix, so runs against the same database never collide
+                run_id = format(time.time_ns(), "x")
+                for concurrency in concurrency_levels:
+                    users = VirtualUsers(f"{run_id}-c{concurrency}", requests)
+                    for scenario in scenarios(users):
+                        count = 2 * requests if scenario.name == "login" else requests
+                        result = await run_scenario(client, scenario, count, concurrency)
+                        print(_format_result(result), file=sys.stderr)
+                        results.append(result)
+        await engine.dispose()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "database": engine.dialect.name,
+            "requests": requests,
+            "concurrency": concurrency_levels,
+            "kafka_latency_s": kafka_latency_s,
+            "stripe_latency_s": stripe_latency_s,
+            "python": platform.python_version(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": [asdict(result) for result in results],
+    }
+
+
+def _format_result(result: ScenarioResult) -> str:
+    return (
+        f"{result.scenario:16} c={result.concurrency:<4} p50 {result.p50_ms:8.2f} ms  p95 {result.p95_ms:8.2f} ms  "
+        f"p99 {result.p99_ms:8.2f} ms  {result.throughput_rps:8.1f} req/s  "
+        f"{result.queries_per_request:5.1f} queries/req  {result.errors} errors"
+    )
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print the change of every metric between two reports, for the scenarios both of them ran."""
+    with open(before_path, "rb") as before_file, open(after_path, "rb") as after_file:
+        before, after = orjson.loads(before_file.read()), orjson.loads(after_file.read())
+    print(f"{before['meta']['commit']} -> {after['meta']['commit']}")
+    baseline = {(r["scenario"], r["concurrency"]): r for r in before["results"]}
+    for result in after["results"]:
+        old = baseline.get((result["scenario"], result["concurrency"]))
+        if old is None:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "queries_per_request"):
+            change = (result[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            changes.append(f"{metric} {old[metric]:g} -> {result[metric]:g} ({change:+.1f}%)")
+        print(f"{result['scenario']:16} c={result['concurrency']:<4} " + "  ".join(changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario and concurrency level")
+    parser.add_argument("--database-url", help="SQLAlchemy async URL, a temporary SQLite database by default")
+    parser.add_argument("--kafka-latency-ms", type=float, default=5.0)
+    parser.add_argument("--stripe-latency-ms", type=float, default=50.0)
+    parser.add_argument("--output", help="file to write the JSON report to, stdout by default")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    report = asyncio.run(
+        run_benchmark(
+            args.database_url,
+            args.concurrency,
+            args.requests,
+            kafka_latency_s=args.kafka_latency_ms / 1000,
+            stripe_latency_s=args.stripe_latency_ms / 1000,
+        )
+    )
+    output = orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    if args.output:
+        with open(args.output, "wb") as file:
+            file.write(output + b"\n")
+    else:
+        sys.stdout.buffer.write(output + b"\n")
+
+
+if __name__ == "__main__":
+    main()
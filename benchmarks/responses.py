@@ -0,0 +1,97 @@
+"""
+Benchmark of a 1,000-visit response through the whole FastAPI stack, in-process over ASGI.
+
+    python -m benchmarks.responses
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+
+from visit_manager.app.models.user_models import ServiceTypeEnum, VisitData, VisitPage
+from visit_manager.app.responses import ModelResponse
+from visit_manager.postgres_utils.models.misc import VisitStatus
+
+VISITS = 1000
+REQUESTS = 50
+REPEAT = 5
+
+
+def make_page() -> VisitPage:
+    vendor_id, client_id = str(uuid.uuid4()), str(uuid.uuid4())
+    start = datetime(2025, 6, 1, 8, 0)
+    return VisitPage(
+        items=[
+            VisitData(
+                visit_id=str(uuid.uuid4()),
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i, minutes=30),
+                vendor_id=vendor_id,
+                client_id=client_id,
+                vendor_name="Pipes Inc.",
+                service_type=ServiceTypeEnum.PLUMBER,
+                status=VisitStatus.confirmed,
+            )
+            for i in range(VISITS)
+        ]
+    )
+
+
+def make_app(page: VisitPage) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/untyped")
+    async def untyped():  # type: ignore[no-untyped-def]
+        # no response model: the list goes through jsonable_encoder
+        return page.items
+
+    @app.get("/response_model")
+    async def response_model() -> VisitPage:
+        return page
+
+    @app.get("/response_model_orjson", response_class=ORJSONResponse)
+    async def response_model_orjson() -> VisitPage:
+        return page
+
+    @app.get("/model_response", response_model=VisitPage)
+    async def model_response() -> ModelResponse:
+        return ModelResponse(page)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str) -> float:
+    """Best mean time of one request over REPEAT rounds of REQUESTS requests."""
+    await client.get(path)
+    best = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            response = await client.get(path)
+        best = min(best, (time.perf_counter() - start) / REQUESTS)
+        assert response.status_code == 200
+    return best
+
+
+async def run() -> None:
+    page = make_page()
+    cases = {
+        "before: list, jsonable_encoder": "/untyped",
+        "response model + JSONResponse": "/response_model",
+        "response model + ORJSONResponse": "/response_model_orjson",
+        "after: ModelResponse": "/model_response",
+    }
+    transport = httpx.ASGITransport(app=make_app(page))
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for name, path in cases.items():
+            best = await measure(client, path)
+            print(f"{name:34} {best * 1000:8.2f} ms / response of {VISITS} visits")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark of the model serializers against the reflection based `to_dict` they replaced.
+
+    python -m benchmarks.serializers
+"""
+
+import json
+import timeit
+import uuid
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy_utils import PhoneNumber
+
+from visit_manager.postgres_utils.models.common import Base
+from visit_manager.postgres_utils.models.models import Address, ServiceType, User, Vendor
+from visit_manager.postgres_utils.serializers import VENDOR_SERIALIZER
+
+VENDORS = 1000
+REPEAT = 5
+
+
+def legacy_to_dict(instance: Base) -> dict[str, Any]:
+    """The former `Base.to_dict`."""
+    result = {}
+    for column in instance.__table__.columns:
+        value = getattr(instance, column.name)
+        if isinstance(value, uuid.UUID):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, PhoneNumber):
+            value = str(value)
+        result[column.name] = value
+    return result
+
+
+def legacy_vendor_to_dict(vendor: Vendor) -> dict[str, Any]:
+    """The former `Vendor.to_dict`."""
+    result = legacy_to_dict(vendor)
+    result["user"] = {
+        "email": vendor.user.email,
+        "first_name": vendor.user.first_name,
+        "last_name": vendor.user.last_name,
+    }
+    address = legacy_to_dict(vendor.address)  # type: ignore[arg-type]
+    address.pop("address_id", None)
+    result["address"] = address
+    result["service_types"] = [{"name": st.name, "description": st.description} for st in vendor.offered_service_types]
+    result.pop("registration_fee_payment_id", None)
+    return result
+
+
+def make_vendors() -> list[Vendor]:
+    service_types = [
+        ServiceType(service_type_id=uuid.uuid4(), name=name, description=f"{name} for fixing problems")
+        for name in ("plumber", "electrician")
+    ]
+    vendors = []
+    for i in range(VENDORS):
+        user = User(user_id=uuid.uuid4(), email=f"vendor{i}@example.com", first_name="Vendor", last_name=str(i))
+        address = Address(
+            address_id=uuid.uuid4(),
+            latitude=52.2297,
+            longitude=21.0122,
+            street="Nowowiejska 15/19",
+            city="Warszawa",
+            state_or_region="mazowieckie",
+            country="PL",
+            zip_code="00-665",
+        )
+        vendors.append(
+            Vendor(
+                vendor_id=user.user_id,
+                user=user,
+                vendor_name=f"Vendor {i}",
+                required_deposit_gr=5000,
+                address_id=address.address_id,
+                address=address,
+                phone_number=PhoneNumber("+48123456789"),
+                is_active=True,
+                offered_service_types=service_types,
+            )
+        )
+    return vendors
+
+
+def main() -> None:
+    vendors = make_vendors()
+    assert json.loads(json.dumps(legacy_vendor_to_dict(vendors[0]))) == json.loads(VENDOR_SERIALIZER.dumps(vendors[0]))
+
+    cases = {
+        "legacy to_dict + json.dumps": lambda: [json.dumps(legacy_vendor_to_dict(v)).encode() for v in vendors],
+        "serializer.dumps (per vendor)": lambda: [VENDOR_SERIALIZER.dumps(v) for v in vendors],
+        "serializer.dumps_many": lambda: VENDOR_SERIALIZER.dumps_many(vendors),
+    }
+    for name, case in cases.items():
+        best = min(timeit.repeat(case, number=1, repeat=REPEAT))
+        print(f"{name:32} {best * 1000:8.2f} ms / {VENDORS} vendors  ({best / VENDORS * 1e6:6.2f} us per vendor)")
+
+
+if __name__ == "__main__":
+    main()
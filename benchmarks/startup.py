@@ -0,0 +1,155 @@
+"""
+Cold start benchmark of the app (visit_manager.app.main:app), the time a new pod's worker takes to be ready.
+
+Each run is a fresh interpreter importing the app, then running its lifespan up to the point requests are
+served; the report has the median and worst run of both, and the packages taking the most import time
+(`python -X importtime`, self time summed per top-level package). Kafka and Postgres are pointed at closed
+ports, the lifespan must not wait for them:
+
+    python -m benchmarks.startup --runs 10 --output after.json
+    python -m benchmarks.startup --compare before.json after.json
+"""
+
+import argparse
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any
+
+import orjson
+
+from benchmarks import git_commit
+
+# imports the app and runs its lifespan, printing both durations as JSON
+CHILD = """
+import asyncio, json, time
+start = time.perf_counter()
+from visit_manager.app.main import app
+imported = time.perf_counter()
+
+async def start_app():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(start_app())
+print(json.dumps({"import_s": imported - start, "lifespan_s": ready - imported}))
+"""
+
+CHILD_ENV = {
+    "GOOGLE_CLIENT_ID": "startup-benchmark",
+    "GOOGLE_CLIENT_SECRET": "startup-benchmark",
+    "JWT_SECRET_KEY": "startup-benchmark",
+    "FASTAPI_SECRET_KEY": "startup-benchmark",
+    "KAFKA_TOPIC": "visits",
+    "KAFKA_BOOTSTRAP_URL": "127.0.0.1:9",
+    "POSTGRES_USER": "startup-benchmark",
+    "POSTGRES_PASSWORD": "startup-benchmark",
+    "POSTGRES_HOST": "127.0.0.1",
+    "POSTGRES_PORT": "9",
+    "VISIT_MANAGER_LOG_LEVEL": "WARNING",
+}
+
+
+def _child_env() -> dict[str, str]:
+    return CHILD_ENV | os.environ
+
+
+def run_once() -> dict[str, float]:
+    process = subprocess.run(
+        [sys.executable, "-c", CHILD], capture_output=True, text=True, env=_child_env(), timeout=120, check=False
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"App failed to start:\n{process.stderr}")
+    timings: dict[str, float] = orjson.loads(process.stdout.splitlines()[-1])
+    return timings
+
+
+def import_time_by_package(top: int) -> list[tuple[str, float]]:
+    """Packages taking the most time to import with the app, in ms of self time."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import visit_manager.app.main"],
+        capture_output=True,
+        text=True,
+        env=_child_env(),
+        check=True,
+    )
+    packages: Counter[str] = Counter()
+    # "import time: self [us] | cumulative | imported package"
+    for line in process.stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            packages[fields[2].strip().split(".")[0]] += int(fields[0])
+    return [(package, round(us / 1000, 1)) for package, us in packages.most_common(top)]
+
+
+def _summary(values: list[float]) -> dict[str, float]:
+    return {"median_ms": round(statistics.median(values) * 1000, 1), "max_ms": round(max(values) * 1000, 1)}
+
+
+def run_benchmark(runs: int, top: int) -> dict[str, Any]:
+    timings = []
+    for run in range(runs):
+        timings.append(run_once())
+        print(
+            f"run {run + 1}: import {timings[-1]['import_s'] * 1000:.0f} ms, "
+            f"lifespan {timings[-1]['lifespan_s'] * 1000:.0f} ms",
+            file=sys.stderr,
+        )
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "runs": runs,
+            "python": platform.python_version(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": {
+            "import": _summary([t["import_s"] for t in timings]),
+            "lifespan": _summary([t["lifespan_s"] for t in timings]),
+            "ready": _summary([t["import_s"] + t["lifespan_s"] for t in timings]),
+        },
+        "import_ms_by_package": dict(import_time_by_package(top)),
+    }
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print the change of the startup times between two reports."""
+    with open(before_path, "rb") as before_file, open(after_path, "rb") as after_file:
+        before, after = orjson.loads(before_file.read()), orjson.loads(after_file.read())
+    print(f"{before['meta']['commit']} -> {after['meta']['commit']}")
+    for phase, result in after["results"].items():
+        old = before["results"].get(phase)
+        if old is None:
+            continue
+        changes = []
+        for metric in ("median_ms", "max_ms"):
+            change = (result[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            changes.append(f"{metric} {old[metric]:g} -> {result[metric]:g} ({change:+.1f}%)")
+        print(f"{phase:10} " + "  ".join(changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="fresh processes started")
+    parser.add_argument("--top", type=int, default=15, help="packages listed by import time")
+    parser.add_argument("--output", help="file to write the JSON report to, stdout by default")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two reports and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    output = orjson.dumps(run_benchmark(args.runs, args.top), option=orjson.OPT_INDENT_2)
+    if args.output:
+        with open(args.output, "wb") as file:
+            file.write(output + b"\n")
+    else:
+        sys.stdout.buffer.write(output + b"\n")
+
+
+if __name__ == "__main__":
+    main()
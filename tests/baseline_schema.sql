@@ -0,0 +1,171 @@
+-- Schema created by create_tables at the baseline commit, before the migrations (SQLite dialect).
+-- Deployed databases created this way are stamped with revision 0001, see test_migrations.py.
+
+CREATE TABLE user (
+	user_id CHAR(32) DEFAULT (gen_random_uuid()) NOT NULL,
+	first_name VARCHAR NOT NULL,
+	last_name VARCHAR NOT NULL,
+	email VARCHAR(255) NOT NULL,
+	registration_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	last_login DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (user_id)
+);
+
+CREATE UNIQUE INDEX ix_user_email ON user (email);
+
+CREATE TABLE address (
+	address_id CHAR(32) DEFAULT (gen_random_uuid()) NOT NULL,
+	latitude FLOAT NOT NULL,
+	longitude FLOAT NOT NULL,
+	street VARCHAR NOT NULL,
+	city VARCHAR NOT NULL,
+	state_or_region VARCHAR NOT NULL,
+	country VARCHAR NOT NULL,
+	zip_code VARCHAR NOT NULL,
+	PRIMARY KEY (address_id)
+);
+
+CREATE TABLE payment (
+	payment_id CHAR(32) DEFAULT (gen_random_uuid()) NOT NULL,
+	stripe_charge_id VARCHAR NOT NULL,
+	amount INTEGER NOT NULL CHECK (amount > 0),
+	currency VARCHAR NOT NULL,
+	transaction_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	status VARCHAR(9) NOT NULL,
+	PRIMARY KEY (payment_id)
+);
+
+CREATE UNIQUE INDEX ix_payment_stripe_charge_id ON payment (stripe_charge_id);
+
+CREATE TABLE service_type (
+	service_type_id CHAR(32) DEFAULT (gen_random_uuid()) NOT NULL,
+	name VARCHAR NOT NULL,
+	description VARCHAR NOT NULL,
+	PRIMARY KEY (service_type_id),
+	UNIQUE (name)
+);
+
+CREATE TABLE attachment (
+	attachment_id CHAR(32) DEFAULT (gen_random_uuid()) NOT NULL,
+	object_uri VARCHAR NOT NULL,
+	creation_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	modification_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+	PRIMARY KEY (attachment_id)
+);
+
+CREATE TABLE admin (
+	admin_id CHAR(32) NOT NULL,
+	PRIMARY KEY (admin_id),
+	FOREIGN KEY(admin_id) REFERENCES user (user_id)
+);
+
+CREATE TABLE client (
+	client_id CHAR(32) NOT NULL,
+	registration_fee_payment_id CHAR(32),
+	phone_number VARCHAR(20) NOT NULL,
+	is_active BOOLEAN DEFAULT 'true' NOT NULL,
+	address_id CHAR(32) NOT NULL,
+	PRIMARY KEY (client_id),
+	FOREIGN KEY(client_id) REFERENCES user (user_id),
+	FOREIGN KEY(registration_fee_payment_id) REFERENCES payment (payment_id),
+	FOREIGN KEY(address_id) REFERENCES address (address_id)
+);
+
+CREATE UNIQUE INDEX ix_client_registration_fee_payment_id ON client (registration_fee_payment_id);
+
+CREATE UNIQUE INDEX ix_client_address_id ON client (address_id);
+
+CREATE TABLE vendor (
+	vendor_id CHAR(32) NOT NULL,
+	vendor_name VARCHAR NOT NULL,
+	required_deposit_gr INTEGER CHECK (required_deposit_gr IS NULL OR required_deposit_gr > 0),
+	registration_fee_payment_id CHAR(32),
+	address_id CHAR(32) NOT NULL,
+	phone_number VARCHAR(20) NOT NULL,
+	is_active BOOLEAN DEFAULT 'true' NOT NULL,
+	PRIMARY KEY (vendor_id),
+	FOREIGN KEY(vendor_id) REFERENCES user (user_id),
+	FOREIGN KEY(registration_fee_payment_id) REFERENCES payment (payment_id),
+	FOREIGN KEY(address_id) REFERENCES address (address_id)
+);
+
+CREATE UNIQUE INDEX ix_vendor_registration_fee_payment_id ON vendor (registration_fee_payment_id);
+
+CREATE UNIQUE INDEX ix_vendor_address_id ON vendor (address_id);
+
+CREATE TABLE vendor_offered_service_types (
+	vendor_id CHAR(32) NOT NULL,
+	service_type_id CHAR(32) NOT NULL,
+	PRIMARY KEY (vendor_id, service_type_id),
+	UNIQUE (vendor_id, service_type_id),
+	FOREIGN KEY(vendor_id) REFERENCES vendor (vendor_id),
+	FOREIGN KEY(service_type_id) REFERENCES service_type (service_type_id)
+);
+
+CREATE TABLE visit (
+	visit_id CHAR(32) DEFAULT (gen_random_uuid()) NOT NULL,
+	client_id CHAR(32) NOT NULL,
+	vendor_id CHAR(32) NOT NULL,
+	start_timestamp DATETIME NOT NULL,
+	end_timestamp DATETIME NOT NULL,
+	description VARCHAR NOT NULL,
+	service_type_id CHAR(32) NOT NULL,
+	address_id CHAR(32) NOT NULL,
+	deposit_id CHAR(32),
+	verification_code VARCHAR,
+	review_opinion_score INTEGER CHECK ((status = 'completed' AND review_opinion_score IS NOT NULL) OR review_opinion_score IS NULL) CHECK (review_opinion_score IS NULL OR review_opinion_score >= 1 AND review_opinion_score <= 5),
+	review_comment VARCHAR,
+	status VARCHAR(15) NOT NULL,
+	PRIMARY KEY (visit_id),
+	FOREIGN KEY(client_id) REFERENCES client (client_id),
+	FOREIGN KEY(vendor_id) REFERENCES vendor (vendor_id),
+	FOREIGN KEY(service_type_id) REFERENCES service_type (service_type_id),
+	FOREIGN KEY(address_id) REFERENCES address (address_id),
+	FOREIGN KEY(deposit_id) REFERENCES payment (payment_id)
+);
+
+CREATE INDEX ix_visit_vendor_id ON visit (vendor_id);
+
+CREATE INDEX ix_visit_service_type_id ON visit (service_type_id);
+
+CREATE INDEX ix_visit_address_id ON visit (address_id);
+
+CREATE UNIQUE INDEX ix_visit_deposit_id ON visit (deposit_id);
+
+CREATE INDEX ix_visit_client_id ON visit (client_id);
+
+CREATE TABLE chat_session (
+	chat_session_id CHAR(32) DEFAULT (gen_random_uuid()) NOT NULL,
+	user_id CHAR(32) NOT NULL,
+	vendor_id CHAR(32) NOT NULL,
+	visit_id CHAR(32),
+	PRIMARY KEY (chat_session_id),
+	UNIQUE (visit_id, user_id, vendor_id),
+	FOREIGN KEY(user_id) REFERENCES user (user_id),
+	FOREIGN KEY(vendor_id) REFERENCES vendor (vendor_id),
+	FOREIGN KEY(visit_id) REFERENCES visit (visit_id)
+);
+
+CREATE INDEX ix_chat_session_user_id ON chat_session (user_id);
+
+CREATE INDEX ix_chat_session_vendor_id ON chat_session (vendor_id);
+
+CREATE INDEX ix_chat_session_visit_id ON chat_session (visit_id);
+
+CREATE TABLE visit_description_attachment (
+	visit_id CHAR(32) NOT NULL,
+	attachment_id CHAR(32) NOT NULL,
+	PRIMARY KEY (visit_id, attachment_id),
+	UNIQUE (visit_id, attachment_id),
+	FOREIGN KEY(visit_id) REFERENCES visit (visit_id),
+	FOREIGN KEY(attachment_id) REFERENCES attachment (attachment_id)
+);
+
+CREATE TABLE visit_review_attachment (
+	visit_id CHAR(32) NOT NULL,
+	attachment_id CHAR(32) NOT NULL,
+	PRIMARY KEY (visit_id, attachment_id),
+	UNIQUE (visit_id, attachment_id),
+	FOREIGN KEY(visit_id) REFERENCES visit (visit_id),
+	FOREIGN KEY(attachment_id) REFERENCES attachment (attachment_id)
+);
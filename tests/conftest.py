@@ -0,0 +1,81 @@
+import asyncio
+import contextlib
+import os
+import uuid
+from typing import Any, Callable, ContextManager, Iterator
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+# read when the security module is imported, the tests never talk to Google
+for _name in ("GOOGLE_CLIENT_ID", "GOOGLE_CLIENT_SECRET", "JWT_SECRET_KEY"):
+    os.environ.setdefault(_name, f"test-{_name.lower()}")
+
+from visit_manager.postgres_utils.models import Base  # noqa: E402
+from visit_manager.postgres_utils.models.availability import _busy_cache  # noqa: E402
+from visit_manager.postgres_utils.models.identity import _identity_cache  # noqa: E402
+from visit_manager.postgres_utils.models.service_types import _service_type_cache  # noqa: E402
+from visit_manager.postgres_utils.query_counter import QueryStats, count_queries, instrument_query_counter  # noqa: E402
+
+
+def _register_sqlite_functions(dbapi_connection: Any, connection_record: Any) -> None:
+    # server_default=func.gen_random_uuid() is Postgres-only, emulate it for the in-memory database
+    dbapi_connection.create_function("gen_random_uuid", 0, lambda: uuid.uuid4().hex)
+
+
+@pytest.fixture
+def engine() -> Iterator[AsyncEngine]:
+    """In-memory SQLite engine with the whole schema created."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    event.listen(engine.sync_engine, "connect", _register_sqlite_functions)
+
+    async def create_all() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_all())
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def statements(engine: AsyncEngine) -> Iterator[list[str]]:
+    """Statements executed on `engine` while the test runs."""
+    executed: list[str] = []
+
+    def before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def max_queries(engine: AsyncEngine) -> Callable[[int], ContextManager[QueryStats]]:
+    """
+    Assert an upper bound on the statements executed on `engine`, e.g. by one request:
+
+        with max_queries(3):
+            response = _request(...)
+    """
+    instrument_query_counter(engine)
+
+    @contextlib.contextmanager
+    def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+        with count_queries() as stats:
+            yield stats
+        executed = "\n".join(f"{count} x {shape}" for shape, count in stats.shapes.most_common())
+        assert stats.statements <= limit, f"{stats.statements} statements, expected at most {limit}:\n{executed}"
+
+    return assert_max_queries
+
+
+@pytest.fixture(autouse=True)
+def clear_caches() -> Iterator[None]:
+    """Every test gets its own database, entries cached by another test would point into a different one."""
+    yield
+    _identity_cache.clear()
+    _busy_cache.clear()
+    _service_type_cache.clear()
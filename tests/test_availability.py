@@ -0,0 +1,116 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from tests.test_visit_listing import CLIENT_EMAIL, _seed
+from tests.test_visit_manage_responses import _request
+from visit_manager.postgres_utils.models.availability import free_slots, get_vendors_availability, merge_intervals
+from visit_manager.postgres_utils.models.calendar import (
+    _calendar_versions,
+    get_calendar_version,
+    invalidate_vendor_calendars,
+)
+from visit_manager.postgres_utils.models.models import Visit, VisitStatus
+
+
+def at(hour: float) -> datetime:
+    return datetime(2025, 6, 1, int(hour), int(hour % 1 * 60))
+
+
+def test_merge_intervals() -> None:
+    intervals = [(at(10), at(11)), (at(8), at(9)), (at(8.5), at(9.5)), (at(9.5), at(10)), (at(12), at(13))]
+
+    assert merge_intervals(intervals) == [(at(8), at(11)), (at(12), at(13))]
+
+
+def test_free_slots_fill_gaps_between_busy_intervals() -> None:
+    busy = [(at(6), at(8.5)), (at(9.75), at(10)), (at(11), at(20))]
+
+    slots = free_slots(busy, at(8), at(12), timedelta(minutes=30), max_slots=10)
+
+    assert slots == [(at(8.5), at(9)), (at(9), at(9.5)), (at(10), at(10.5)), (at(10.5), at(11))]
+    assert free_slots(busy, at(8), at(12), timedelta(minutes=30), max_slots=1) == [(at(8.5), at(9))]
+    assert free_slots([], at(8), at(9), timedelta(hours=2), max_slots=10) == []
+
+
+def test_vendor_availability_is_cached_until_the_calendar_changes(engine: AsyncEngine, statements: list[str]) -> None:
+    async def run() -> None:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            # visits at 8:00, 9:00 and 10:00, 30 minutes each
+            await _seed(session, visits_count=3)
+            visit = (await session.execute(select(Visit).limit(1))).scalar_one()
+        vendor_id = visit.vendor_id
+
+        async def slots() -> list[tuple[datetime, datetime]]:
+            async with session_factory() as session:
+                (availability,) = await get_vendors_availability(
+                    session, [vendor_id], at(8), at(11), timedelta(minutes=30), max_slots=10
+                )
+            return [(slot.start_time, slot.end_time) for slot in availability.slots]
+
+        async with session_factory() as session:
+            unknown = await get_vendors_availability(
+                session, [uuid.uuid4()], at(8), at(11), timedelta(minutes=30), max_slots=10
+            )
+        assert unknown == []
+
+        statements.clear()
+        assert await slots() == [(at(8.5), at(9)), (at(9.5), at(10)), (at(10.5), at(11))]
+        assert len(statements) == 1
+
+        statements.clear()
+        assert await slots() == [(at(8.5), at(9)), (at(9.5), at(10)), (at(10.5), at(11))]
+        assert statements == []
+
+        async with session_factory() as session, session.begin():
+            session.add(
+                Visit(
+                    vendor_id=vendor_id,
+                    client_id=visit.client_id,
+                    start_timestamp=at(9.5),
+                    end_timestamp=at(10),
+                    description="Example description",
+                    service_type_id=visit.service_type_id,
+                    address_id=visit.address_id,
+                    status=VisitStatus.confirmed,
+                )
+            )
+            invalidate_vendor_calendars(session, [vendor_id])
+
+        assert await slots() == [(at(8.5), at(9)), (at(10.5), at(11))]
+
+    asyncio.run(run())
+
+
+def test_reading_a_calendar_version_does_not_keep_an_entry() -> None:
+    vendor_id = uuid.uuid4()
+
+    assert get_calendar_version(vendor_id) == 0
+    assert vendor_id not in _calendar_versions
+
+
+def test_windows_mixing_naive_and_aware_times_are_checked(engine: AsyncEngine) -> None:
+    vendor_id = uuid.uuid4()
+
+    slot = _request(
+        engine,
+        CLIENT_EMAIL,
+        "GET",
+        "/user/is_slot_free",
+        params={"vendor_id": str(vendor_id), "start_time": "2025-06-01T08:00:00", "end_time": "2025-06-01T09:00:00Z"},
+    )
+    window = _request(
+        engine,
+        CLIENT_EMAIL,
+        "GET",
+        "/user/availability",
+        params={"vendor_id": str(vendor_id), "from": "2025-06-01T08:00:00+02:00", "to": "2025-06-01T07:00:00"},
+    )
+
+    assert slot.status_code == 200
+    assert slot.json()["free"] is True
+    assert window.status_code == 400
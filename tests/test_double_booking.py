@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.schema import CreateTable
+
+from tests.test_visit_listing import _seed
+from visit_manager.postgres_utils.errors import EXCLUSION_VIOLATION, get_sqlstate
+from visit_manager.postgres_utils.models.models import Visit, VisitStatus
+from visit_manager.postgres_utils.models.visits import is_slot_free, time_overlaps
+
+
+def test_booked_visits_are_excluded_from_overlapping_on_postgres() -> None:
+    ddl = str(CreateTable(Visit.__table__).compile(dialect=postgresql.dialect()))  # type: ignore[arg-type]
+
+    assert "EXCLUDE USING gist (vendor_id WITH =, tsrange(start_timestamp, end_timestamp) WITH &&)" in ddl
+    assert "WHERE (status IN ('pending', 'confirmed', 'in_progress', 'completed'))" in ddl
+
+
+def test_slot_check_uses_the_exclusion_constraint_expression_on_postgres() -> None:
+    condition = time_overlaps(Visit.start_timestamp, Visit.end_timestamp, datetime(2025, 1, 1), datetime(2025, 1, 2))
+
+    sql = str(condition.compile(dialect=postgresql.dialect()))  # type: ignore[no-untyped-call]
+    assert sql.startswith("tsrange(visit.start_timestamp, visit.end_timestamp) && tsrange(")
+
+
+@pytest.mark.parametrize(
+    ("start_hour", "end_hour", "free"),
+    [
+        (7, 8, True),  # ends when the visit starts
+        (7, 9, False),
+        (8, 8.5, False),  # same slot
+        (8.25, 8.4, False),  # inside
+        (8.5, 9, True),  # starts when the visit ends
+    ],
+)
+def test_is_slot_free(engine: AsyncEngine, start_hour: float, end_hour: float, free: bool) -> None:
+    async def run() -> bool:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            # a single visit, 2025-06-01 8:00-8:30
+            await _seed(session, visits_count=1)
+            vendor_id = (await session.execute(select(Visit.vendor_id))).scalar_one()
+
+        def at(hour: float) -> datetime:
+            return datetime(2025, 6, 1, int(hour), int(hour % 1 * 60))
+
+        async with session_factory() as session:
+            return await is_slot_free(session, vendor_id, at(start_hour), at(end_hour))
+
+    assert asyncio.run(run()) is free
+
+
+def test_cancelled_visits_free_their_slot(engine: AsyncEngine) -> None:
+    async def run() -> bool:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            await _seed(session, visits_count=1)
+            visit = (await session.execute(select(Visit))).scalar_one()
+            visit.status = VisitStatus.cancelled
+
+        async with session_factory() as session:
+            return await is_slot_free(session, visit.vendor_id, visit.start_timestamp, visit.end_timestamp)
+
+    assert asyncio.run(run()) is True
+
+
+def test_sqlstate_of_exclusion_violation() -> None:
+    class AsyncpgError(Exception):
+        sqlstate = EXCLUSION_VIOLATION
+
+    error = IntegrityError("INSERT INTO visit ...", {}, AsyncpgError())
+    assert get_sqlstate(error) == EXCLUSION_VIOLATION
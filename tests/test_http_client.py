@@ -0,0 +1,32 @@
+import asyncio
+
+import httpx
+import pytest
+
+from visit_manager.app.security.google import GOOGLE_USERINFO_URL, fetch_google_userinfo
+from visit_manager.package_utils.http_client import create_http_client
+
+
+def _google(request: httpx.Request) -> httpx.Response:
+    assert str(request.url) == GOOGLE_USERINFO_URL
+    if request.headers["Authorization"] != "Bearer valid":
+        return httpx.Response(401, json={"error": "invalid_token"})
+    return httpx.Response(200, json={"name": "Jan Kowalski", "email": "jan@example.com"})
+
+
+def test_userinfo_is_fetched_through_the_shared_client() -> None:
+    async def run() -> None:
+        async with create_http_client(transport=httpx.MockTransport(_google)) as http_client:
+            user_info = await fetch_google_userinfo(http_client, "valid")
+        assert user_info["name"] == "Jan Kowalski"
+
+    asyncio.run(run())
+
+
+def test_userinfo_rejected_token_raises() -> None:
+    async def run() -> None:
+        async with create_http_client(transport=httpx.MockTransport(_google)) as http_client:
+            with pytest.raises(httpx.HTTPStatusError):
+                await fetch_google_userinfo(http_client, "expired")
+
+    asyncio.run(run())
@@ -0,0 +1,67 @@
+import asyncio
+from unittest import mock
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from tests.test_visit_listing import VENDOR_EMAIL, _address, _seed
+from visit_manager.app.models.user_models import AddressCreate, ClientCreate, UserSessionData
+from visit_manager.package_utils.cache import TTLCache
+from visit_manager.postgres_utils.models.users import get_me_from_db, register_as_client
+
+
+def test_cache_evicts_least_recently_used() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_cache_entries_expire() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl=60)
+    with mock.patch("visit_manager.package_utils.cache.time.monotonic", return_value=1000.0):
+        cache.set("default", 1)
+        cache.set("short", 2, ttl=5)
+        cache.set("expired", 3, ttl=-1)
+    with mock.patch("visit_manager.package_utils.cache.time.monotonic", return_value=1010.0):
+        assert cache.get("default") == 1
+        assert cache.get("short") is None
+        assert cache.get("expired") is None
+
+
+def test_me_is_served_from_cache_and_refreshed_after_registration(engine: AsyncEngine, statements: list[str]) -> None:
+    async def run() -> None:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            await _seed(session, visits_count=0)
+        current_user = UserSessionData(user_id="sub", user_email=VENDOR_EMAIL)
+
+        statements.clear()
+        async with session_factory() as session, session.begin():
+            assert (await get_me_from_db(session, current_user)).user_type == "vendor"
+        assert len(statements) == 1
+
+        statements.clear()
+        async with session_factory() as session, session.begin():
+            me = await get_me_from_db(session, current_user)
+        assert me.email == VENDOR_EMAIL
+        assert statements == []
+
+        address = _address()
+        client_data = ClientCreate(
+            phone_number="+48111222333",
+            address=AddressCreate(**{c: getattr(address, c) for c in AddressCreate.model_fields}),
+        )
+        async with session_factory() as session, session.begin():
+            await register_as_client(session, current_user, client_data)
+
+        statements.clear()
+        async with session_factory() as session, session.begin():
+            await get_me_from_db(session, current_user)
+        assert len(statements) == 1
+
+    asyncio.run(run())
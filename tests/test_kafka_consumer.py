@@ -0,0 +1,176 @@
+import asyncio
+import json
+from typing import Any, Iterator
+
+import pytest
+from prometheus_client import REGISTRY
+
+from visit_manager.kafka_utils import consumer as consumer_module
+from visit_manager.kafka_utils.common import KafkaTopics, record_consumer_lag
+from visit_manager.kafka_utils.consumer import KafkaConsumerWorker, KafkaEvent, kafka_handler
+
+
+class FakeMessage:
+    def __init__(self, topic: str, offset: int, payload: dict[str, Any]) -> None:
+        self._topic = topic
+        self._offset = offset
+        self._value = json.dumps(payload).encode()
+
+    def error(self) -> None:
+        return None
+
+    def value(self) -> bytes:
+        return self._value
+
+    def key(self) -> None:
+        return None
+
+    def headers(self) -> None:
+        return None
+
+    def topic(self) -> str:
+        return self._topic
+
+    def partition(self) -> int:
+        return 0
+
+    def offset(self) -> int:
+        return self._offset
+
+
+class FakeConsumer:
+    def __init__(self, batches: list[list[FakeMessage]], worker: "list[KafkaConsumerWorker]") -> None:
+        self.batches = batches
+        self.worker = worker
+        self.consume_calls: list[int] = []
+        self.consumed: list[FakeMessage] = []
+        self.seeks: list[int] = []
+        self.commits = 0
+        self.closed = False
+        self.high_watermark = 0
+
+    def subscribe(self, topics: list[str]) -> None:
+        self.topics = topics
+
+    def consume(self, num_messages: int, timeout: float) -> list[FakeMessage]:
+        self.consume_calls.append(num_messages)
+        if not self.batches:
+            asyncio.run_coroutine_threadsafe(self.worker[0].stop(), self.loop)
+            return []
+        self.consumed = self.batches.pop(0)
+        return self.consumed
+
+    def commit(self, asynchronous: bool) -> None:
+        assert asynchronous is False
+        self.commits += 1
+
+    def seek(self, partition: Any) -> None:
+        # every message is on partition 0, the batch is delivered again from the offset sought
+        self.seeks.append(partition.offset)
+        self.batches.insert(0, [message for message in self.consumed if message.offset() >= partition.offset])
+
+    def get_watermark_offsets(self, partition: Any, cached: bool) -> tuple[int, int]:
+        return 0, self.high_watermark
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def isolated_handlers() -> Iterator[None]:
+    saved = dict(consumer_module._handlers)
+    consumer_module._handlers.clear()
+    yield
+    consumer_module._handlers.clear()
+    consumer_module._handlers.update(saved)
+
+
+def _run(batches: list[list[FakeMessage]], holder: list[KafkaConsumerWorker] | None = None) -> FakeConsumer:
+    """Consume `batches` until they are all handled or the worker, put in `holder`, is stopped."""
+    holder = [] if holder is None else holder
+
+    async def run() -> FakeConsumer:
+        fake = FakeConsumer(batches, holder)
+        fake.loop = asyncio.get_running_loop()  # type: ignore[attr-defined]
+        worker = KafkaConsumerWorker(
+            fake, ["ratings"], batch_size=100, poll_timeout=0.01, workers=2, retry_backoff=0.01, retry_max_backoff=0.02
+        )
+        holder.append(worker)
+        await worker.run()
+        return fake
+
+    return asyncio.run(run())
+
+
+def test_batches_are_dispatched_by_event_type_and_committed_after_handling() -> None:
+    received: dict[str, list[int]] = {"async": [], "sync": []}
+
+    @kafka_handler(KafkaTopics.RATINGS, "rating_added")
+    async def on_added(events: list[KafkaEvent]) -> None:
+        received["async"].extend(e.offset for e in events)
+
+    @kafka_handler(KafkaTopics.RATINGS, "rating_removed")
+    def on_removed(events: list[KafkaEvent]) -> None:
+        received["sync"].extend(e.offset for e in events)
+
+    batch = [
+        FakeMessage("ratings", offset, {"event_type": "rating_added" if offset % 2 else "rating_removed"})
+        for offset in range(10)
+    ]
+    fake = _run([batch])
+
+    assert fake.consume_calls[0] == 100
+    assert received == {"async": [1, 3, 5, 7, 9], "sync": [0, 2, 4, 6, 8]}
+    assert fake.commits == 1
+    assert fake.closed
+
+
+def test_failed_batch_is_consumed_again_before_commit() -> None:
+    attempts: list[int] = []
+
+    @kafka_handler(KafkaTopics.RATINGS)
+    async def flaky(events: list[KafkaEvent]) -> None:
+        attempts.append(len(events))
+        if len(attempts) < 3:
+            raise RuntimeError("database unavailable")
+
+    fake = _run([[FakeMessage("ratings", offset, {"event_type": "anything"}) for offset in (5, 6)]])
+
+    assert attempts == [2, 2, 2]
+    assert fake.seeks == [5, 5]
+    assert fake.commits == 1
+
+
+def test_failing_batch_is_never_committed() -> None:
+    attempts: list[int] = []
+    holder: list[KafkaConsumerWorker] = []
+
+    @kafka_handler(KafkaTopics.RATINGS)
+    async def failing(events: list[KafkaEvent]) -> None:
+        attempts.append(len(events))
+        if len(attempts) == 5:
+            # the app stops while the batch is still failing
+            await holder[0].stop()
+        raise RuntimeError("invalid event")
+
+    fake = _run([[FakeMessage("ratings", 0, {"event_type": "anything"})]], holder)
+
+    assert attempts == [1] * 5
+    assert fake.commits == 0
+    assert fake.closed
+
+
+def test_consumer_lag_is_measured_from_the_cached_high_watermark() -> None:
+    fake = FakeConsumer([], [])
+    fake.high_watermark = 25
+    batch = [FakeMessage("ratings", offset, {"event_type": "anything"}) for offset in range(10, 20)]
+
+    assert record_consumer_lag(fake, batch) == {("ratings", 0): 5}
+    assert (
+        REGISTRY.get_sample_value("visit_manager_kafka_consumer_lag_messages", {"topic": "ratings", "partition": "0"})
+        == 5
+    )
+
+    # unknown watermark, before the first fetch response
+    fake.high_watermark = -1001
+    assert record_consumer_lag(fake, batch) == {}
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+from typing import Any, Callable
+
+import confluent_kafka
+import pytest
+
+from visit_manager.kafka_utils import producer as producer_module
+from visit_manager.kafka_utils.producer import AsyncKafkaProducer
+
+
+class StubProducer:
+    """
+    confluent_kafka.Producer whose flush and poll fail the test when called on the event loop, where the real ones
+    would block it; the poll thread gets every queued message reported as failed.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self._lock = threading.Lock()
+        self._queued: list[Callable[[Any, Any], None]] = []
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._queued)
+
+    def produce(
+        self, topic: str, value: bytes, key: Any, headers: Any, on_delivery: Callable[[Any, Any], None]
+    ) -> None:
+        with self._lock:
+            self._queued.append(on_delivery)
+
+    def poll(self, timeout: float) -> int:
+        _fail_on_event_loop("poll")
+        with self._lock:
+            queued, self._queued = self._queued, []
+        for on_delivery in queued:
+            on_delivery("broker unavailable", None)
+        threading.Event().wait(timeout)
+        return len(queued)
+
+    def flush(self, timeout: float) -> int:
+        _fail_on_event_loop("flush")
+        return len(self)
+
+
+def _fail_on_event_loop(method: str) -> None:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    pytest.fail(f"Producer.{method} called on the event loop")
+
+
+def test_produce_does_not_wait_for_the_broker(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(producer_module.confluent_kafka, "Producer", StubProducer)
+
+    async def run() -> None:
+        producer = AsyncKafkaProducer({})
+        try:
+            futures = [producer.produce("users", value=f"{i}".encode()) for i in range(100)]
+
+            results = await asyncio.wait_for(asyncio.gather(*futures, return_exceptions=True), timeout=5)
+            assert all(isinstance(result, confluent_kafka.KafkaException) for result in results)
+        finally:
+            await asyncio.to_thread(producer.close, 1)
+
+    asyncio.run(run())
+
+
+def test_produce_reports_delivery_failure() -> None:
+    async def run() -> None:
+        producer = AsyncKafkaProducer({"bootstrap.servers": "127.0.0.1:1", "message.timeout.ms": 200})
+        try:
+            futures = [producer.produce("users", value=f"{i}".encode()) for i in range(100)]
+            # librdkafka may count its own protocol requests in the queue as well
+            assert len(producer) >= 100
+
+            results = await asyncio.wait_for(asyncio.gather(*futures, return_exceptions=True), timeout=5)
+            assert all(isinstance(result, confluent_kafka.KafkaException) for result in results)
+        finally:
+            producer.close(timeout=1)
+
+    asyncio.run(run())
@@ -0,0 +1,36 @@
+import asyncio
+from typing import Iterator
+
+import pytest
+
+from benchmarks.load import run_benchmark
+from visit_manager.app.security.common import get_oauth
+from visit_manager.postgres_utils import utils
+
+
+@pytest.fixture
+def restore_app(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """The benchmark points the process-wide engine and the Google client at its stand-ins."""
+    auth_demo = get_oauth().auth_demo
+    monkeypatch.setattr(auth_demo, "authorize_access_token", auth_demo.authorize_access_token)
+    yield
+    utils._engine_override.clear()
+    utils.get_async_engine.cache_clear()
+    utils.get_session_factory.cache_clear()
+
+
+@pytest.mark.usefixtures("restore_app")
+def test_every_scenario_runs_against_the_stand_ins() -> None:
+    report = asyncio.run(
+        run_benchmark(None, concurrency_levels=[1, 3], requests=4, kafka_latency_s=0, stripe_latency_s=0)
+    )
+
+    assert report["meta"]["database"] == "sqlite"
+    results = report["results"]
+    assert [(r["scenario"], r["concurrency"]) for r in results[:7]] == [
+        (name, 1)
+        for name in ("login", "register_vendor", "register_client", "book_visit", "list_visits", "charge", "refund")
+    ]
+    assert len(results) == 14
+    assert all(r["errors"] == 0 for r in results)
+    assert all(r["queries_per_request"] > 0 and r["p50_ms"] <= r["p99_ms"] for r in results)
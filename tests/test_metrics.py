@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+from prometheus_client import REGISTRY
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from visit_manager.app.middleware import UNMATCHED_ROUTE, RequestMetricsMiddleware
+from visit_manager.postgres_utils.models.models import Payment
+from visit_manager.postgres_utils.utils import _statement_kind, instrument_engine
+from visit_manager.stripe_utils.circuit_breaker import CircuitBreaker
+from visit_manager.stripe_utils.fake import DECLINED_SOURCE, FakeStripeBackend
+from visit_manager.stripe_utils.gateway import PaymentGateway, PaymentRejectedError
+
+
+def _count(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(f"{name}_count", labels) or 0.0
+
+
+def test_requests_are_labelled_with_the_route_template() -> None:
+    router = APIRouter(prefix="/visit")
+
+    @router.get("/{visit_id}")
+    async def get_visit(visit_id: int) -> dict[str, int]:
+        if visit_id == 404:
+            raise HTTPException(status_code=404)
+        return {"visit_id": visit_id}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(RequestMetricsMiddleware)
+
+    name = "visit_manager_http_request_duration_seconds"
+    ok = {"method": "GET", "route": "/visit/{visit_id}", "status": "200"}
+    not_found = {"method": "GET", "route": "/visit/{visit_id}", "status": "404"}
+    unmatched = {"method": "GET", "route": UNMATCHED_ROUTE, "status": "404"}
+    before = [_count(name, **labels) for labels in (ok, not_found, unmatched)]
+
+    async def run() -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for path in ("/visit/1", "/visit/2", "/visit/404", "/no/such/path"):
+                await client.get(path)
+
+    asyncio.run(run())
+    after = [_count(name, **labels) for labels in (ok, not_found, unmatched)]
+    assert [b - a for a, b in zip(before, after)] == [2, 1, 1]
+
+
+def test_statements_are_timed_by_kind(engine: AsyncEngine) -> None:
+    instrument_engine(engine)
+    name = "visit_manager_db_statement_duration_seconds"
+    before = _count(name, statement="SELECT")
+
+    async def run() -> None:
+        async with async_sessionmaker(engine)() as session:
+            await session.execute(select(Payment))
+            await session.execute(select(Payment.payment_id))
+
+    asyncio.run(run())
+    assert _count(name, statement="SELECT") - before == 2
+
+
+def test_statement_kind() -> None:
+    assert _statement_kind("\n  select 1") == "SELECT"
+    assert _statement_kind("WITH busy AS (SELECT 1) SELECT * FROM busy") == "WITH"
+    assert _statement_kind("CREATE INDEX ix ON payment (status)") == "OTHER"
+
+
+def test_stripe_attempts_are_timed_by_outcome() -> None:
+    backend = FakeStripeBackend()
+    breaker = CircuitBreaker(failure_ratio=0.5, min_calls=100, window_s=30, open_s=15)
+    gateway = PaymentGateway(backend, breaker, retry_backoff_s=0.0, retry_max_backoff_s=0.0)
+    name = "visit_manager_stripe_request_duration_seconds"
+    outcomes = ("success", "error", "rejected")
+    before = [_count(name, operation="charge", outcome=outcome) for outcome in outcomes]
+
+    async def run() -> None:
+        backend.fail_next(1)
+        await gateway.charge(1000, "pln", "tok_visa", idempotency_key="key-1")
+        with pytest.raises(PaymentRejectedError):
+            await gateway.charge(1000, "pln", DECLINED_SOURCE, idempotency_key="key-2")
+
+    asyncio.run(run())
+    after = [_count(name, operation="charge", outcome=outcome) for outcome in outcomes]
+    assert [b - a for a, b in zip(before, after)] == [1, 1, 1]
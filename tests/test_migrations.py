@@ -0,0 +1,154 @@
+import asyncio
+import io
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import Connection, MetaData, event, inspect, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from tests.conftest import _register_sqlite_functions
+from visit_manager.postgres_utils.migrate import alembic_config, upgrade
+from visit_manager.postgres_utils.models import Base
+
+# what create_tables created before the migrations, the schema of the databases deployed then
+BASELINE_SCHEMA = Path(__file__).with_name("baseline_schema.sql").read_text()
+
+LISTING_INDEXES = {
+    "visit": {"ix_visit_vendor_id_start_timestamp", "ix_visit_client_id_start_timestamp"},
+    "payment": {"ix_payment_transaction_timestamp", "ix_payment_status_transaction_timestamp"},
+    "address": {"ix_address_latitude_longitude"},
+}
+
+
+@pytest.fixture
+def empty_engine() -> Iterator[AsyncEngine]:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    event.listen(engine.sync_engine, "connect", _register_sqlite_functions)
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+def _run(engine: AsyncEngine, check: Any) -> Any:
+    async def run() -> Any:
+        async with engine.connect() as connection:
+            return await connection.run_sync(check)
+
+    return asyncio.run(run())
+
+
+def _create_baseline_schema(engine: AsyncEngine) -> None:
+    def create(connection: Connection) -> None:
+        for statement in BASELINE_SCHEMA.split(";"):
+            if statement.strip():
+                connection.exec_driver_sql(statement)
+        connection.commit()
+
+    _run(engine, create)
+
+
+def _schema_diff(connection: Connection, metadata: MetaData) -> list[Any]:
+    return compare_metadata(MigrationContext.configure(connection, opts={"compare_type": True}), metadata)
+
+
+def _version(connection: Connection) -> str:
+    return str(connection.scalar(text("SELECT version_num FROM alembic_version")))
+
+
+def _missing_indexes(connection: Connection) -> dict[str, set[str]]:
+    inspector = inspect(connection)
+    return {
+        table: names - {index["name"] for index in inspector.get_indexes(table)}
+        for table, names in LISTING_INDEXES.items()
+    }
+
+
+def test_migrations_create_the_schema_of_the_models(empty_engine: AsyncEngine) -> None:
+    asyncio.run(upgrade(empty_engine))
+
+    assert _run(empty_engine, lambda connection: _schema_diff(connection, Base.metadata)) == []
+    assert _run(empty_engine, _version) == "0006"
+    service_types = _run(
+        empty_engine, lambda connection: connection.scalars(text("SELECT name FROM service_type")).all()
+    )
+    assert sorted(service_types) == ["carpenter", "cleaner", "electrician", "painter", "plumber"]
+
+
+def test_migrations_downgrade_to_an_empty_database(empty_engine: AsyncEngine) -> None:
+    asyncio.run(upgrade(empty_engine))
+
+    def downgrade(connection: Connection) -> list[str]:
+        command.downgrade(alembic_config(connection), "base")
+        return inspect(connection).get_table_names()
+
+    assert _run(empty_engine, downgrade) == ["alembic_version"]
+
+
+def test_baseline_revision_is_the_schema_create_tables_created(empty_engine: AsyncEngine) -> None:
+    baseline_engine = create_async_engine("sqlite+aiosqlite://")
+    _create_baseline_schema(baseline_engine)
+    baseline = MetaData()
+    _run(baseline_engine, lambda connection: baseline.reflect(connection))
+    asyncio.run(baseline_engine.dispose())
+
+    asyncio.run(upgrade(empty_engine, "0001"))
+
+    def diff(connection: Connection) -> list[Any]:
+        return [change for change in _schema_diff(connection, baseline) if change[1].name != "alembic_version"]
+
+    assert _run(empty_engine, diff) == []
+
+
+def test_database_created_before_migrations_is_stamped_and_upgraded(empty_engine: AsyncEngine) -> None:
+    _create_baseline_schema(empty_engine)
+    _run(
+        empty_engine,
+        lambda connection: (
+            connection.execute(text("INSERT INTO service_type (name, description) VALUES ('plumber', 'Plumber')")),
+            connection.commit(),
+        ),
+    )
+
+    asyncio.run(upgrade(empty_engine))
+
+    assert _run(empty_engine, _version) == "0006"
+    assert _run(empty_engine, lambda connection: _schema_diff(connection, Base.metadata)) == []
+    # visit was copied on SQLite to get its unique idempotency key, with its constraints
+    assert len(_run(empty_engine, lambda connection: inspect(connection).get_check_constraints("visit"))) == 2
+    # the rows of the deployed database are kept, the baseline's service types are not inserted again
+    assert _run(empty_engine, lambda connection: connection.scalars(text("SELECT name FROM service_type")).all()) == [
+        "plumber"
+    ]
+
+
+def test_database_created_by_a_later_create_tables_is_adopted(engine: AsyncEngine) -> None:
+    # the tables of every revision exist already, only the listing indexes are missing
+    def drop_listing_indexes(connection: Connection) -> None:
+        for names in LISTING_INDEXES.values():
+            for name in names:
+                connection.execute(text(f"DROP INDEX {name}"))
+        connection.commit()
+
+    _run(engine, drop_listing_indexes)
+
+    asyncio.run(upgrade(engine))
+
+    assert _run(engine, _version) == "0006"
+    assert _run(engine, _missing_indexes) == {table: set() for table in LISTING_INDEXES}
+    assert _run(engine, lambda connection: _schema_diff(connection, Base.metadata)) == []
+
+
+def test_indexes_are_built_concurrently_outside_of_transactions() -> None:
+    config = alembic_config()
+    config.output_buffer = io.StringIO()
+
+    command.upgrade(config, "0001:0003", sql=True)
+
+    statements = [line for line in config.output_buffer.getvalue().splitlines() if line and not line.startswith("--")]
+    for names in [*LISTING_INDEXES.values(), {"visit_idempotency_key_key"}]:
+        for name in names:
+            index = next(i for i, line in enumerate(statements) if f"INDEX CONCURRENTLY IF NOT EXISTS {name} " in line)
+            assert statements[index - 1] == "COMMIT;" and statements[index + 1] == "BEGIN;"
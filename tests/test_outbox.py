@@ -0,0 +1,105 @@
+import asyncio
+from typing import Any
+
+import confluent_kafka
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from visit_manager.kafka_utils.common import KafkaTopics
+from visit_manager.kafka_utils.outbox import relay_outbox_batch
+from visit_manager.postgres_utils.models.models import OutboxEvent
+from visit_manager.postgres_utils.models.outbox import add_outbox_event
+
+
+class FakeProducer:
+    """
+    Acknowledges every message except the ones whose payload is listed in `failing`,
+    or none of them if `acknowledging` is false.
+    """
+
+    def __init__(self, failing: set[bytes] | None = None, acknowledging: bool = True) -> None:
+        self.failing = failing or set()
+        self.acknowledging = acknowledging
+        self.produced: list[bytes] = []
+
+    def produce(
+        self, topic: str, value: bytes, key: str | None = None, headers: Any = None, trace_context: Any = None
+    ) -> "asyncio.Future[Any]":
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self.produced.append(value)
+        if self.acknowledging and value in self.failing:
+            future.set_exception(confluent_kafka.KafkaException("broker unavailable"))
+        elif self.acknowledging:
+            future.set_result(value)
+        return future
+
+
+def test_relay_deletes_only_acknowledged_events(engine: AsyncEngine) -> None:
+    async def run() -> None:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            for i in range(3):
+                add_outbox_event(session, KafkaTopics.USERS, f'{{"n": {i}}}', key=str(i))
+
+        producer = FakeProducer(failing={b'{"n": 1}'})
+        delivered = await relay_outbox_batch(session_factory, producer, batch_size=10, delivery_timeout=1)  # type: ignore[arg-type]
+
+        async with session_factory() as session:
+            left = (await session.execute(select(OutboxEvent.payload))).scalars().all()
+        assert delivered == 2
+        assert len(producer.produced) == 3
+        assert left == ['{"n": 1}']
+
+    asyncio.run(run())
+
+
+def _add_events(session_factory: async_sessionmaker[Any], count: int) -> None:
+    async def run() -> None:
+        async with session_factory() as session, session.begin():
+            for i in range(count):
+                add_outbox_event(session, KafkaTopics.USERS, f'{{"n": {i}}}', key=str(i))
+
+    asyncio.run(run())
+
+
+def test_relay_waits_for_the_broker_outside_of_transactions(engine: AsyncEngine) -> None:
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    _add_events(session_factory, 2)
+    open_transactions: list[int] = []
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def begin(connection: Any) -> None:
+        open_transactions.append(1)
+
+    @event.listens_for(engine.sync_engine, "commit")
+    @event.listens_for(engine.sync_engine, "rollback")
+    def end(connection: Any) -> None:
+        open_transactions.pop()
+
+    class RecordingProducer(FakeProducer):
+        def produce(self, *args: Any, **kwargs: Any) -> "asyncio.Future[Any]":
+            assert open_transactions == []
+            return super().produce(*args, **kwargs)
+
+    delivered = asyncio.run(relay_outbox_batch(session_factory, RecordingProducer(), batch_size=10, delivery_timeout=1))  # type: ignore[arg-type]
+
+    assert delivered == 2
+
+
+def test_events_waiting_for_the_broker_are_published_again_once_their_claim_expired(engine: AsyncEngine) -> None:
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    _add_events(session_factory, 2)
+    unacknowledging, other_relay, later = FakeProducer(acknowledging=False), FakeProducer(), FakeProducer()
+
+    async def run() -> tuple[int, int, int]:
+        first = await relay_outbox_batch(session_factory, unacknowledging, batch_size=10, delivery_timeout=0.2)  # type: ignore[arg-type]
+        # still claimed by the first relay, which may yet get the acks
+        second = await relay_outbox_batch(session_factory, other_relay, batch_size=10, delivery_timeout=0.2)  # type: ignore[arg-type]
+        await asyncio.sleep(0.3)
+        third = await relay_outbox_batch(session_factory, later, batch_size=10, delivery_timeout=0.2)  # type: ignore[arg-type]
+        return first, second, third
+
+    assert asyncio.run(run()) == (0, 0, 2)
+    assert len(unacknowledging.produced) == 2
+    assert other_relay.produced == []
+    assert later.produced == [b'{"n": 0}', b'{"n": 1}']
@@ -0,0 +1,180 @@
+import asyncio
+from typing import AsyncIterator
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from visit_manager.app.models.user_models import UserSessionData
+from visit_manager.app.routers import payment
+from visit_manager.app.security.common import get_current_user
+from visit_manager.postgres_utils.models.models import Payment
+from visit_manager.postgres_utils.utils import get_db
+from visit_manager.stripe_utils.circuit_breaker import CircuitBreaker, CircuitState
+from visit_manager.stripe_utils.fake import DECLINED_SOURCE, FakeStripeBackend
+from visit_manager.stripe_utils.gateway import (
+    PaymentGateway,
+    PaymentRejectedError,
+    PaymentUnavailableError,
+    charge_idempotency_key,
+    get_payment_gateway,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _gateway(backend: FakeStripeBackend, breaker: CircuitBreaker | None = None, **kwargs: float) -> PaymentGateway:
+    breaker = breaker or CircuitBreaker(failure_ratio=0.5, min_calls=100, window_s=30, open_s=15)
+    options = {"retry_backoff_s": 0.0, "retry_max_backoff_s": 0.0, **kwargs}
+    return PaymentGateway(backend, breaker, **options)  # type: ignore[arg-type]
+
+
+def test_transient_errors_are_retried_with_the_same_idempotency_key() -> None:
+    backend = FakeStripeBackend()
+    gateway = _gateway(backend, max_retries=2)
+
+    async def run() -> None:
+        backend.fail_next(2)
+        charge = await gateway.charge(1000, "pln", "tok_visa", idempotency_key="key-1")
+        assert backend.requests == 3
+        # the client retries the whole request: the original charge is returned
+        assert await gateway.charge(1000, "pln", "tok_visa", idempotency_key="key-1") == charge
+        assert len(backend.charges) == 1
+
+    asyncio.run(run())
+
+
+def test_retries_are_bounded() -> None:
+    backend = FakeStripeBackend()
+    gateway = _gateway(backend, max_retries=2)
+    backend.fail_next(10)
+
+    with pytest.raises(PaymentUnavailableError):
+        asyncio.run(gateway.charge(1000, "pln", "tok_visa", idempotency_key="key-1"))
+    assert backend.requests == 3
+
+
+def test_slow_attempts_are_cut_by_the_deadline() -> None:
+    backend = FakeStripeBackend(latency_s=1.0)
+    gateway = _gateway(backend, timeout_s=0.1, attempt_timeout_s=0.05, max_retries=5)
+
+    with pytest.raises(PaymentUnavailableError):
+        asyncio.run(gateway.charge(1000, "pln", "tok_visa", idempotency_key="key-1"))
+    assert 1 < backend.requests <= 3
+    assert backend.charges == {}
+
+
+def test_rejections_are_not_retried_nor_trip_the_breaker() -> None:
+    backend = FakeStripeBackend()
+    breaker = CircuitBreaker(failure_ratio=0.5, min_calls=2, window_s=30, open_s=15)
+    gateway = _gateway(backend, breaker)
+
+    async def run() -> None:
+        for key in ("key-1", "key-2", "key-3"):
+            with pytest.raises(PaymentRejectedError, match="declined"):
+                await gateway.charge(1000, "pln", DECLINED_SOURCE, idempotency_key=key)
+
+    asyncio.run(run())
+    assert backend.requests == 3
+    assert breaker.state is CircuitState.closed
+
+
+def test_open_breaker_fails_fast() -> None:
+    backend = FakeStripeBackend()
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_ratio=0.5, min_calls=4, window_s=30, open_s=15, clock=clock)
+    gateway = _gateway(backend, breaker, max_retries=0)
+
+    async def run() -> None:
+        await gateway.charge(1000, "pln", "tok_visa", idempotency_key="key-1")
+        backend.fail_next(3)
+        for key in ("key-2", "key-3", "key-4"):
+            with pytest.raises(PaymentUnavailableError):
+                await gateway.charge(1000, "pln", "tok_visa", idempotency_key=key)
+        assert breaker.state is CircuitState.open
+
+        requests = backend.requests
+        with pytest.raises(PaymentUnavailableError):
+            await gateway.charge(1000, "pln", "tok_visa", idempotency_key="key-5")
+        assert backend.requests == requests
+
+        # after open_s a probe goes through and closes the breaker
+        clock.now += 15
+        assert breaker.state is CircuitState.half_open
+        await gateway.charge(1000, "pln", "tok_visa", idempotency_key="key-5")
+        assert breaker.state is CircuitState.closed
+
+    asyncio.run(run())
+
+
+def test_breaker_reopens_when_the_probe_fails() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_ratio=0.5, min_calls=2, window_s=30, open_s=15, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now += 15
+    assert breaker.allow()
+    # a single probe at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state is CircuitState.open
+
+
+def test_breaker_forgets_outcomes_outside_the_window() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_ratio=0.5, min_calls=2, window_s=30, open_s=15, clock=clock)
+    breaker.record_failure()
+    clock.now += 31
+    breaker.record_success()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state is CircuitState.closed
+
+
+def test_charge_idempotency_key() -> None:
+    key = charge_idempotency_key("user-1", "request-1")
+    assert key == charge_idempotency_key("user-1", "request-1")
+    assert key != charge_idempotency_key("user-2", "request-1")
+    assert key != charge_idempotency_key("user-1", "request-2")
+
+
+def test_retried_charge_request_is_stored_once(engine: AsyncEngine) -> None:
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    backend = FakeStripeBackend()
+
+    async def get_test_db() -> AsyncIterator[AsyncSession]:
+        async with session_factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(payment.router)
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_current_user] = lambda: UserSessionData(user_id="sub", user_email="a@example.com")
+    app.dependency_overrides[get_payment_gateway] = lambda: _gateway(backend)
+
+    async def run() -> list[str]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"Idempotency-Key": "checkout-42"}
+            first = await client.post("/payment/charge", json={"amount": 1000}, headers=headers)
+            retried = await client.post("/payment/charge", json={"amount": 1000}, headers=headers)
+            other = await client.post("/payment/charge", json={"amount": 1000}, headers={"Idempotency-Key": "43"})
+            without_key = await client.post("/payment/charge", json={"amount": 1000})
+        assert first.status_code == retried.status_code == other.status_code == 201
+        assert without_key.status_code == 400
+        assert first.json()["charge_id"] == retried.json()["charge_id"] != other.json()["charge_id"]
+        async with session_factory() as session:
+            return list((await session.execute(select(Payment.stripe_charge_id))).scalars())
+
+    assert len(asyncio.run(run())) == 2
+    assert len(backend.charges) == 2
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from visit_manager.app.models.payment_models import PaymentFilters
+from visit_manager.postgres_utils.models.models import Payment, PaymentStatus
+from visit_manager.postgres_utils.models.transaction import get_latest_succeeded_payment, list_payments
+
+START = datetime(2025, 6, 1, 8, 0)
+
+
+def _seed_payments(engine: AsyncEngine, count: int) -> None:
+    """Payment i is made at START + i minutes; every third one is refunded and every fifth one is in eur."""
+
+    async def run() -> None:
+        async with async_sessionmaker(engine)() as session, session.begin():
+            session.add_all(
+                Payment(
+                    stripe_charge_id=f"ch_{i}",
+                    amount=1000 + i,
+                    currency="eur" if i % 5 == 0 else "pln",
+                    transaction_timestamp=START + timedelta(minutes=i),
+                    status=PaymentStatus.refunded if i % 3 == 0 else PaymentStatus.succeeded,
+                )
+                for i in range(count)
+            )
+
+    asyncio.run(run())
+
+
+def _list_all(engine: AsyncEngine, **filters: object) -> list[list[str]]:
+    """Charge ids of every page, following the cursors."""
+
+    async def run() -> list[list[str]]:
+        pages = []
+        cursor = None
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            while True:
+                page = await list_payments(session, PaymentFilters(cursor=cursor, **filters))
+                pages.append([charge.charge_id for charge in page.items])
+                if page.next_cursor is None:
+                    return pages
+                cursor = page.next_cursor
+
+    return asyncio.run(run())
+
+
+def test_pages_are_newest_first(engine: AsyncEngine) -> None:
+    _seed_payments(engine, 7)
+
+    assert _list_all(engine, limit=3) == [["ch_6", "ch_5", "ch_4"], ["ch_3", "ch_2", "ch_1"], ["ch_0"]]
+
+
+def test_payments_made_at_the_same_time_are_not_skipped(engine: AsyncEngine) -> None:
+    async def seed() -> None:
+        async with async_sessionmaker(engine)() as session, session.begin():
+            session.add_all(
+                Payment(
+                    stripe_charge_id=f"ch_{i}",
+                    amount=1000,
+                    currency="pln",
+                    transaction_timestamp=START,
+                    status=PaymentStatus.succeeded,
+                )
+                for i in range(5)
+            )
+
+    asyncio.run(seed())
+
+    pages = _list_all(engine, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sorted(charge_id for page in pages for charge_id in page) == [f"ch_{i}" for i in range(5)]
+
+
+def test_filters(engine: AsyncEngine) -> None:
+    _seed_payments(engine, 10)
+
+    assert _list_all(engine, status=PaymentStatus.refunded) == [["ch_9", "ch_6", "ch_3", "ch_0"]]
+    assert _list_all(engine, currency="EUR") == [["ch_5", "ch_0"]]
+    assert _list_all(engine, from_time=START + timedelta(minutes=2), to_time=START + timedelta(minutes=5), limit=2) == [
+        ["ch_4", "ch_3"],
+        ["ch_2"],
+    ]
+
+
+def test_latest_succeeded_payment(engine: AsyncEngine, statements: list[str]) -> None:
+    _seed_payments(engine, 10)
+
+    async def run() -> Payment | None:
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            return await get_latest_succeeded_payment(session)
+
+    statements.clear()
+    payment = asyncio.run(run())
+
+    # ch_9 is refunded
+    assert payment is not None and payment.stripe_charge_id == "ch_8"
+    [query] = [statement for statement in statements if statement.lstrip().startswith("SELECT")]
+    assert "ORDER BY payment.transaction_timestamp DESC" in query and "LIMIT" in query
+
+
+def test_no_succeeded_payment(engine: AsyncEngine) -> None:
+    async def run() -> Payment | None:
+        async with async_sessionmaker(engine)() as session:
+            return await get_latest_succeeded_payment(session)
+
+    assert asyncio.run(run()) is None
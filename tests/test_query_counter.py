@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Callable, ContextManager
+
+import httpx
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from tests.test_visit_listing import CLIENT_EMAIL, VENDOR_EMAIL
+from tests.test_visit_manage_responses import ADDRESS, _app, _request, _seed_db
+from visit_manager.app.middleware import QueryCounterMiddleware
+from visit_manager.postgres_utils.models.models import User
+from visit_manager.postgres_utils.query_counter import QueryStats, count_queries, statement_shape
+
+MaxQueries = Callable[[int], ContextManager[QueryStats]]
+
+
+def test_statement_shape_collapses_in_lists() -> None:
+    one = statement_shape("SELECT * FROM visit\n  WHERE visit.id IN ($1)")
+    many = statement_shape("SELECT * FROM visit WHERE visit.id IN ($1, $2, $3)")
+
+    assert one == many == "SELECT * FROM visit WHERE visit.id IN (?)"
+    assert statement_shape("INSERT INTO t (a, b) VALUES (?, ?)") == "INSERT INTO t (a, b) VALUES (?)"
+
+
+def test_queries_outside_count_queries_are_not_counted(engine: AsyncEngine, max_queries: MaxQueries) -> None:
+    async def run() -> QueryStats:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            with count_queries() as stats:
+                await connection.execute(text("SELECT 2"))
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert stats.statements == 1 and stats.duration_s > 0
+    assert stats.shapes == {"SELECT 2": 1}
+
+
+def test_repeated_statements_are_reported(engine: AsyncEngine, max_queries: MaxQueries) -> None:
+    _seed_db(engine, visits_count=0)
+
+    async def run() -> QueryStats:
+        async with async_sessionmaker(engine)() as session:
+            with count_queries() as stats:
+                for email in (CLIENT_EMAIL, VENDOR_EMAIL, "new.user@example.com"):
+                    await session.scalar(select(User).where(User.email == email))
+        return stats
+
+    stats = asyncio.run(run())
+
+    assert stats.statements == 3
+    assert list(stats.repeated(3).values()) == [3]
+    assert stats.repeated(4) == {}
+
+
+def test_max_queries_fails_over_the_limit(engine: AsyncEngine, max_queries: MaxQueries) -> None:
+    async def run() -> None:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            await connection.execute(text("SELECT 1"))
+
+    with pytest.raises(AssertionError, match="2 statements, expected at most 1") as error:
+        with max_queries(1):
+            asyncio.run(run())
+
+    assert "2 x SELECT 1" in str(error.value)
+
+
+def test_middleware_reports_the_queries_of_the_request(
+    engine: AsyncEngine, max_queries: MaxQueries, caplog: pytest.LogCaptureFixture
+) -> None:
+    _seed_db(engine, visits_count=3)
+    app = _app(engine, CLIENT_EMAIL)
+    app.add_middleware(QueryCounterMiddleware, n_plus_one_threshold=1)
+
+    async def run() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/user/my_visits")
+
+    with caplog.at_level(logging.INFO):
+        response = asyncio.run(run())
+
+    assert response.status_code == 200
+    count = int(response.headers["X-DB-Query-Count"])
+    assert count > 0 and float(response.headers["X-DB-Time-Ms"]) > 0
+    assert f"GET /user/my_visits: {count} statements" in caplog.text
+    assert "Likely N+1 in GET /user/my_visits, statement run 1 times" in caplog.text
+
+
+# upper bounds of the statements each endpoint executes, raise them only for a reason
+def test_my_visits_query_budget(engine: AsyncEngine, max_queries: MaxQueries) -> None:
+    _seed_db(engine, visits_count=5)
+
+    with max_queries(3):
+        response = _request(engine, CLIENT_EMAIL, "GET", "/user/my_visits")
+
+    assert response.status_code == 200 and len(response.json()["items"]) == 5
+
+
+def test_book_visit_query_budget(engine: AsyncEngine, max_queries: MaxQueries) -> None:
+    _seed_db(engine, visits_count=0)
+
+    with max_queries(8):
+        response = _request(
+            engine,
+            CLIENT_EMAIL,
+            "POST",
+            "/user/book_visit",
+            json={"start_time": "2025-07-01T10:00:00", "end_time": "2025-07-01T11:00:00", "vendor_email": VENDOR_EMAIL},
+        )
+
+    assert response.status_code == 200
+
+
+def test_register_as_client_query_budget(engine: AsyncEngine, max_queries: MaxQueries) -> None:
+    _seed_db(engine, visits_count=0)
+
+    with max_queries(6):
+        response = _request(
+            engine,
+            VENDOR_EMAIL,
+            "POST",
+            "/user/register_as_client",
+            json={"phone_number": "+48111222333", "address": ADDRESS},
+        )
+
+    assert response.status_code == 200
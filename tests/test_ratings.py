@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from tests.test_visit_listing import CLIENT_EMAIL, _seed
+from visit_manager.app.models.user_models import OpinionCreate, UserSessionData
+from visit_manager.postgres_utils.models.models import OutboxEvent, Visit, VisitStatus
+from visit_manager.postgres_utils.models.ratings import add_opinion_in_db, get_vendor_rating
+
+CLIENT = UserSessionData(user_id="sub", user_email=CLIENT_EMAIL)
+
+
+def test_opinions_update_vendor_rating_incrementally(engine: AsyncEngine, statements: list[str]) -> None:
+    async def run() -> None:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            await _seed(session, visits_count=3)
+            visits = (await session.execute(select(Visit).order_by(Visit.start_timestamp))).scalars().all()
+
+        for visit, score in zip(visits, [5, 4, 4]):
+            statements.clear()
+            async with session_factory() as session, session.begin():
+                rating = await add_opinion_in_db(session, CLIENT, OpinionCreate(visit_id=visit.visit_id, score=score))
+            # the visit update, the rating upsert and the outbox insert, whatever the number of reviews
+            assert len([s for s in statements if not s.lstrip().upper().startswith("SELECT")]) == 3
+
+        assert rating.ratings_count == 3
+        assert rating.average_rating == pytest.approx(13 / 3)
+        assert rating.histogram == {1: 0, 2: 0, 3: 0, 4: 2, 5: 1}
+
+        async with session_factory() as session:
+            assert await get_vendor_rating(session, visits[0].vendor_id) == rating
+            reviewed = await session.get(Visit, visits[0].visit_id)
+            assert reviewed is not None and reviewed.status == VisitStatus.completed
+            events = (await session.execute(select(OutboxEvent).order_by(OutboxEvent.created_at))).scalars().all()
+        assert [json.loads(e.payload)["ratings_count"] for e in events] == [1, 2, 3]
+        assert json.loads(events[-1].payload)["average_rating"] == pytest.approx(13 / 3)
+
+    asyncio.run(run())
+
+
+def test_visit_cannot_be_reviewed_twice(engine: AsyncEngine) -> None:
+    async def run() -> None:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            await _seed(session, visits_count=1)
+            visit_id = (await session.execute(select(Visit.visit_id))).scalar_one()
+
+        async with session_factory() as session, session.begin():
+            await add_opinion_in_db(session, CLIENT, OpinionCreate(visit_id=visit_id, score=2))
+        with pytest.raises(HTTPException) as e:
+            async with session_factory() as session, session.begin():
+                await add_opinion_in_db(session, CLIENT, OpinionCreate(visit_id=visit_id, score=5))
+        assert e.value.status_code == 409
+
+        async with session_factory() as session:
+            rating = await get_vendor_rating(session, (await session.get(Visit, visit_id)).vendor_id)  # type: ignore[union-attr]
+        assert rating.ratings_count == 1 and rating.average_rating == 2
+
+    asyncio.run(run())
+
+
+def test_cancelled_visit_cannot_be_reviewed(engine: AsyncEngine) -> None:
+    async def run() -> None:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            await _seed(session, visits_count=1)
+            visit = (await session.execute(select(Visit))).scalar_one()
+            visit.status = VisitStatus.cancelled
+
+        with pytest.raises(HTTPException) as e:
+            async with session_factory() as session, session.begin():
+                await add_opinion_in_db(session, CLIENT, OpinionCreate(visit_id=visit.visit_id, score=5))
+        assert e.value.status_code == 400
+        assert e.value.detail == "Visit cannot be reviewed in its current status"
+
+    asyncio.run(run())
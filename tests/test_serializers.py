@@ -0,0 +1,85 @@
+import asyncio
+import uuid
+
+import orjson
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.orm import noload
+
+from tests.test_visit_listing import VENDOR_EMAIL, _address, _seed
+from visit_manager.app.models.user_models import AddressCreate, ServiceTypeEnum, UserSessionData, VendorCreate
+from visit_manager.postgres_utils.consts import DEPOSIT_GR
+from visit_manager.postgres_utils.models.models import OutboxEvent, ServiceType, User, Vendor
+from visit_manager.postgres_utils.models.users import register_as_vendor
+from visit_manager.postgres_utils.serializers import VENDOR_SERIALIZER
+
+
+def test_vendor_registration_event_payload(engine: AsyncEngine) -> None:
+    async def run() -> dict:  # type: ignore[type-arg]
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            session.add(ServiceType(name="plumber", description="Plumber for fixing plumbing problems"))
+            session.add(User(email="new.vendor@example.com", first_name="New", last_name="Vendor"))
+
+        address = _address()
+        vendor_data = VendorCreate(
+            vendor_name="Pipes Inc.",
+            phone_number="+48123456789",
+            service_types=[ServiceTypeEnum.PLUMBER],
+            address=AddressCreate(**{c: getattr(address, c) for c in AddressCreate.model_fields}),
+        )
+        async with session_factory() as session, session.begin():
+            await register_as_vendor(
+                session, UserSessionData(user_id="sub", user_email="new.vendor@example.com"), vendor_data
+            )
+        async with session_factory() as session:
+            event = (await session.execute(select(OutboxEvent))).scalar_one()
+        return orjson.loads(event.payload)  # type: ignore[no-any-return]
+
+    payload = asyncio.run(run())
+
+    assert uuid.UUID(payload.pop("vendor_id")) and uuid.UUID(payload.pop("address_id"))
+    assert payload == {
+        "vendor_name": "Pipes Inc.",
+        "required_deposit_gr": DEPOSIT_GR,
+        "phone_number": "+48123456789",
+        "is_active": True,
+        "user": {"email": "new.vendor@example.com", "first_name": "New", "last_name": "Vendor"},
+        "address": {
+            "latitude": 52.2297,
+            "longitude": 21.0122,
+            "street": "Nowowiejska 15/19",
+            "city": "Warszawa",
+            "state_or_region": "mazowieckie",
+            "country": "PL",
+            "zip_code": "00-665",
+        },
+        "service_types": [{"name": "plumber", "description": "Plumber for fixing plumbing problems"}],
+    }
+
+
+def test_unloaded_attributes_raise_without_io(engine: AsyncEngine, statements: list[str]) -> None:
+    async def run() -> Vendor:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            await _seed(session, visits_count=0)
+        async with session_factory() as session:
+            vendor = (
+                await session.execute(
+                    select(Vendor).options(noload(Vendor.user)).join(Vendor.user).where(User.email == VENDOR_EMAIL)
+                )
+            ).scalar_one()
+            statements.clear()
+            return vendor
+
+    vendor = asyncio.run(run())
+
+    with pytest.raises(InvalidRequestError, match="Vendor.address is not loaded"):
+        VENDOR_SERIALIZER.to_dict(vendor)
+    # as if expired
+    del vendor.__dict__["vendor_name"]
+    with pytest.raises(InvalidRequestError, match="Vendor.vendor_name is not loaded"):
+        VENDOR_SERIALIZER.to_dict(vendor)
+    assert statements == []
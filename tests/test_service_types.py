@@ -0,0 +1,99 @@
+import asyncio
+from typing import Any, Iterator
+
+import httpx
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from tests.test_visit_manage_responses import ADDRESS, _request, _seed_db
+from visit_manager.kafka_utils.handlers import reload_service_types
+from visit_manager.postgres_utils import utils
+from visit_manager.postgres_utils.models.models import ServiceType
+from visit_manager.postgres_utils.models.service_types import _service_type_cache, preload_service_types
+
+
+@pytest.fixture
+def app_engine(engine: AsyncEngine) -> Iterator[AsyncEngine]:
+    """`engine` as the process-wide engine, the one the startup preload and the Kafka handler use."""
+    utils.use_engine(engine)
+    yield engine
+    utils._engine_override.clear()
+    utils.get_async_engine.cache_clear()
+    utils.get_session_factory.cache_clear()
+
+
+def _register_vendor(engine: AsyncEngine, service_types: list[str]) -> httpx.Response:
+    json: dict[str, Any] = {
+        "vendor_name": "New Pipes",
+        "address": ADDRESS,
+        "phone_number": "+48123456789",
+        "service_types": service_types,
+    }
+    return _request(engine, "new.user@example.com", "POST", "/user/register_as_vendor", json=json)
+
+
+def _set_plumber_description(engine: AsyncEngine, description: str) -> None:
+    async def run() -> None:
+        async with async_sessionmaker(engine)() as session, session.begin():
+            await session.execute(
+                update(ServiceType).where(ServiceType.name == "plumber").values(description=description)
+            )
+
+    asyncio.run(run())
+
+
+def _service_type_selects(statements: list[str]) -> list[str]:
+    return [statement for statement in statements if "FROM service_type" in statement]
+
+
+def test_registration_reads_the_preloaded_service_types(app_engine: AsyncEngine, statements: list[str]) -> None:
+    _seed_db(app_engine, visits_count=0)
+    asyncio.run(preload_service_types())
+    statements.clear()
+
+    response = _register_vendor(app_engine, ["plumber"])
+
+    assert response.status_code == 200
+    assert response.json()["service_types"] == [
+        {"name": "plumber", "description": "Plumber for fixing plumbing problems"}
+    ]
+    assert _service_type_selects(statements) == []
+
+
+def test_unknown_service_types_are_rejected_from_the_cache(app_engine: AsyncEngine, statements: list[str]) -> None:
+    _seed_db(app_engine, visits_count=0)
+    asyncio.run(preload_service_types())
+    statements.clear()
+
+    assert _register_vendor(app_engine, ["electrician"]).status_code == 404
+    assert _register_vendor(app_engine, ["plumber", "plumber"]).status_code == 404
+    assert _service_type_selects(statements) == []
+
+
+def test_service_types_are_reloaded_once_their_ttl_passed(
+    app_engine: AsyncEngine, statements: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(_service_type_cache, "ttl", 0)
+    _seed_db(app_engine, visits_count=0)
+    asyncio.run(preload_service_types())
+    _set_plumber_description(app_engine, "Plumber")
+    statements.clear()
+
+    response = _register_vendor(app_engine, ["plumber"])
+
+    assert response.json()["service_types"] == [{"name": "plumber", "description": "Plumber"}]
+    assert len(_service_type_selects(statements)) == 1
+
+
+def test_service_types_changed_event_reloads_the_cache(app_engine: AsyncEngine, statements: list[str]) -> None:
+    _seed_db(app_engine, visits_count=0)
+    asyncio.run(preload_service_types())
+    _set_plumber_description(app_engine, "Plumber")
+
+    asyncio.run(reload_service_types([]))
+    statements.clear()
+    response = _register_vendor(app_engine, ["plumber"])
+
+    assert response.json()["service_types"] == [{"name": "plumber", "description": "Plumber"}]
+    assert _service_type_selects(statements) == []
@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+from benchmarks.startup import _child_env, run_benchmark
+
+# imported on first use or in the background once the app serves requests, never with the app
+DEFERRED = ("stripe", "kubernetes", "authlib")
+
+
+def test_importing_the_app_defers_heavy_dependencies() -> None:
+    process = subprocess.run(
+        [sys.executable, "-c", "import sys, visit_manager.app.main; print(' '.join(sorted(sys.modules)))"],
+        capture_output=True,
+        text=True,
+        env=_child_env(),
+        check=True,
+    )
+
+    imported = {module.split(".")[0] for module in process.stdout.split()}
+    assert imported.isdisjoint(DEFERRED)
+
+
+def test_startup_benchmark_starts_the_app() -> None:
+    report = run_benchmark(runs=1, top=5)
+
+    assert set(report["results"]) == {"import", "lifespan", "ready"}
+    assert all(0 < result["median_ms"] <= result["max_ms"] for result in report["results"].values())
+    assert len(report["import_ms_by_package"]) == 5 and "visit_manager" in report["import_ms_by_package"]
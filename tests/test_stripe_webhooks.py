@@ -0,0 +1,201 @@
+import asyncio
+import time
+from typing import Any
+
+import httpx
+import orjson
+import pytest
+import stripe
+from fastapi import FastAPI
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from visit_manager.app.models.payment_models import PaymentStatusEvent
+from visit_manager.app.routers import payment
+from visit_manager.postgres_utils.models.models import Payment, PaymentStatus, StripeEvent
+from visit_manager.postgres_utils.models.transaction import apply_payment_events
+from visit_manager.stripe_utils.webhooks import PaymentEventBatcher, get_payment_event_batcher, parse_payment_event
+
+SECRET = "whsec_test"
+
+
+def _signed(event: dict[str, Any], secret: str = SECRET) -> tuple[bytes, str]:
+    payload = orjson.dumps(event)
+    timestamp = int(time.time())
+    signature = stripe.WebhookSignature._compute_signature(f"{timestamp}.{payload.decode()}", secret)
+    return payload, f"t={timestamp},v1={signature}"
+
+
+def _charge_event(event_id: str, event_type: str, charge_id: str, created: int = 0, **charge: Any) -> dict[str, Any]:
+    return {
+        "id": event_id,
+        "type": event_type,
+        "created": created,
+        "data": {"object": {"id": charge_id, "object": "charge", **charge}},
+    }
+
+
+def _event(event_id: str, charge_id: str, status: PaymentStatus, created: int = 0) -> PaymentStatusEvent:
+    return PaymentStatusEvent(
+        event_id=event_id, event_type=f"charge.{status.value}", charge_id=charge_id, status=status, created=created
+    )
+
+
+def _seed_payments(engine: AsyncEngine, *statuses: PaymentStatus) -> None:
+    async def run() -> None:
+        async with async_sessionmaker(engine)() as session, session.begin():
+            session.add_all(
+                Payment(stripe_charge_id=f"ch_{i}", amount=1000, currency="pln", status=status)
+                for i, status in enumerate(statuses)
+            )
+
+    asyncio.run(run())
+
+
+def _statuses(engine: AsyncEngine) -> dict[str, PaymentStatus]:
+    async def run() -> dict[str, PaymentStatus]:
+        async with async_sessionmaker(engine)() as session:
+            result = await session.execute(select(Payment.stripe_charge_id, Payment.status))
+            return {charge_id: status for charge_id, status in result.tuples()}
+
+    return asyncio.run(run())
+
+
+def _apply(engine: AsyncEngine, events: list[PaymentStatusEvent]) -> int:
+    async def run() -> int:
+        async with async_sessionmaker(engine)() as session, session.begin():
+            return await apply_payment_events(session, events)
+
+    return asyncio.run(run())
+
+
+def test_batch_is_applied_with_two_statements(engine: AsyncEngine, statements: list[str]) -> None:
+    _seed_payments(engine, PaymentStatus.pending, PaymentStatus.pending, PaymentStatus.succeeded)
+    events = [
+        _event("evt_1", "ch_0", PaymentStatus.succeeded, created=1),
+        _event("evt_2", "ch_1", PaymentStatus.succeeded, created=1),
+        # the most recent event of a charge wins, whatever the delivery order
+        _event("evt_3", "ch_1", PaymentStatus.refunded, created=3),
+        _event("evt_4", "ch_1", PaymentStatus.failed, created=2),
+        _event("evt_5", "ch_2", PaymentStatus.refunded, created=1),
+        # unknown charge
+        _event("evt_6", "ch_404", PaymentStatus.succeeded, created=1),
+    ]
+
+    statements.clear()
+    assert _apply(engine, events) == 3
+    assert [s.split()[0] for s in statements] == ["INSERT", "UPDATE"]
+    assert _statuses(engine) == {
+        "ch_0": PaymentStatus.succeeded,
+        "ch_1": PaymentStatus.refunded,
+        "ch_2": PaymentStatus.refunded,
+    }
+
+
+def test_events_are_applied_once(engine: AsyncEngine) -> None:
+    _seed_payments(engine, PaymentStatus.succeeded)
+    refunded = _event("evt_1", "ch_0", PaymentStatus.refunded, created=1)
+    assert _apply(engine, [refunded, refunded]) == 1
+
+    # redelivered refund is a no-op, an old event does not move a refunded payment back
+    late = _event("evt_2", "ch_0", PaymentStatus.succeeded, created=0)
+    assert _apply(engine, [refunded, late]) == 0
+    assert _statuses(engine) == {"ch_0": PaymentStatus.refunded}
+
+    async def event_ids() -> list[str]:
+        async with async_sessionmaker(engine)() as session:
+            return list((await session.execute(select(StripeEvent.event_id).order_by(StripeEvent.event_id))).scalars())
+
+    assert asyncio.run(event_ids()) == ["evt_1", "evt_2"]
+
+
+def test_older_event_of_a_later_batch_does_not_overwrite_the_status(engine: AsyncEngine) -> None:
+    _seed_payments(engine, PaymentStatus.pending)
+    assert _apply(engine, [_event("evt_2", "ch_0", PaymentStatus.failed, created=2)]) == 1
+
+    # delivered after the failure it preceded
+    assert _apply(engine, [_event("evt_1", "ch_0", PaymentStatus.succeeded, created=1)]) == 0
+    assert _statuses(engine) == {"ch_0": PaymentStatus.failed}
+
+    assert _apply(engine, [_event("evt_3", "ch_0", PaymentStatus.succeeded, created=3)]) == 1
+    assert _statuses(engine) == {"ch_0": PaymentStatus.succeeded}
+
+
+def test_update_joins_a_values_list_on_postgres() -> None:
+    captured: list[str] = []
+
+    class CapturingSession:
+        async def execute(self, statement: Any) -> Any:
+            captured.append(str(statement.compile(dialect=postgresql.dialect())))
+
+            class Result:
+                rowcount = 1
+
+                def scalars(self) -> list[str]:
+                    return ["evt_1", "evt_2"]
+
+            return Result()
+
+    events = [_event("evt_1", "ch_0", PaymentStatus.refunded), _event("evt_2", "ch_1", PaymentStatus.failed)]
+    asyncio.run(apply_payment_events(CapturingSession(), events))  # type: ignore[arg-type]
+
+    assert "ON CONFLICT (event_id) DO NOTHING RETURNING stripe_event.event_id" in captured[0]
+    assert (
+        "FROM (VALUES (%(param_1)s, %(param_2)s, %(param_3)s), (%(param_4)s, %(param_5)s, %(param_6)s)) AS changes"
+        in captured[1]
+    )
+    assert "WHERE payment.stripe_charge_id = changes.stripe_charge_id" in captured[1]
+
+
+def test_parse_payment_event() -> None:
+    payload, signature = _signed(_charge_event("evt_1", "charge.refunded", "ch_1", created=7, refunded=True))
+    assert parse_payment_event(payload, signature, SECRET, tolerance_s=300) == PaymentStatusEvent(
+        event_id="evt_1", event_type="charge.refunded", charge_id="ch_1", status=PaymentStatus.refunded, created=7
+    )
+
+    partial_refund, signature = _signed(_charge_event("evt_2", "charge.refunded", "ch_1", refunded=False))
+    assert parse_payment_event(partial_refund, signature, SECRET, tolerance_s=300).status is None
+
+    other, signature = _signed(_charge_event("evt_3", "charge.updated", "ch_1"))
+    assert parse_payment_event(other, signature, SECRET, tolerance_s=300).status is None
+
+    with pytest.raises(stripe.SignatureVerificationError):
+        parse_payment_event(payload, _signed({"id": "evt_1"}, "whsec_other")[1], SECRET, tolerance_s=300)
+
+
+def test_webhook_burst_is_applied_in_batches(
+    engine: AsyncEngine, statements: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(payment._settings, "WEBHOOK_SECRET", SECRET)
+    _seed_payments(engine, *[PaymentStatus.succeeded] * 20)
+
+    async def run() -> list[int]:
+        batcher = PaymentEventBatcher(async_sessionmaker(engine), batch_size=10, max_delay_s=0.05, max_pending=100)
+        app = FastAPI()
+        app.include_router(payment.router)
+        app.dependency_overrides[get_payment_event_batcher] = lambda: batcher
+        batcher.start()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+
+            async def send(event: dict[str, Any]) -> int:
+                payload, signature = _signed(event)
+                response = await client.post(
+                    "/payment/webhook", content=payload, headers={"Stripe-Signature": signature}
+                )
+                return response.status_code
+
+            codes = await asyncio.gather(
+                *(send(_charge_event(f"evt_{i}", "charge.refunded", f"ch_{i}", refunded=True)) for i in range(20))
+            )
+            forged = await client.post("/payment/webhook", content=b"{}", headers={"Stripe-Signature": "t=1,v1=forged"})
+            codes.append(forged.status_code)
+        await batcher.stop()
+        return codes
+
+    statements.clear()
+    assert asyncio.run(run()) == [200] * 20 + [400]
+    # two full batches, unless the requests trickled in slower than max_delay_s
+    assert 2 <= sum(statement.startswith("UPDATE") for statement in statements) <= 4
+    assert set(_statuses(engine).values()) == {PaymentStatus.refunded}
@@ -0,0 +1,155 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Iterator
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from visit_manager.app.middleware import TracingMiddleware
+from visit_manager.kafka_utils.common import KafkaTopics
+from visit_manager.kafka_utils.consumer import _decode
+from visit_manager.kafka_utils.outbox import relay_outbox_batch
+from visit_manager.kafka_utils.producer import AsyncKafkaProducer
+from visit_manager.package_utils.settings import VisitManagerSettings
+from visit_manager.package_utils.tracing import _file_exporter, configure_tracing, tracer
+from visit_manager.postgres_utils.models.models import OutboxEvent, Payment
+from visit_manager.postgres_utils.models.outbox import add_outbox_event
+from visit_manager.postgres_utils.utils import instrument_engine
+
+TRACE_ID = "0af7651916cd43dd8448eb211c80319c"
+TRACEPARENT = f"00-{TRACE_ID}-b7ad6b7169203331-01"
+
+_exporter = InMemorySpanExporter()
+
+
+@pytest.fixture
+def spans() -> Iterator[InMemorySpanExporter]:
+    """Spans finished while the test runs, every trace is sampled."""
+    if not isinstance(trace.get_tracer_provider(), TracerProvider):
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(_exporter))
+        trace.set_tracer_provider(provider)
+    _exporter.clear()
+    yield _exporter
+
+
+class FakeMessage:
+    def __init__(self, headers: list[tuple[str, bytes]]) -> None:
+        self._headers = headers
+
+    def value(self) -> bytes:
+        return b'{"event_type": "vendor_registered"}'
+
+    def key(self) -> None:
+        return None
+
+    def headers(self) -> list[tuple[str, bytes]]:
+        return self._headers
+
+    def topic(self) -> str:
+        return "users"
+
+    def partition(self) -> int:
+        return 0
+
+    def offset(self) -> int:
+        return 7
+
+
+def test_request_span_continues_the_callers_trace(engine: AsyncEngine, spans: InMemorySpanExporter) -> None:
+    instrument_engine(engine)
+    router = APIRouter(prefix="/payment")
+
+    @router.get("/{payment_id}")
+    async def get_payment(payment_id: str) -> None:
+        async with async_sessionmaker(engine)() as session:
+            await session.execute(select(Payment).where(Payment.stripe_charge_id == payment_id))
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(TracingMiddleware)
+
+    async def run() -> None:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/payment/ch_1", headers={"traceparent": TRACEPARENT})
+            assert response.status_code == 200
+
+    asyncio.run(run())
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    server, statement = finished["GET /payment/{payment_id}"], finished["SELECT"]
+    assert format(server.context.trace_id, "032x") == TRACE_ID
+    assert server.attributes is not None and server.attributes["http.response.status_code"] == 200
+    assert statement.parent is not None and statement.parent.span_id == server.context.span_id
+    assert statement.attributes is not None and "ch_1" not in str(statement.attributes["db.query.text"])
+
+
+def test_outbox_messages_continue_the_trace_that_wrote_them(engine: AsyncEngine, spans: InMemorySpanExporter) -> None:
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def run() -> None:
+        with tracer.start_as_current_span("POST /visit/book") as request_span:
+            async with session_factory() as session, session.begin():
+                add_outbox_event(session, KafkaTopics.USERS, b"{}")
+        async with session_factory() as session:
+            [stored] = (await session.execute(select(OutboxEvent.trace_context))).scalars()
+        assert stored is not None and format(request_span.get_span_context().trace_id, "032x") in stored
+
+        # unreachable broker, the delivery fails and ends the span
+        producer = AsyncKafkaProducer({"bootstrap.servers": "127.0.0.1:1", "message.timeout.ms": 100})
+        try:
+            assert await relay_outbox_batch(session_factory, producer, batch_size=10, delivery_timeout=5) == 0
+        finally:
+            producer.close(timeout=1)
+
+    asyncio.run(run())
+    finished = {span.name: span for span in spans.get_finished_spans()}
+    request, publish = finished["POST /visit/book"], finished["publish users"]
+    assert publish.parent is not None and publish.parent.span_id == request.context.span_id
+    assert publish.kind is trace.SpanKind.PRODUCER and not publish.status.is_ok
+
+
+def test_consumed_message_joins_the_producers_trace(spans: InMemorySpanExporter) -> None:
+    event = _decode(FakeMessage([("traceparent", TRACEPARENT.encode())]))
+    assert event.span_context is not None and format(event.span_context.trace_id, "032x") == TRACE_ID
+
+    # without trace context, a trace of its own
+    assert _decode(FakeMessage([])).span_context.trace_id != event.span_context.trace_id  # type: ignore[union-attr]
+    assert [span.name for span in spans.get_finished_spans()] == ["receive users", "receive users"]
+
+
+def test_produce_failure_ends_the_span(spans: InMemorySpanExporter) -> None:
+    async def run() -> Any:
+        producer = AsyncKafkaProducer({"bootstrap.servers": "127.0.0.1:1", "queue.buffering.max.messages": 1})
+        try:
+            producer.produce("users", b"{}")
+            return await producer.produce("users", b"{}")
+        finally:
+            producer.close(timeout=0)
+
+    with pytest.raises(BufferError):
+        asyncio.run(run())
+    assert [span.name for span in spans.get_finished_spans()] == ["publish users"]
+
+
+def test_tracing_is_off_by_default() -> None:
+    assert configure_tracing(VisitManagerSettings()) is None
+
+
+def test_file_exporter_writes_a_span_per_line(tmp_path: Path, spans: InMemorySpanExporter) -> None:
+    with tracer.start_as_current_span("first"), tracer.start_as_current_span("second"):
+        pass
+    exporter = _file_exporter(str(tmp_path / "traces.jsonl"))
+    exporter.export(spans.get_finished_spans())
+    exporter.shutdown()
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["second", "first"]
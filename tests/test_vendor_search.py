@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from visit_manager.app.models.user_models import ServiceTypeEnum, VendorSearchFilters
+from visit_manager.postgres_utils.models.models import Address, ServiceType, User, Vendor
+from visit_manager.postgres_utils.models.vendors import search_vendors_nearby
+
+# Warsaw, Palace of Culture and Science
+CENTER = (52.2318, 21.0060)
+
+
+async def _add_vendor(
+    session: AsyncSession,
+    name: str,
+    latitude: float,
+    longitude: float,
+    service_type: ServiceType,
+    is_active: bool = True,
+) -> None:
+    user = User(email=f"{name}@example.com", first_name=name, last_name="Vendor")
+    session.add(user)
+    await session.flush()
+    session.add(
+        Vendor(
+            vendor_id=user.user_id,
+            vendor_name=name,
+            phone_number="+48123456789",
+            address=Address(
+                latitude=latitude,
+                longitude=longitude,
+                street="Street 1",
+                city="City",
+                state_or_region="region",
+                country="PL",
+                zip_code="00-000",
+            ),
+            offered_service_types=[service_type],
+            is_active=is_active,
+        )
+    )
+
+
+def _search(
+    engine: AsyncEngine, vendors: list[tuple[str, float, float, str, bool]], **filters: object
+) -> list[list[str]]:
+    """Names of the vendors found, page by page."""
+
+    async def run() -> list[list[str]]:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            service_types = {
+                name: ServiceType(name=name, description=name) for name in {v[3] for v in vendors} | {"plumber"}
+            }
+            session.add_all(service_types.values())
+            for name, latitude, longitude, service_type, is_active in vendors:
+                await _add_vendor(session, name, latitude, longitude, service_types[service_type], is_active)
+
+        pages, cursor = [], None
+        while True:
+            async with session_factory() as session:
+                page = await search_vendors_nearby(
+                    session, VendorSearchFilters(service_type=ServiceTypeEnum.PLUMBER, cursor=cursor, **filters)
+                )
+            pages.append([item.vendor_name for item in page.items])
+            if page.next_cursor is None:
+                return pages
+            cursor = page.next_cursor
+
+    return asyncio.run(run())
+
+
+def test_search_returns_nearest_matching_vendors_first(engine: AsyncEngine) -> None:
+    vendors = [
+        ("mokotow", 52.1939, 21.0455, "plumber", True),  # ~5 km
+        ("srodmiescie", 52.2297, 21.0122, "plumber", True),  # ~0.5 km
+        ("wola", 52.2361, 20.9596, "plumber", True),  # ~3 km
+        ("painter", 52.2320, 21.0061, "painter", True),
+        ("inactive", 52.2319, 21.0061, "plumber", False),
+        ("piaseczno", 52.0812, 21.0238, "plumber", True),  # ~17 km
+        ("krakow", 50.0614, 19.9366, "plumber", True),
+    ]
+
+    pages = _search(engine, vendors, latitude=CENTER[0], longitude=CENTER[1], radius_km=10, limit=2)
+
+    assert pages == [["srodmiescie", "wola"], ["mokotow"]]
+
+
+def test_search_distance_is_reported_in_km(engine: AsyncEngine) -> None:
+    async def run() -> float:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            plumber = ServiceType(name="plumber", description="plumber")
+            # Warsaw University of Technology
+            await _add_vendor(session, "politechnika", 52.2206, 21.0100, plumber)
+        async with session_factory() as session:
+            page = await search_vendors_nearby(
+                session,
+                VendorSearchFilters(service_type=ServiceTypeEnum.PLUMBER, latitude=CENTER[0], longitude=CENTER[1]),
+            )
+        return page.items[0].distance_km
+
+    assert asyncio.run(run()) == pytest.approx(1.27, abs=0.01)
+
+
+@pytest.mark.parametrize("longitude", [179.99, -179.99])
+def test_search_crosses_the_antimeridian(engine: AsyncEngine, longitude: float) -> None:
+    vendors = [("east", -16.5, 179.95, "plumber", True), ("west", -16.5, -179.95, "plumber", True)]
+
+    pages = _search(engine, vendors, latitude=-16.5, longitude=longitude, radius_km=20)
+
+    nearest = "east" if longitude > 0 else "west"
+    assert pages == [[nearest, "west" if nearest == "east" else "east"]]
@@ -0,0 +1,98 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from tests.test_visit_listing import CLIENT_EMAIL, VENDOR_EMAIL, _seed
+from visit_manager.app.models.user_models import BulkVisitResult, VisitCreateEvent
+from visit_manager.postgres_utils.models.models import Visit
+from visit_manager.postgres_utils.models.visits import bulk_ingest_visits
+
+
+def _event(key: str, hour: int, vendor_email: str = VENDOR_EMAIL) -> VisitCreateEvent:
+    start = datetime(2025, 7, 1, 8, 0) + timedelta(hours=hour)
+    return VisitCreateEvent(
+        idempotency_key=key,
+        vendor_email=vendor_email,
+        client_email=CLIENT_EMAIL,
+        start_time=start,
+        end_time=start + timedelta(minutes=30),
+    )
+
+
+def _ingest(engine: AsyncEngine, statements: list[str], *batches: list[VisitCreateEvent]) -> list[BulkVisitResult]:
+    async def run() -> list[BulkVisitResult]:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            await _seed(session, visits_count=0)
+
+        statements.clear()
+        reports = []
+        for batch in batches:
+            async with session_factory() as session, session.begin():
+                reports.append(await bulk_ingest_visits(session, batch))
+        return reports
+
+    return asyncio.run(run())
+
+
+def _count_visits(engine: AsyncEngine) -> int:
+    async def run() -> int:
+        async with async_sessionmaker(engine)() as session:
+            return (await session.execute(select(func.count()).select_from(Visit))).scalar_one()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("visits_count", [1, 50, 500])
+def test_ingestion_statement_count_does_not_grow_with_batch(
+    engine: AsyncEngine, statements: list[str], visits_count: int
+) -> None:
+    (report,) = _ingest(engine, statements, [_event(str(i), i) for i in range(visits_count)])
+
+    assert len(report.inserted) == visits_count
+    # vendor lookup, client lookup, one INSERT
+    assert len(statements) == 3
+    assert _count_visits(engine) == visits_count
+
+
+def test_redelivered_events_are_reported_as_duplicates(engine: AsyncEngine, statements: list[str]) -> None:
+    batch = [_event("a", 0), _event("b", 1)]
+    first, second = _ingest(engine, statements, batch, batch + [_event("a", 0), _event("c", 2)])
+
+    assert first.inserted == ["a", "b"]
+    assert second.inserted == ["c"]
+    assert sorted(second.duplicates) == ["a", "a", "b"]
+    assert _count_visits(engine) == 3
+
+
+def test_invalid_events_do_not_fail_the_batch(engine: AsyncEngine, statements: list[str]) -> None:
+    backwards = _event("backwards", 2)
+    backwards.end_time = backwards.start_time - timedelta(minutes=30)
+    (report,) = _ingest(
+        engine,
+        statements,
+        [_event("ok", 0), _event("unknown", 1, vendor_email="nobody@example.com"), backwards],
+    )
+
+    assert report.inserted == ["ok"]
+    assert {(f.idempotency_key, f.reason) for f in report.failures} == {
+        ("unknown", "Vendor not found"),
+        ("backwards", "Visit must end after it starts"),
+    }
+    assert _count_visits(engine) == 1
+
+
+def test_event_times_are_compared_without_their_offsets(engine: AsyncEngine, statements: list[str]) -> None:
+    mixed = _event("mixed", 0)
+    mixed.end_time = mixed.end_time.replace(tzinfo=timezone.utc)
+    # ends after it starts as instants, but before it starts once the offsets are dropped
+    offsets = _event("offsets", 1)
+    offsets.start_time = offsets.start_time.replace(tzinfo=timezone(timedelta(hours=2)))
+    offsets.end_time = (offsets.start_time - timedelta(minutes=30)).replace(tzinfo=timezone.utc)
+    (report,) = _ingest(engine, statements, [mixed, offsets])
+
+    assert report.inserted == ["mixed"]
+    assert {(f.idempotency_key, f.reason) for f in report.failures} == {("offsets", "Visit must end after it starts")}
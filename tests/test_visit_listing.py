@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from visit_manager.app.models.user_models import UserSessionData, VisitFilters
+from visit_manager.postgres_utils.models.models import Address, Client, ServiceType, User, Vendor, Visit, VisitStatus
+from visit_manager.postgres_utils.models.service_types import get_service_types
+from visit_manager.postgres_utils.models.users import get_my_visits_from_db
+
+VENDOR_EMAIL = "vendor@example.com"
+CLIENT_EMAIL = "client@example.com"
+
+
+def _address() -> Address:
+    return Address(
+        latitude=52.2297,
+        longitude=21.0122,
+        street="Nowowiejska 15/19",
+        city="Warszawa",
+        state_or_region="mazowieckie",
+        country="PL",
+        zip_code="00-665",
+    )
+
+
+async def _seed(session: AsyncSession, visits_count: int) -> None:
+    plumber = ServiceType(name="plumber", description="Plumber for fixing plumbing problems")
+    vendor_user = User(email=VENDOR_EMAIL, first_name="Vendor", last_name="User")
+    client_user = User(email=CLIENT_EMAIL, first_name="Client", last_name="User")
+    session.add_all([plumber, vendor_user, client_user])
+    await session.flush()
+
+    vendor = Vendor(
+        vendor_id=vendor_user.user_id,
+        vendor_name="Pipes Inc.",
+        phone_number="+48123456789",
+        address=_address(),
+        offered_service_types=[plumber],
+        # server_default="true" is stored verbatim by SQLite
+        is_active=True,
+    )
+    client = Client(client_id=client_user.user_id, phone_number="+48987654321", address=_address(), is_active=True)
+    session.add_all([vendor, client])
+    await session.flush()
+
+    start = datetime(2025, 6, 1, 8, 0)
+    session.add_all(
+        Visit(
+            vendor_id=vendor.vendor_id,
+            client_id=client.client_id,
+            start_timestamp=start + timedelta(hours=i),
+            end_timestamp=start + timedelta(hours=i, minutes=30),
+            description="Example description",
+            service_type_id=plumber.service_type_id,
+            address_id=client.address_id,
+            status=VisitStatus.confirmed,
+        )
+        for i in range(visits_count)
+    )
+
+
+def _list_visits(engine: AsyncEngine, statements: list[str], visits_count: int, email: str) -> int:
+    async def run() -> int:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            await _seed(session, visits_count)
+        async with session_factory() as session:
+            # as preloaded at startup
+            await get_service_types(session)
+
+        statements.clear()
+        async with session_factory() as session, session.begin():
+            page = await get_my_visits_from_db(
+                session, UserSessionData(user_id="sub", user_email=email), VisitFilters(limit=200)
+            )
+        assert len(page.items) == visits_count
+        assert all(v.vendor_name == "Pipes Inc." and v.service_type.value == "plumber" for v in page.items)
+        return len(statements)
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("email", [VENDOR_EMAIL, CLIENT_EMAIL])
+@pytest.mark.parametrize("visits_count", [1, 10, 200])
+def test_visit_listing_statement_count_does_not_grow_with_visits(
+    engine: AsyncEngine, statements: list[str], email: str, visits_count: int
+) -> None:
+    # one lookup of the user and its profiles, one select of the visits with the vendor joined,
+    # service type names come from the cache
+    assert _list_visits(engine, statements, visits_count, email) == 2
+
+
+def test_visit_listing_pages_through_history_with_cursor(engine: AsyncEngine) -> None:
+    async def run() -> None:
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        async with session_factory() as session, session.begin():
+            await _seed(session, 25)
+
+        user = UserSessionData(user_id="sub", user_email=VENDOR_EMAIL)
+        seen: list[str] = []
+        cursor = None
+        async with session_factory() as session:
+            while True:
+                page = await get_my_visits_from_db(session, user, VisitFilters(limit=10, cursor=cursor))
+                seen.extend(v.visit_id for v in page.items)
+                if page.next_cursor is None:
+                    break
+                cursor = page.next_cursor
+
+            window = await get_my_visits_from_db(
+                session,
+                user,
+                VisitFilters(from_time=datetime(2025, 6, 1, 10, 0), to_time=datetime(2025, 6, 1, 13, 0)),
+            )
+
+        assert len(seen) == len(set(seen)) == 25
+        assert [v.start_time.hour for v in window.items] == [10, 11, 12]
+        assert window.next_cursor is None
+
+    asyncio.run(run())
@@ -0,0 +1,165 @@
+import asyncio
+import uuid
+from typing import Any, AsyncIterator
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from tests.test_visit_listing import CLIENT_EMAIL, VENDOR_EMAIL, _seed
+from visit_manager.app.models.user_models import UserSessionData
+from visit_manager.app.routers import visit_manage
+from visit_manager.app.security.common import get_current_user
+from visit_manager.postgres_utils.consts import DEPOSIT_GR
+from visit_manager.postgres_utils.models.models import User
+from visit_manager.postgres_utils.utils import get_db
+
+ADDRESS = {
+    "latitude": 52.2297,
+    "longitude": 21.0122,
+    "street": "Nowowiejska 15/19",
+    "city": "Warszawa",
+    "state_or_region": "mazowieckie",
+    "country": "PL",
+    "zip_code": "00-665",
+}
+
+
+def _app(engine: AsyncEngine, email: str) -> FastAPI:
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def get_test_db() -> AsyncIterator[AsyncSession]:
+        async with session_factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(visit_manage.router)
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_current_user] = lambda: UserSessionData(user_id="sub", user_email=email)
+    return app
+
+
+def _request(engine: AsyncEngine, email: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+    async def run() -> httpx.Response:
+        transport = httpx.ASGITransport(app=_app(engine, email))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+
+    return asyncio.run(run())
+
+
+def _seed_db(engine: AsyncEngine, visits_count: int) -> None:
+    async def run() -> None:
+        async with async_sessionmaker(engine)() as session, session.begin():
+            await _seed(session, visits_count)
+            session.add(User(email="new.user@example.com", first_name="New", last_name="User"))
+
+    asyncio.run(run())
+
+
+def test_my_visits_response(engine: AsyncEngine) -> None:
+    _seed_db(engine, visits_count=3)
+
+    response = _request(engine, CLIENT_EMAIL, "GET", "/user/my_visits")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    body = response.json()
+    assert body["next_cursor"] is None
+    assert [visit["start_time"] for visit in body["items"]] == [
+        "2025-06-01T08:00:00",
+        "2025-06-01T09:00:00",
+        "2025-06-01T10:00:00",
+    ]
+    assert body["items"][0]["service_type"] == "plumber" and body["items"][0]["status"] == "confirmed"
+
+
+def test_register_as_vendor_response(engine: AsyncEngine) -> None:
+    _seed_db(engine, visits_count=0)
+
+    response = _request(
+        engine,
+        "new.user@example.com",
+        "POST",
+        "/user/register_as_vendor",
+        json={
+            "vendor_name": "New Pipes",
+            "address": ADDRESS,
+            "phone_number": "+48123456789",
+            "service_types": ["plumber"],
+        },
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert uuid.UUID(body.pop("vendor_id")) and uuid.UUID(body.pop("address_id"))
+    assert body == {
+        "vendor_name": "New Pipes",
+        "phone_number": "+48123456789",
+        "required_deposit_gr": DEPOSIT_GR,
+        "is_active": True,
+        "user": {"email": "new.user@example.com", "first_name": "New", "last_name": "User"},
+        "address": ADDRESS,
+        "service_types": [{"name": "plumber", "description": "Plumber for fixing plumbing problems"}],
+    }
+
+
+def test_register_as_client_response(engine: AsyncEngine) -> None:
+    _seed_db(engine, visits_count=0)
+
+    response = _request(
+        engine,
+        VENDOR_EMAIL,
+        "POST",
+        "/user/register_as_client",
+        json={"phone_number": "+48111222333", "address": ADDRESS},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert uuid.UUID(body["client_id"]) and uuid.UUID(body["address_id"])
+    assert body["phone_number"] == "+48111222333"
+    assert body["address"] == ADDRESS
+
+
+def test_book_visit_response(engine: AsyncEngine) -> None:
+    _seed_db(engine, visits_count=0)
+
+    response = _request(
+        engine,
+        CLIENT_EMAIL,
+        "POST",
+        "/user/book_visit",
+        json={"start_time": "2025-07-01T10:00:00", "end_time": "2025-07-01T11:00:00", "vendor_email": VENDOR_EMAIL},
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert uuid.UUID(body["visit_id"])
+    assert body["start_timestamp"] == "2025-07-01T10:00:00" and body["end_timestamp"] == "2025-07-01T11:00:00"
+    assert body["status"] == "confirmed"
+
+
+def test_book_visit_compares_the_stored_wall_clock_times(engine: AsyncEngine) -> None:
+    _seed_db(engine, visits_count=0)
+
+    def book(start_time: str, end_time: str) -> httpx.Response:
+        json = {"start_time": start_time, "end_time": end_time, "vendor_email": VENDOR_EMAIL}
+        return _request(engine, CLIENT_EMAIL, "POST", "/user/book_visit", json=json)
+
+    mixed = book("2025-07-01T10:00:00", "2025-07-01T11:00:00+02:00")
+    # ends after it starts as instants, but before it starts once the offsets are dropped
+    offsets = book("2025-07-02T10:00:00+02:00", "2025-07-02T09:00:00Z")
+
+    assert mixed.status_code == 200
+    assert mixed.json()["end_timestamp"] == "2025-07-01T11:00:00"
+    assert offsets.status_code == 400
+
+
+def test_errors_keep_the_default_error_body(engine: AsyncEngine) -> None:
+    _seed_db(engine, visits_count=0)
+
+    response = _request(engine, "nobody@example.com", "GET", "/user/me")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "User not found"}
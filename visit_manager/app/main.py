@@ -1,40 +1,87 @@
-import os
-import threading
+import asyncio
+import contextlib
+import importlib
 from contextlib import asynccontextmanager
 from typing import Any, AsyncGenerator
 
+from decouple import config
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from prometheus_client import make_asgi_app
 from starlette.middleware.sessions import SessionMiddleware
 
+from visit_manager.app.middleware import QueryCounterMiddleware, RequestMetricsMiddleware, TracingMiddleware
 from visit_manager.app.routers import auth, payment, visit_manage
-from visit_manager.kafka_utils.common import enable_listen_to_kafka
+from visit_manager.kafka_utils import handlers  # noqa: F401  # registers the Kafka event handlers
+from visit_manager.kafka_utils.consumer import create_kafka_consumer
+from visit_manager.kafka_utils.outbox import run_outbox_relay
+from visit_manager.kafka_utils.producer import close_producer
+from visit_manager.package_utils.http_client import create_http_client
 from visit_manager.package_utils.logger_conf import logger
 from visit_manager.package_utils.settings import VisitManagerSettings
-from visit_manager.postgres_utils.utils import create_tables
+from visit_manager.package_utils.tracing import configure_tracing
+from visit_manager.postgres_utils.models.service_types import preload_service_types
+from visit_manager.stripe_utils.gateway import create_payment_gateway
+from visit_manager.stripe_utils.webhooks import create_payment_event_batcher
+
+# heavy modules only some endpoints need, imported in the background once the app serves requests
+DEFERRED_IMPORTS = ("stripe", "authlib.integrations.starlette_client")
+
+
+def _import_deferred() -> None:
+    for module in DEFERRED_IMPORTS:
+        importlib.import_module(module)
 
 
 @asynccontextmanager
 async def lifespan(turbo_app: FastAPI) -> AsyncGenerator[None, Any]:
-    logger.info("Initializing database connection...")
-    await create_tables()
-    logger.info("Starting Kafka consumer thread...")
-    thread = threading.Thread(target=enable_listen_to_kafka, daemon=True)
-    thread.start()
+    # the schema is created by the migration command (visit_manager.postgres_utils.migrate), not here
+    tracer_provider = configure_tracing()
+    deferred_imports = asyncio.create_task(asyncio.to_thread(_import_deferred))
+    # in the background too, a lookup before it finishes loads the service types itself
+    service_types_preload = asyncio.create_task(preload_service_types())
+    turbo_app.state.http_client = create_http_client()
+    turbo_app.state.payment_gateway = create_payment_gateway()
+    turbo_app.state.payment_event_batcher = create_payment_event_batcher()
+    turbo_app.state.payment_event_batcher.start()
+    logger.info("Starting Kafka consumer...")
+    consumer = create_kafka_consumer()
+    consumer.start()
+    stop_outbox_relay = asyncio.Event()
+    outbox_relay = asyncio.create_task(run_outbox_relay(stop_outbox_relay))
     yield  # App runs while this context is active
     logger.info("App is shutting down.")
+    await deferred_imports
+    service_types_preload.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await service_types_preload
+    await turbo_app.state.payment_event_batcher.stop()
+    await consumer.stop()
+    stop_outbox_relay.set()
+    await outbox_relay
+    await close_producer()
+    await turbo_app.state.http_client.aclose()
+    if turbo_app.state.payment_gateway is not None:
+        await turbo_app.state.payment_gateway.close()
+    if tracer_provider is not None:
+        # export the spans still buffered
+        tracer_provider.shutdown()
+
 
+_settings = VisitManagerSettings()
 
 app = FastAPI(
     lifespan=lifespan,
-    root_path=VisitManagerSettings().ROOT_PATH,
+    root_path=_settings.ROOT_PATH,
+    default_response_class=ORJSONResponse,
 )
 
 
 # OAuth Setup
 app.add_middleware(
     SessionMiddleware,
-    secret_key=os.getenv("FASTAPI_SECRET_KEY"),
+    secret_key=config("FASTAPI_SECRET_KEY", default=None),
     https_only=False,  # Allow HTTP for development
     same_site="lax",  # Better compatibility for OAuth redirects
 )
@@ -43,6 +90,8 @@ app.include_router(visit_manage.router)
 app.include_router(payment.router)
 app.include_router(auth.router)
 
+app.mount("/metrics", make_asgi_app())
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -50,3 +99,10 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+if _settings.QUERY_COUNTER:
+    app.add_middleware(QueryCounterMiddleware, n_plus_one_threshold=_settings.QUERY_COUNTER_N_PLUS_ONE_THRESHOLD)
+
+# outermost, so the time spent in the other middlewares is included
+app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
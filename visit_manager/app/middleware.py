@@ -0,0 +1,127 @@
+import time
+
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.metrics import HTTP_REQUEST_DURATION_SECONDS
+from visit_manager.package_utils.tracing import extract_trace_context, tracer
+from visit_manager.postgres_utils.query_counter import count_queries
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the duration of every HTTP request in HTTP_REQUEST_DURATION_SECONDS.
+
+    Requests are labelled with the template of the route that handled them (`/visit/{visit_id}`), never with
+    the raw path, so the number of series stays bounded; requests no API route matched share one label.
+    A plain ASGI middleware rather than BaseHTTPMiddleware, which would wrap every response body in a stream.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # the router sets the matched route in the scope shared with this middleware
+            route = scope.get("route")
+            template = getattr(route, "path", None) or UNMATCHED_ROUTE
+            HTTP_REQUEST_DURATION_SECONDS.labels(scope["method"], template, str(status)).observe(
+                time.perf_counter() - start
+            )
+
+
+class TracingMiddleware:
+    """
+    Run every HTTP request in a server span, named after the route template like the metrics above.
+
+    The span continues the caller's trace when the request carries W3C trace context headers; the SQL
+    statements, Kafka messages and Stripe calls made while handling the request become its children.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            method,
+            context=extract_trace_context(headers),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as span:
+
+            async def send_with_status(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route is not None:
+                    span.update_name(f"{method} {route}")
+                    span.set_attribute("http.route", route)
+
+
+class QueryCounterMiddleware:
+    """
+    Count the SQL statements of every request and the time spent executing them (opt-in, see
+    VisitManagerSettings.QUERY_COUNTER), reported in the `X-DB-Query-Count` and `X-DB-Time-Ms` response headers
+    and logged. A statement repeated `n_plus_one_threshold` times within the request is logged as a likely N+1.
+    Statements executed after the response started, by a streamed body, are logged but not in the headers.
+    """
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 5):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with count_queries() as stats:
+
+            async def send_with_headers(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    headers["X-DB-Query-Count"] = str(stats.statements)
+                    headers["X-DB-Time-Ms"] = f"{stats.duration_s * 1000:.2f}"
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                logger.info(
+                    f"{scope['method']} {route}: {stats.statements} statements in {stats.duration_s * 1000:.2f} ms"
+                )
+                for shape, count in stats.repeated(self.n_plus_one_threshold).items():
+                    logger.warning(f"Likely N+1 in {scope['method']} {route}, statement run {count} times: {shape}")
@@ -19,8 +19,32 @@ class ChargeResponse(BaseModel):
     transaction_timestamp: datetime = Field(..., description="Transaction timestamp")
 
 
+class PaymentFilters(BaseModel):
+    limit: int = Field(50, ge=1, le=200)
+    cursor: str | None = Field(None, description="Opaque cursor returned as `next_cursor` by the previous page")
+    status: PaymentStatus | None = None
+    currency: str | None = Field(None, description="Currency code ISO-4217")
+    from_time: datetime | None = Field(None, description="Only charges made at or after this time")
+    to_time: datetime | None = Field(None, description="Only charges made before this time")
+
+
+class ChargePage(BaseModel):
+    items: list[ChargeResponse]
+    next_cursor: str | None = Field(None, description="Cursor of the next page, null on the last page")
+
+
 class RefundResponse(BaseModel):
     refund_id: str = Field(..., examples=["re_1N2x3AbCdEfGhIjKlMnOpQrS"])
     charge_id: str = Field(..., examples=["ch_1N2x3AbCdEfGhIjKlMnOpQrS"])
     status: PaymentStatus
     charge_refunded: bool = Field(..., description="Whether the charge was refunded")
+
+
+class PaymentStatusEvent(BaseModel):
+    """Payment status change announced by a Stripe webhook event."""
+
+    event_id: str
+    event_type: str
+    charge_id: str | None
+    status: PaymentStatus | None = Field(None, description="None for events that do not change the status")
+    created: int = Field(..., description="Unix time the event was created at by Stripe")
@@ -1,7 +1,10 @@
+import datetime
+import uuid
 from enum import Enum
 
-from pydantic import BaseModel, EmailStr
-import datetime
+from pydantic import BaseModel, EmailStr, Field
+
+from visit_manager.postgres_utils.models.misc import VisitStatus
 
 
 class ServiceTypeEnum(Enum):
@@ -31,13 +34,39 @@ class UserSessionData(BaseModel):
     user_id: str
     user_email: str
 
+
+class UserIdentity(BaseModel):
+    user_id: uuid.UUID
+    email: str
+    first_name: str
+    last_name: str
+    is_admin: bool
+    vendor_id: uuid.UUID | None
+    client_id: uuid.UUID | None
+
+
 class VisitData(BaseModel):
+    visit_id: str
     start_time: datetime.datetime
     end_time: datetime.datetime
     vendor_id: str
     client_id: str
     vendor_name: str
     service_type: ServiceTypeEnum
+    status: VisitStatus
+
+
+class VisitFilters(BaseModel):
+    limit: int = Field(50, ge=1, le=200)
+    cursor: str | None = Field(None, description="Opaque cursor returned as `next_cursor` by the previous page")
+    from_time: datetime.datetime | None = Field(None, description="Only visits starting at or after this time")
+    to_time: datetime.datetime | None = Field(None, description="Only visits starting before this time")
+    status: VisitStatus | None = None
+
+
+class VisitPage(BaseModel):
+    items: list[VisitData]
+    next_cursor: str | None = Field(None, description="Cursor of the next page, null on the last page")
 
 
 class VendorCreate(BaseModel):
@@ -51,14 +80,135 @@ class ClientCreate(BaseModel):
     phone_number: str
     address: AddressCreate
 
+
 class VisitCreate(BaseModel):
     start_time: datetime.datetime
     end_time: datetime.datetime
     vendor_email: str
 
 
+class VisitCreateEvent(BaseModel):
+    """Visit booked by the visit scheduler, consumed from KafkaTopics.VISITS."""
+
+    idempotency_key: str = Field(..., min_length=1)
+    vendor_email: str
+    client_email: str
+    start_time: datetime.datetime
+    end_time: datetime.datetime
+    service_type: ServiceTypeEnum | None = Field(None, description="Defaults to the first type offered by the vendor")
+    description: str = "Example description"
+
+
+class BulkVisitFailure(BaseModel):
+    idempotency_key: str | None
+    reason: str
+
+
+class BulkVisitResult(BaseModel):
+    inserted: list[str] = []
+    duplicates: list[str] = []
+    failures: list[BulkVisitFailure] = []
+
+
+class UserContactData(BaseModel):
+    email: str
+    first_name: str
+    last_name: str
+
+
+class ServiceTypeData(BaseModel):
+    name: ServiceTypeEnum
+    description: str
+
+
+class VendorProfile(BaseModel):
+    vendor_id: uuid.UUID
+    vendor_name: str
+    phone_number: str
+    required_deposit_gr: int | None
+    is_active: bool
+    address_id: uuid.UUID
+    user: UserContactData
+    address: AddressCreate
+    service_types: list[ServiceTypeData]
+
+
+class ClientProfile(BaseModel):
+    client_id: uuid.UUID
+    phone_number: str
+    is_active: bool
+    address_id: uuid.UUID
+    address: AddressCreate
+
+
+class BookedVisit(BaseModel):
+    visit_id: uuid.UUID
+    vendor_id: uuid.UUID
+    client_id: uuid.UUID
+    service_type_id: uuid.UUID
+    address_id: uuid.UUID
+    start_timestamp: datetime.datetime
+    end_timestamp: datetime.datetime
+    description: str
+    status: VisitStatus
+
+
 class UserInfoModel(BaseModel):
     first_name: str
     last_name: str
     email: str
-    user_type: str
\ No newline at end of file
+    user_type: str
+
+
+class OpinionCreate(BaseModel):
+    visit_id: uuid.UUID
+    score: int = Field(ge=1, le=5)
+    comment: str | None = None
+
+
+class VendorRatingData(BaseModel):
+    vendor_id: uuid.UUID
+    ratings_count: int
+    average_rating: float | None
+    histogram: dict[int, int]
+
+
+class SlotAvailability(BaseModel):
+    vendor_id: uuid.UUID
+    start_time: datetime.datetime
+    end_time: datetime.datetime
+    free: bool
+
+
+class TimeSlot(BaseModel):
+    start_time: datetime.datetime
+    end_time: datetime.datetime
+
+
+class VendorAvailability(BaseModel):
+    vendor_id: uuid.UUID
+    slots: list[TimeSlot]
+
+
+class VendorSearchFilters(BaseModel):
+    service_type: ServiceTypeEnum
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    radius_km: float = Field(10, gt=0, le=100)
+    limit: int = Field(20, ge=1, le=100)
+    cursor: str | None = Field(None, description="Opaque cursor returned as `next_cursor` by the previous page")
+
+
+class VendorSearchResult(BaseModel):
+    vendor_id: uuid.UUID
+    vendor_name: str
+    distance_km: float
+    city: str
+    street: str
+    latitude: float
+    longitude: float
+
+
+class VendorSearchPage(BaseModel):
+    items: list[VendorSearchResult]
+    next_cursor: str | None = Field(None, description="Cursor of the next page, null on the last page")
@@ -0,0 +1,17 @@
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+
+
+class ModelResponse(JSONResponse):
+    """
+    JSON response rendered by pydantic-core straight from the models it holds.
+
+    Returned from a handler it is passed through as is: FastAPI neither dumps the models to dicts and validates
+    them again against the route's `response_model`, nor walks the result with `jsonable_encoder`.
+    The route still declares `response_model` for the OpenAPI schema.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
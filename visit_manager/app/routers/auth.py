@@ -1,14 +1,16 @@
-import os
 from datetime import timedelta
 from typing import Annotated
 
-import requests
+import httpx
+from decouple import config
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from visit_manager.app.models.user_models import UserCreate
-from visit_manager.app.security.common import create_access_token, oauth
+from visit_manager.app.security.common import create_access_token, get_oauth
+from visit_manager.app.security.google import fetch_google_userinfo
+from visit_manager.package_utils.http_client import get_http_client
 from visit_manager.postgres_utils.models.users import create_or_update_user
 from visit_manager.postgres_utils.utils import get_db
 
@@ -18,24 +20,25 @@ router = APIRouter()
 @router.get("/login")
 async def login(request: Request):
     request.session.clear()
-    frontend_url = os.getenv("FRONTEND_URL")
-    redirect_url = os.getenv("REDIRECT_URL")
+    frontend_url = config("FRONTEND_URL", default=None)
+    redirect_url = config("REDIRECT_URL", default=None)
     request.session["login_redirect"] = frontend_url
-    return await oauth.auth_demo.authorize_redirect(request, redirect_url, prompt="consent")
+    return await get_oauth().auth_demo.authorize_redirect(request, redirect_url, prompt="consent")
 
 
 @router.get("/auth")
-async def auth(request: Request, session: Annotated[AsyncSession, Depends(get_db)]):
+async def auth(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_db)],
+    http_client: Annotated[httpx.AsyncClient, Depends(get_http_client)],
+):
     try:
-        token = await oauth.auth_demo.authorize_access_token(request)
+        token = await get_oauth().auth_demo.authorize_access_token(request)
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Google authentication failed: {str(e)}")
 
     try:
-        user_info_endpoint = "https://www.googleapis.com/oauth2/v2/userinfo"
-        headers = {"Authorization": f"Bearer {token['access_token']}"}
-        google_response = requests.get(user_info_endpoint, headers=headers)
-        user_info = google_response.json()
+        user_info = await fetch_google_userinfo(http_client, token["access_token"])
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Google userinfo failed: {str(e)}")
 
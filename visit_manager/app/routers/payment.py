@@ -1,165 +1,212 @@
-import os
-from typing import Annotated, Any, Sequence
-
-import stripe
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from stripe.error import StripeError  # type: ignore[attr-defined]
-
-from visit_manager.app.models.payment_models import ChargeRequest, ChargeResponse, RefundResponse
-from visit_manager.app.models.user_models import UserSessionData
-from visit_manager.app.security.common import get_current_user
-from visit_manager.package_utils.logger_conf import logger
-from visit_manager.postgres_utils.models.models import Payment, PaymentStatus
-from visit_manager.postgres_utils.models.transaction import (
-    add_payment,
-    get_payment_by_stripe_charge_id,
-    read_all_payments,
-    update_payment_status,
-)
-from visit_manager.postgres_utils.utils import get_db
-
-router = APIRouter(prefix="/payment", tags=["payment"])
-
-
-async def get_stripe_client() -> Any:
-    """
-    Dependency that provides an async Stripe client.
-    Raises 500 if API key not configured.
-    """
-    api_key = os.getenv("STRIPE_API_KEY")
-    if not api_key:
-        logger.warning("STRIPE_API_KEY is not set; payment endpoints will return 500 at runtime")
-        raise HTTPException(status_code=500, detail="Stripe API key not configured")
-    stripe.api_key = api_key
-    return stripe
-
-
-@router.post("/charge", status_code=status.HTTP_201_CREATED)
-async def create_charge(
-    req: ChargeRequest,
-    stripe_client: Annotated[Any, Depends(get_stripe_client)],
-    session: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[UserSessionData, Depends(get_current_user)],
-) -> ChargeResponse:
-    """
-    Creates a charge using Stripe API and stores the transaction in the database.
-    If the charge creation fails, raises 400 with the error message.
-    """
-    charge = await stripe_client.Charge.create_async(
-        amount=req.amount,
-        currency=req.currency,
-        source="tok_visa",
-    )
-    payment = await add_payment(
-        session=session,
-        payment=Payment(
-            stripe_charge_id=charge.id,
-            amount=req.amount,
-            currency=req.currency,
-            status=PaymentStatus.succeeded,
-        ),
-    )
-    return ChargeResponse(
-        charge_id=charge.id,
-        status=charge.status,
-        amount=req.amount,
-        currency=req.currency,
-        transaction_timestamp=payment.transaction_timestamp,
-    )
-
-
-@router.post(
-    "/refund/last",
-    status_code=status.HTTP_200_OK,
-    summary="Refund the most recent charge",
-    description="Issues a refund for the most recent successful charge.",
-)
-async def refund_last_charge(
-    stripe_client: Annotated[Any, Depends(get_stripe_client)],
-    session: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[UserSessionData, Depends(get_current_user)],
-) -> RefundResponse:
-    """
-    Issues a refund for the most recent successful charge.
-    Raises:
-        HTTPException(404): when there is no transactions in database.
-        HTTPException(400): when last transaction has a different status than "success" or Stripe returned error when refunding.
-    """
-    payments = await read_all_payments(session)
-    if not payments:
-        print("No transactions found to refund")
-        raise HTTPException(status_code=404, detail="No transactions found to refund")
-    last_payment = payments[-1]
-    charge_id = last_payment.stripe_charge_id
-    if last_payment.status != PaymentStatus.succeeded:
-        raise HTTPException(status_code=400, detail=f"Transaction {charge_id} is not eligible for refund")
-    try:
-        refund = await stripe_client.Refund.create_async(charge=charge_id)
-    except StripeError as e:
-        detail = getattr(e, "user_message", None) or str(e)
-        logger.error(f"Stripe refund error for {charge_id}: {detail}")
-        raise HTTPException(status_code=400, detail=detail)
-    await update_payment_status(session=session, stripe_charge_id=charge_id, status=PaymentStatus.refunded)
-    return RefundResponse(
-        charge_id=charge_id,
-        status=refund.status,
-        refund_id=refund.id,
-        charge_refunded=True,
-    )
-
-
-@router.post("/refund/{charge_id}", status_code=status.HTTP_200_OK)
-async def refund_charge(
-    charge_id: str,
-    stripe_client: Annotated[Any, Depends(get_stripe_client)],
-    session: Annotated[AsyncSession, Depends(get_db)],
-    current_user: Annotated[UserSessionData, Depends(get_current_user)],
-) -> RefundResponse:
-    """
-    Issues a refund for the given charge and updates its status.
-    If refund fails, transaction status is NOT updated to preserve consistency.
-    If the transaction is not found or is not eligible for refund, raises 404 or 400.
-    """
-    payment = await get_payment_by_stripe_charge_id(session=session, stripe_charge_id=charge_id)
-    if not payment:
-        raise HTTPException(status_code=404, detail=f"Transaction {charge_id} not found")
-    if payment.status != PaymentStatus.succeeded:
-        raise HTTPException(status_code=400, detail=f"Transaction {charge_id} is not eligible for refund")
-    try:
-        refund = await stripe_client.Refund.create_async(charge=charge_id)
-    except StripeError as e:
-        detail = getattr(e, "user_message", None) or str(e)
-        raise HTTPException(status_code=400, detail=detail)
-    await update_payment_status(session=session, stripe_charge_id=charge_id, status=PaymentStatus.refunded)
-    return RefundResponse(
-        charge_id=charge_id,
-        status=refund.status,
-        refund_id=refund.id,
-        charge_refunded=True,
-    )
-
-
-@router.get(
-    "/charges",
-    status_code=status.HTTP_200_OK,
-    summary="List all charges",
-    description="Returns a list of all charges made through the system.",
-    dependencies=[Depends(get_current_user)],
-)
-async def list_charges(session: Annotated[AsyncSession, Depends(get_db)]) -> Sequence[ChargeResponse]:
-    """
-    Returns a list of all charges made through the system.
-    Each charge is represented by a ChargeResponse object.
-    """
-    payments = await read_all_payments(session)
-    return [
-        ChargeResponse(
-            charge_id=p.stripe_charge_id,
-            status=p.status,
-            amount=p.amount,
-            currency=p.currency,
-            transaction_timestamp=p.transaction_timestamp,
-        )
-        for p in payments
-    ]
+import asyncio
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from visit_manager.app.models.payment_models import (
+    ChargePage,
+    ChargeRequest,
+    ChargeResponse,
+    PaymentFilters,
+    RefundResponse,
+)
+from visit_manager.app.models.user_models import UserSessionData
+from visit_manager.app.security.common import get_current_user
+from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.settings import StripeSettings
+from visit_manager.postgres_utils.models.models import Payment, PaymentStatus
+from visit_manager.postgres_utils.models.transaction import (
+    add_payment,
+    get_latest_succeeded_payment,
+    get_payment_by_stripe_charge_id,
+    list_payments,
+    update_payment_status,
+)
+from visit_manager.postgres_utils.utils import get_db
+from visit_manager.stripe_utils.gateway import (
+    PaymentError,
+    PaymentGateway,
+    PaymentUnavailableError,
+    charge_idempotency_key,
+    get_payment_gateway,
+    refund_idempotency_key,
+)
+from visit_manager.stripe_utils.webhooks import PaymentEventBatcher, get_payment_event_batcher, parse_payment_event
+
+router = APIRouter(prefix="/payment", tags=["payment"])
+
+_settings = StripeSettings()
+
+
+def _to_http_exception(error: PaymentError) -> HTTPException:
+    if isinstance(error, PaymentUnavailableError):
+        return HTTPException(status_code=503, detail=error.detail)
+    return HTTPException(status_code=400, detail=error.detail)
+
+
+@router.post("/charge", status_code=status.HTTP_201_CREATED)
+async def create_charge(
+    req: ChargeRequest,
+    gateway: Annotated[PaymentGateway, Depends(get_payment_gateway)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[UserSessionData, Depends(get_current_user)],
+    idempotency_key: Annotated[str | None, Header(alias="Idempotency-Key", max_length=255)] = None,
+) -> ChargeResponse:
+    """
+    Creates a charge using Stripe API and stores the transaction in the database.
+    The `Idempotency-Key` header is required: retrying with the same one returns the original charge
+    instead of charging again, a new charge needs a new one.
+    If Stripe refuses the charge, raises 400 with the error message; if it is unavailable, raises 503.
+    """
+    if not idempotency_key:
+        raise HTTPException(status_code=400, detail="Idempotency-Key header is required")
+    key = charge_idempotency_key(current_user.user_id, idempotency_key)
+    try:
+        charge = await gateway.charge(amount=req.amount, currency=req.currency, source="tok_visa", idempotency_key=key)
+    except PaymentError as e:
+        raise _to_http_exception(e)
+    payment = await get_payment_by_stripe_charge_id(session=session, stripe_charge_id=charge.charge_id)
+    if payment is None:
+        payment = await add_payment(
+            session=session,
+            payment=Payment(
+                stripe_charge_id=charge.charge_id,
+                amount=req.amount,
+                currency=req.currency,
+                status=PaymentStatus.succeeded,
+            ),
+        )
+    return ChargeResponse(
+        charge_id=charge.charge_id,
+        status=charge.status,
+        amount=req.amount,
+        currency=req.currency,
+        transaction_timestamp=payment.transaction_timestamp,
+    )
+
+
+@router.post(
+    "/refund/last",
+    status_code=status.HTTP_200_OK,
+    summary="Refund the most recent charge",
+    description="Issues a refund for the most recent successful charge.",
+)
+async def refund_last_charge(
+    gateway: Annotated[PaymentGateway, Depends(get_payment_gateway)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[UserSessionData, Depends(get_current_user)],
+) -> RefundResponse:
+    """
+    Issues a refund for the most recent successful charge.
+    Raises:
+        HTTPException(404): when there is no succeeded transaction in database.
+        HTTPException(400): when Stripe returned error when refunding.
+    """
+    last_payment = await get_latest_succeeded_payment(session)
+    if last_payment is None:
+        raise HTTPException(status_code=404, detail="No transactions found to refund")
+    charge_id = last_payment.stripe_charge_id
+    try:
+        refund = await gateway.refund(charge_id, idempotency_key=refund_idempotency_key(charge_id))
+    except PaymentError as e:
+        logger.error(f"Stripe refund error for {charge_id}: {e.detail}")
+        raise _to_http_exception(e)
+    await update_payment_status(session=session, stripe_charge_id=charge_id, status=PaymentStatus.refunded)
+    return RefundResponse(
+        charge_id=charge_id,
+        status=refund.status,
+        refund_id=refund.refund_id,
+        charge_refunded=True,
+    )
+
+
+@router.post("/refund/{charge_id}", status_code=status.HTTP_200_OK)
+async def refund_charge(
+    charge_id: str,
+    gateway: Annotated[PaymentGateway, Depends(get_payment_gateway)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[UserSessionData, Depends(get_current_user)],
+) -> RefundResponse:
+    """
+    Issues a refund for the given charge and updates its status.
+    If refund fails, transaction status is NOT updated to preserve consistency.
+    If the transaction is not found or is not eligible for refund, raises 404 or 400.
+    """
+    payment = await get_payment_by_stripe_charge_id(session=session, stripe_charge_id=charge_id)
+    if not payment:
+        raise HTTPException(status_code=404, detail=f"Transaction {charge_id} not found")
+    if payment.status != PaymentStatus.succeeded:
+        raise HTTPException(status_code=400, detail=f"Transaction {charge_id} is not eligible for refund")
+    try:
+        refund = await gateway.refund(charge_id, idempotency_key=refund_idempotency_key(charge_id))
+    except PaymentError as e:
+        raise _to_http_exception(e)
+    await update_payment_status(session=session, stripe_charge_id=charge_id, status=PaymentStatus.refunded)
+    return RefundResponse(
+        charge_id=charge_id,
+        status=refund.status,
+        refund_id=refund.refund_id,
+        charge_refunded=True,
+    )
+
+
+@router.get(
+    "/charges",
+    status_code=status.HTTP_200_OK,
+    summary="List charges",
+    description="Returns the charges made through the system, newest first, one page at a time.",
+    dependencies=[Depends(get_current_user)],
+)
+async def list_charges(
+    session: Annotated[AsyncSession, Depends(get_db)],
+    limit: Annotated[int, Query(ge=1, le=200)] = 50,
+    cursor: Annotated[str | None, Query(description="`next_cursor` of the previous page")] = None,
+    payment_status: Annotated[PaymentStatus | None, Query(alias="status")] = None,
+    currency: Annotated[str | None, Query(min_length=3, max_length=3)] = None,
+    from_time: Annotated[datetime | None, Query(alias="from")] = None,
+    to_time: Annotated[datetime | None, Query(alias="to")] = None,
+) -> ChargePage:
+    """
+    Returns one page of the charges made through the system, filtered by status, currency and time.
+    Each charge is represented by a ChargeResponse object.
+    """
+    filters = PaymentFilters(
+        limit=limit, cursor=cursor, status=payment_status, currency=currency, from_time=from_time, to_time=to_time
+    )
+    return await list_payments(session, filters)
+
+
+@router.post(
+    "/webhook",
+    status_code=status.HTTP_200_OK,
+    summary="Stripe webhook",
+    description="Receives Stripe events and applies the payment status changes they announce.",
+)
+async def stripe_webhook(
+    request: Request,
+    batcher: Annotated[PaymentEventBatcher, Depends(get_payment_event_batcher)],
+    stripe_signature: Annotated[str, Header(alias="Stripe-Signature")],
+) -> dict[str, bool]:
+    """
+    Verifies the event's signature and answers once its status change is committed, together with the other
+    events received meanwhile. Events already applied are acknowledged without changing anything.
+    Raises 400 for a bad signature or payload, 503 when too many events are pending (Stripe retries later).
+    """
+    if not _settings.WEBHOOK_SECRET:
+        raise HTTPException(status_code=500, detail="Stripe webhook secret not configured")
+    import stripe
+
+    payload = await request.body()
+    try:
+        event = parse_payment_event(payload, stripe_signature, _settings.WEBHOOK_SECRET, _settings.WEBHOOK_TOLERANCE_S)
+    except stripe.SignatureVerificationError:
+        raise HTTPException(status_code=400, detail="Invalid signature")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+    try:
+        await batcher.submit(event)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=503, detail="Too many pending events")
+    return {"received": True}
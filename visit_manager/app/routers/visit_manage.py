@@ -1,58 +1,208 @@
+import uuid
+from datetime import datetime, timedelta
 from typing import Annotated
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.params import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from visit_manager.app.models.user_models import UserSessionData, VendorCreate, VisitCreate, ClientCreate
+from visit_manager.app.models.user_models import (
+    BookedVisit,
+    ClientCreate,
+    ClientProfile,
+    OpinionCreate,
+    ServiceTypeEnum,
+    SlotAvailability,
+    UserInfoModel,
+    UserSessionData,
+    VendorAvailability,
+    VendorCreate,
+    VendorProfile,
+    VendorRatingData,
+    VendorSearchFilters,
+    VendorSearchPage,
+    VisitCreate,
+    VisitFilters,
+    VisitPage,
+)
+from visit_manager.app.responses import ModelResponse
 from visit_manager.app.security.common import get_current_user
-from visit_manager.postgres_utils.models.users import book_visit_in_db, get_my_visits_from_db, register_as_client, register_as_vendor, get_me_from_db
+from visit_manager.postgres_utils.models.availability import get_vendors_availability
+from visit_manager.postgres_utils.models.misc import VisitStatus
+from visit_manager.postgres_utils.models.ratings import add_opinion_in_db, get_vendor_rating
+from visit_manager.postgres_utils.models.users import (
+    book_visit_in_db,
+    get_me_from_db,
+    get_my_visits_from_db,
+    register_as_client,
+    register_as_vendor,
+)
+from visit_manager.postgres_utils.models.vendors import search_vendors_nearby
+from visit_manager.postgres_utils.models.visits import is_slot_free
+from visit_manager.postgres_utils.timestamps import make_naive
 from visit_manager.postgres_utils.utils import get_db
 
-router = APIRouter(prefix="/user", tags=["user"], responses={404: {"description": "Not found"}})
+# handlers return their models wrapped in ModelResponse, rendered in one pass by pydantic-core
+router = APIRouter(
+    prefix="/user",
+    tags=["user"],
+    responses={404: {"description": "Not found"}},
+    default_response_class=ModelResponse,
+)
 
+MAX_AVAILABILITY_WINDOW = timedelta(days=31)
 
-@router.post("/register_as_vendor")
+
+@router.post("/register_as_vendor", response_model=VendorProfile)
 async def register_vendor(
     vendor_data: VendorCreate,
     current_user: Annotated[UserSessionData, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(get_db)],
-):
+) -> ModelResponse:
     async with session.begin():
-        return await register_as_vendor(session, current_user, vendor_data)
+        vendor = await register_as_vendor(session, current_user, vendor_data)
+    return ModelResponse(vendor)
+
 
-@router.post("/book_visit")
+@router.post("/book_visit", response_model=BookedVisit)
 async def book_visit(
     visit_data: VisitCreate,
     current_user: Annotated[UserSessionData, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(get_db)],
-):
+) -> ModelResponse:
     async with session.begin():
-        return await book_visit_in_db(session, current_user, visit_data)
+        visit = await book_visit_in_db(session, current_user, visit_data)
+    return ModelResponse(visit)
 
-@router.get("/my_visits")
+
+@router.get("/my_visits", response_model=VisitPage)
 async def get_my_visits(
     current_user: Annotated[UserSessionData, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(get_db)],
-):
+    limit: Annotated[int, Query(ge=1, le=200)] = 50,
+    cursor: Annotated[str | None, Query(description="`next_cursor` of the previous page")] = None,
+    from_time: Annotated[datetime | None, Query(alias="from")] = None,
+    to_time: Annotated[datetime | None, Query(alias="to")] = None,
+    status: Annotated[VisitStatus | None, Query()] = None,
+) -> ModelResponse:
+    """
+    Returns the visits of the current user (as vendor if the user is one, as client otherwise),
+    ordered by start time and paginated with an opaque cursor.
+    """
+    filters = VisitFilters(limit=limit, cursor=cursor, from_time=from_time, to_time=to_time, status=status)
     async with session.begin():
-        return await get_my_visits_from_db(session, current_user)
+        page = await get_my_visits_from_db(session, current_user, filters)
+    return ModelResponse(page)
 
 
-@router.post("/register_as_client")
+@router.post("/register_as_client", response_model=ClientProfile)
 async def register_client(
     client_data: ClientCreate,
     current_user: Annotated[UserSessionData, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(get_db)],
-):
+) -> ModelResponse:
     async with session.begin():
-        return await register_as_client(session, current_user, client_data)
+        client = await register_as_client(session, current_user, client_data)
+    return ModelResponse(client)
 
 
-@router.get("/me")
+@router.get("/me", response_model=UserInfoModel)
 async def get_me(
     current_user: Annotated[UserSessionData, Depends(get_current_user)],
     session: Annotated[AsyncSession, Depends(get_db)],
-):
+) -> ModelResponse:
+    async with session.begin():
+        me = await get_me_from_db(session, current_user)
+    return ModelResponse(me)
+
+
+@router.post("/add_opinion", response_model=VendorRatingData)
+async def add_opinion(
+    opinion: OpinionCreate,
+    current_user: Annotated[UserSessionData, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+) -> ModelResponse:
+    """Review a visit that has ended (score 1-5), returns the vendor's updated rating."""
+    async with session.begin():
+        rating = await add_opinion_in_db(session, current_user, opinion)
+    return ModelResponse(rating)
+
+
+@router.get("/vendor_rating/{vendor_id}", response_model=VendorRatingData)
+async def vendor_rating(
+    vendor_id: uuid.UUID,
+    current_user: Annotated[UserSessionData, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+) -> ModelResponse:
+    async with session.begin():
+        rating = await get_vendor_rating(session, vendor_id)
+    return ModelResponse(rating)
+
+
+@router.get("/is_slot_free", response_model=SlotAvailability)
+async def slot_free(
+    vendor_id: uuid.UUID,
+    start_time: datetime,
+    end_time: datetime,
+    current_user: Annotated[UserSessionData, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+) -> ModelResponse:
+    """Whether the vendor can still be booked for [start_time, end_time)."""
+    # visit times are naive, compared as such whether or not the query gave an offset
+    start_time, end_time = make_naive(start_time), make_naive(end_time)
+    if end_time <= start_time:
+        raise HTTPException(status_code=400, detail="Slot must end after it starts")
+    async with session.begin():
+        free = await is_slot_free(session, vendor_id, start_time, end_time)
+    return ModelResponse(SlotAvailability(vendor_id=vendor_id, start_time=start_time, end_time=end_time, free=free))
+
+
+@router.get("/availability", response_model=list[VendorAvailability])
+async def availability(
+    current_user: Annotated[UserSessionData, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    vendor_ids: Annotated[list[uuid.UUID], Query(alias="vendor_id", min_length=1, max_length=100)],
+    from_time: Annotated[datetime, Query(alias="from")],
+    to_time: Annotated[datetime, Query(alias="to")],
+    duration_minutes: Annotated[int, Query(ge=5, le=24 * 60)] = 60,
+    max_slots: Annotated[int, Query(ge=1, le=500)] = 50,
+) -> ModelResponse:
+    """
+    Free slots of `duration_minutes` between `from` and `to` for each requested vendor (repeat `vendor_id`).
+    Unknown and inactive vendors are left out of the response.
+    """
+    from_time, to_time = make_naive(from_time), make_naive(to_time)
+    if to_time <= from_time:
+        raise HTTPException(status_code=400, detail="Window must end after it starts")
+    if to_time - from_time > MAX_AVAILABILITY_WINDOW:
+        raise HTTPException(status_code=400, detail=f"Window must not exceed {MAX_AVAILABILITY_WINDOW.days} days")
+    async with session.begin():
+        vendors = await get_vendors_availability(
+            session, vendor_ids, from_time, to_time, timedelta(minutes=duration_minutes), max_slots
+        )
+    return ModelResponse(vendors)
+
+
+@router.get("/vendors/nearby", response_model=VendorSearchPage)
+async def vendors_nearby(
+    current_user: Annotated[UserSessionData, Depends(get_current_user)],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    service_type: ServiceTypeEnum,
+    latitude: Annotated[float, Query(ge=-90, le=90)],
+    longitude: Annotated[float, Query(ge=-180, le=180)],
+    radius_km: Annotated[float, Query(gt=0, le=100)] = 10,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: Annotated[str | None, Query(description="`next_cursor` of the previous page")] = None,
+) -> ModelResponse:
+    """Active vendors offering `service_type` within `radius_km` of the given point, nearest first."""
+    filters = VendorSearchFilters(
+        service_type=service_type,
+        latitude=latitude,
+        longitude=longitude,
+        radius_km=radius_km,
+        limit=limit,
+        cursor=cursor,
+    )
     async with session.begin():
-        return await get_me_from_db(session, current_user)
\ No newline at end of file
+        page = await search_vendors_nearby(session, filters)
+    return ModelResponse(page)
@@ -1,41 +1,56 @@
 # auth.py
-import os
+import functools
+import time
 import traceback
 from datetime import datetime, timedelta, timezone
+from typing import Any
 
-from authlib.integrations.starlette_client import OAuth
 from decouple import config
-from dotenv import load_dotenv
 from fastapi import Cookie, HTTPException
 from jose import ExpiredSignatureError, JWTError, jwt
 
 from visit_manager.app.models.user_models import UserSessionData
+from visit_manager.package_utils.cache import TTLCache
 from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.settings import VisitManagerSettings
+
+
+@functools.lru_cache(maxsize=1)
+def get_oauth() -> Any:
+    """
+    OAuth client of Google, registered on the first login: importing the app needs neither authlib
+    nor the Google credentials. Variables are read from the environment, then from .env.
+    """
+    from authlib.integrations.starlette_client import OAuth
+
+    oauth = OAuth()
+    oauth.register(
+        name="auth_demo",
+        client_id=config("GOOGLE_CLIENT_ID"),
+        client_secret=config("GOOGLE_CLIENT_SECRET"),
+        authorize_url="https://accounts.google.com/o/oauth2/auth",
+        authorize_params=None,
+        access_token_url="https://accounts.google.com/o/oauth2/token",
+        access_token_params=None,
+        refresh_token_url=None,
+        authorize_state=config("JWT_SECRET_KEY"),  # possible to remove
+        redirect_uri=config("REDIRECT_URL", default="http://localhost:8082/auth"),
+        jwks_uri="https://www.googleapis.com/oauth2/v3/certs",
+        client_kwargs={"scope": "openid profile email"},
+    )
+    return oauth
 
-# Load environment variables
-load_dotenv(override=True)
-
-# OAuth Setup
-oauth = OAuth()
-oauth.register(
-    name="auth_demo",
-    client_id=config("GOOGLE_CLIENT_ID"),
-    client_secret=config("GOOGLE_CLIENT_SECRET"),
-    authorize_url="https://accounts.google.com/o/oauth2/auth",
-    authorize_params=None,
-    access_token_url="https://accounts.google.com/o/oauth2/token",
-    access_token_params=None,
-    refresh_token_url=None,
-    authorize_state=config("JWT_SECRET_KEY"),  # possible to remove
-    redirect_uri=config("REDIRECT_URL", default="http://localhost:8082/auth"),
-    jwks_uri="https://www.googleapis.com/oauth2/v3/certs",
-    client_kwargs={"scope": "openid profile email"},
-)
 
 # JWT Configurations
-SECRET_KEY = os.getenv("JWT_SECRET_KEY")
+SECRET_KEY = config("JWT_SECRET_KEY", default=None)
 ALGORITHM = "HS256"
 
+# verified tokens, so the signature is checked once per token instead of once per request
+_settings = VisitManagerSettings()
+_token_cache: TTLCache[str, UserSessionData] = TTLCache(
+    maxsize=_settings.TOKEN_CACHE_SIZE, ttl=_settings.TOKEN_CACHE_TTL_S
+)
+
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -51,6 +66,9 @@ def get_current_user(token: str = Cookie(None, alias="access_token")) -> UserSes
         logger.error("No access_token cookie found")
         raise HTTPException(status_code=401, detail="Not authenticated")
 
+    cached_user = _token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
 
     credentials_exception = HTTPException(
         status_code=401,
@@ -63,11 +81,14 @@ def get_current_user(token: str = Cookie(None, alias="access_token")) -> UserSes
         user_id: str = payload.get("sub")
         user_email: str = payload.get("email")
 
-
         if user_id is None or user_email is None:
             raise credentials_exception
 
-        return UserSessionData(user_id=user_id, user_email=user_email)
+        user = UserSessionData(user_id=user_id, user_email=user_email)
+        # never serve a token from the cache past its own expiry
+        expires_at = payload.get("exp")
+        _token_cache.set(token, user, ttl=expires_at - time.time() if expires_at is not None else None)
+        return user
 
     except ExpiredSignatureError:
         # Specifically handle expired tokens
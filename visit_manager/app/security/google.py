@@ -0,0 +1,12 @@
+from typing import Any
+
+import httpx
+
+GOOGLE_USERINFO_URL = "https://www.googleapis.com/oauth2/v2/userinfo"
+
+
+async def fetch_google_userinfo(http_client: httpx.AsyncClient, access_token: str) -> dict[str, Any]:
+    response = await http_client.get(GOOGLE_USERINFO_URL, headers={"Authorization": f"Bearer {access_token}"})
+    response.raise_for_status()
+    user_info: dict[str, Any] = response.json()
+    return user_info
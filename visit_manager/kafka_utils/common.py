@@ -1,10 +1,12 @@
 from enum import Enum
+from typing import Any
 
 import confluent_kafka  # type: ignore[import-untyped]
 
 from visit_manager.kafka_utils.oauth import KafkaTokenProvider
 from visit_manager.package_utils.logger_conf import logger
-from visit_manager.package_utils.settings import KafkaSettings, kafka_authentication_scheme_t
+from visit_manager.package_utils.metrics import KAFKA_CONSUMER_LAG_MESSAGES
+from visit_manager.package_utils.settings import kafka_authentication_scheme_t
 
 
 def _get_kafka_consumer_config(
@@ -13,7 +15,7 @@ def _get_kafka_consumer_config(
     config = {
         "bootstrap.servers": bootstrap_url,
         "group.id": group_id,
-        "enable.auto.commit": True,
+        "enable.auto.commit": False,
         "auto.offset.reset": "earliest",
     }
 
@@ -32,44 +34,32 @@ def _get_kafka_consumer_config(
     return config
 
 
-def _handle_message(message: str) -> None:
-    logger.info(f"Processing message: {message}")
-
-
-def listen_to_kafka() -> None:
-    settings = KafkaSettings()
-
-    auth_scheme: kafka_authentication_scheme_t = settings.AUTHENTICATION_SCHEME
-
-    config = _get_kafka_consumer_config(
-        bootstrap_url=settings.BOOTSTRAP_URL, group_id=settings.GROUP_ID, auth_scheme=auth_scheme
-    )
-
-    consumer = confluent_kafka.Consumer(config)
-    consumer.subscribe([settings.TOPIC])
-    logger.info(f"Listening for messages on Kafka topic '{settings.TOPIC}'...")
-
-    while True:
-        msg = consumer.poll(timeout=1.0)
-        if msg is None:
-            continue
-        if msg.error():
-            logger.error(f"Kafka error: {msg.error()}")
-            continue
-        _handle_message(msg.value().decode("utf-8"))
-
-
-def enable_listen_to_kafka() -> None:
+def record_consumer_lag(consumer: Any, messages: list[Any]) -> dict[tuple[str, int], int]:
     """
-    Enable the Kafka consumer to listen for messages.
+    Set the lag of every partition in a consumed batch: messages behind the partition's high watermark after
+    the batch's last offset. The watermarks cached from the fetch responses are used, so the broker is not queried.
     """
-    logger.info("Starting Kafka consumer...")
-    listen_to_kafka()
+    last_offsets: dict[tuple[str, int], int] = {}
+    for message in messages:
+        if message.error() is None:
+            last_offsets[(message.topic(), message.partition())] = message.offset()
+
+    lags = {}
+    for (topic, partition), offset in last_offsets.items():
+        watermarks = consumer.get_watermark_offsets(confluent_kafka.TopicPartition(topic, partition), cached=True)
+        if watermarks is None or watermarks[1] < 0:
+            # no fetch response for the partition yet
+            continue
+        high = watermarks[1]
+        lags[(topic, partition)] = lag = max(high - offset - 1, 0)
+        KAFKA_CONSUMER_LAG_MESSAGES.labels(topic, str(partition)).set(lag)
+    return lags
 
 
 class KafkaTopics(Enum):
     USERS = "users"
     RATINGS = "ratings"
+    VISITS = "visits"
 
     @property
     def topic_name(self) -> str:
@@ -0,0 +1,252 @@
+import asyncio
+import contextlib
+import contextvars
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+import confluent_kafka  # type: ignore[import-untyped]
+import orjson
+from opentelemetry.trace import Link, SpanContext, SpanKind
+
+from visit_manager.kafka_utils.common import KafkaTopics, _get_kafka_consumer_config, record_consumer_lag
+from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.settings import KafkaSettings
+from visit_manager.package_utils.tracing import kafka_trace_context, tracer
+
+ANY_EVENT_TYPE = "*"
+
+
+@dataclass(frozen=True, slots=True)
+class KafkaEvent:
+    topic: str
+    partition: int
+    offset: int
+    key: str | None
+    event_type: str
+    payload: Any
+    # span of the message's receipt, in the producer's trace
+    span_context: SpanContext | None = None
+
+
+BatchHandler = Callable[[list[KafkaEvent]], Awaitable[None] | None]
+
+_handlers: dict[tuple[str, str], BatchHandler] = {}
+
+
+def kafka_handler(topic: KafkaTopics, event_type: str = ANY_EVENT_TYPE) -> Callable[[BatchHandler], BatchHandler]:
+    """
+    Register a handler for the events of `event_type` on `topic`.
+
+    Handlers receive every matching event of a consumed batch at once, in offset order.
+    Coroutine functions run on the event loop, plain functions on the consumer's worker pool.
+    Raising makes the whole batch be redelivered.
+    """
+
+    def decorator(handler: BatchHandler) -> BatchHandler:
+        _handlers[(topic.topic_name, event_type)] = handler
+        return handler
+
+    return decorator
+
+
+def _decode(message: Any) -> KafkaEvent:
+    raw = message.value()
+    try:
+        payload = orjson.loads(raw) if raw is not None else None
+    except ValueError:
+        payload = raw.decode("utf-8", errors="replace")
+
+    event_type = None
+    for header, value in message.headers() or []:
+        if header == "event_type" and value is not None:
+            event_type = value.decode("utf-8")
+    if event_type is None and isinstance(payload, dict):
+        event_type = payload.get("event_type")
+
+    span = tracer.start_span(
+        f"receive {message.topic()}",
+        context=kafka_trace_context(message.headers()),
+        kind=SpanKind.CONSUMER,
+        attributes={
+            "messaging.system": "kafka",
+            "messaging.destination.name": message.topic(),
+            "messaging.destination.partition.id": str(message.partition()),
+            "messaging.kafka.offset": message.offset(),
+        },
+    )
+    span.end()
+
+    key = message.key()
+    return KafkaEvent(
+        topic=message.topic(),
+        partition=message.partition(),
+        offset=message.offset(),
+        key=key.decode("utf-8") if isinstance(key, bytes) else key,
+        event_type=event_type or "",
+        payload=payload,
+        span_context=span.get_span_context(),
+    )
+
+
+class KafkaConsumerWorker:
+    """
+    Batch consumer dispatching events to the handlers registered with `kafka_handler`.
+
+    Up to `batch_size` messages are fetched with a single `consume` call and handled group by group
+    (topic, event type); offsets are committed synchronously only once the whole batch succeeded.
+    A failed batch is never committed: the consumer is rewound to its first offsets and consumes it again
+    after an exponential backoff capped at `retry_max_backoff`, until it succeeds; if the app stops
+    meanwhile, it is redelivered after the restart.
+    Every call into the librdkafka consumer runs on one dedicated thread, so the event loop never blocks.
+    """
+
+    def __init__(
+        self,
+        consumer: Any,
+        topics: list[str],
+        batch_size: int,
+        poll_timeout: float,
+        workers: int,
+        retry_backoff: float,
+        retry_max_backoff: float,
+    ):
+        self._consumer = consumer
+        self._topics = topics
+        self._batch_size = batch_size
+        self._poll_timeout = poll_timeout
+        self._retry_backoff = retry_backoff
+        self._retry_max_backoff = retry_max_backoff
+        # consecutive failures of the batch being retried
+        self._failed_attempts = 0
+        self._consumer_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kafka-consumer")
+        self._worker_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kafka-handler")
+        self._stop = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    async def _call_consumer(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._consumer_thread, lambda: func(*args, **kwargs))
+
+    async def _run_handler(self, handler: BatchHandler, events: list[KafkaEvent]) -> None:
+        if inspect.iscoroutinefunction(handler):
+            await handler(events)
+        else:
+            # keep the current span as the parent of the handler's own spans
+            context = contextvars.copy_context()
+            await asyncio.get_running_loop().run_in_executor(self._worker_pool, context.run, handler, events)
+
+    async def dispatch(self, events: list[KafkaEvent]) -> None:
+        groups: dict[tuple[str, str], list[KafkaEvent]] = {}
+        for event in events:
+            groups.setdefault((event.topic, event.event_type), []).append(event)
+
+        for (topic, event_type), group in groups.items():
+            handler = _handlers.get((topic, event_type)) or _handlers.get((topic, ANY_EVENT_TYPE))
+            if handler is None:
+                logger.debug(f"No handler for {len(group)} '{event_type}' events on '{topic}', skipping")
+                continue
+            # one span per handler call, linked to the traces of the messages it handles
+            links = [Link(e.span_context) for e in group if e.span_context is not None and e.span_context.is_valid]
+            with tracer.start_as_current_span(
+                f"process {topic}",
+                kind=SpanKind.CONSUMER,
+                links=links,
+                attributes={
+                    "messaging.system": "kafka",
+                    "messaging.destination.name": topic,
+                    "messaging.batch.message_count": len(group),
+                    "event_type": event_type,
+                },
+            ):
+                await self._run_handler(handler, group)
+
+    async def _rewind(self, messages: list[Any]) -> None:
+        first_offsets: dict[tuple[str, int], int] = {}
+        for message in messages:
+            first_offsets.setdefault((message.topic(), message.partition()), message.offset())
+        for (topic, partition), offset in first_offsets.items():
+            await self._call_consumer(self._consumer.seek, confluent_kafka.TopicPartition(topic, partition, offset))
+
+    async def _process(self, messages: list[Any]) -> bool:
+        """Handle a consumed batch, return whether it succeeded and its offsets can be committed."""
+        events = []
+        for message in messages:
+            if message.error():
+                logger.error(f"Kafka error: {message.error()}")
+                continue
+            events.append(_decode(message))
+
+        try:
+            await self.dispatch(events)
+        except Exception as e:
+            self._failed_attempts += 1
+            logger.error(
+                f"Handling a batch of {len(events)} events failed (attempt {self._failed_attempts}), "
+                f"it is consumed again: {e}"
+            )
+        else:
+            self._failed_attempts = 0
+            return True
+
+        backoff = min(self._retry_backoff * 2 ** (self._failed_attempts - 1), self._retry_max_backoff)
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._stop.wait(), timeout=backoff)
+        # left uncommitted and consumed again, by this worker or after the restart
+        await self._rewind(messages)
+        return False
+
+    async def run(self) -> None:
+        await self._call_consumer(self._consumer.subscribe, self._topics)
+        logger.info(f"Listening for messages on Kafka topics {self._topics}...")
+        try:
+            while not self._stop.is_set():
+                messages = await self._call_consumer(
+                    self._consumer.consume, num_messages=self._batch_size, timeout=self._poll_timeout
+                )
+                if not messages:
+                    continue
+                if not await self._process(messages):
+                    continue
+                await self._call_consumer(self._consumer.commit, asynchronous=False)
+                await self._call_consumer(record_consumer_lag, self._consumer, messages)
+        finally:
+            await self._call_consumer(self._consumer.close)
+            self._consumer_thread.shutdown(wait=False)
+            self._worker_pool.shutdown(wait=True)
+            logger.info("Kafka consumer stopped")
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Finish the batch in progress, commit it if it succeeded and close the consumer."""
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+
+
+def create_kafka_consumer(settings: KafkaSettings | None = None, consumer: Any = None) -> KafkaConsumerWorker:
+    """
+    Worker consuming the topics of the registered handlers, created once in the app's lifespan.
+    `consumer` replaces the librdkafka consumer built from the settings, e.g. with an in-memory stand-in.
+    """
+    settings = settings or KafkaSettings()
+    if consumer is None:
+        config = _get_kafka_consumer_config(
+            bootstrap_url=settings.BOOTSTRAP_URL,
+            group_id=settings.GROUP_ID,
+            auth_scheme=settings.AUTHENTICATION_SCHEME,
+        )
+        consumer = confluent_kafka.Consumer(config)
+    topics = sorted({topic for topic, _ in _handlers} | {settings.TOPIC})
+    return KafkaConsumerWorker(
+        consumer=consumer,
+        topics=topics,
+        batch_size=settings.CONSUMER_BATCH_SIZE,
+        poll_timeout=settings.CONSUMER_POLL_TIMEOUT_S,
+        workers=settings.CONSUMER_WORKERS,
+        retry_backoff=settings.CONSUMER_RETRY_BACKOFF_S,
+        retry_max_backoff=settings.CONSUMER_RETRY_MAX_BACKOFF_S,
+    )
@@ -0,0 +1,51 @@
+import orjson
+from pydantic import ValidationError
+
+from visit_manager.app.models.user_models import BulkVisitFailure, VisitCreateEvent
+from visit_manager.kafka_utils.common import KafkaTopics
+from visit_manager.kafka_utils.consumer import KafkaEvent, kafka_handler
+from visit_manager.package_utils.logger_conf import logger
+from visit_manager.postgres_utils.models.outbox import add_outbox_event
+from visit_manager.postgres_utils.models.service_types import invalidate_service_types, preload_service_types
+from visit_manager.postgres_utils.models.visits import bulk_ingest_visits
+from visit_manager.postgres_utils.utils import get_session_factory
+
+
+@kafka_handler(KafkaTopics.VISITS, "visit_created")
+async def ingest_visits(events: list[KafkaEvent]) -> None:
+    """
+    Store the visits booked by the visit scheduler, one transaction per consumed batch.
+    Visits that cannot be stored are announced back on the visits topic as `visit_rejected`.
+    """
+    visits: list[VisitCreateEvent] = []
+    invalid: list[BulkVisitFailure] = []
+    for event in events:
+        try:
+            visits.append(VisitCreateEvent.model_validate(event.payload))
+        except ValidationError as e:
+            key = event.payload.get("idempotency_key") if isinstance(event.payload, dict) else None
+            invalid.append(BulkVisitFailure(idempotency_key=key, reason=f"Invalid event: {e.error_count()} errors"))
+
+    async with get_session_factory()() as session, session.begin():
+        report = await bulk_ingest_visits(session, visits)
+        report.failures.extend(invalid)
+        for failure in report.failures:
+            add_outbox_event(
+                session,
+                KafkaTopics.VISITS,
+                orjson.dumps({"event_type": "visit_rejected"} | failure.model_dump()),
+                key=failure.idempotency_key,
+            )
+
+    logger.info(
+        f"Ingested {len(report.inserted)} visits, {len(report.duplicates)} duplicates, {len(report.failures)} rejected"
+    )
+    for failure in report.failures:
+        logger.warning(f"Visit {failure.idempotency_key} rejected: {failure.reason}")
+
+
+@kafka_handler(KafkaTopics.USERS, "service_types_changed")
+async def reload_service_types(events: list[KafkaEvent]) -> None:
+    """Reload the service type cache after the service_type table was changed, however many events announce it."""
+    invalidate_service_types()
+    await preload_service_types()
@@ -0,0 +1,120 @@
+import asyncio
+import contextlib
+from datetime import datetime, timedelta, timezone
+
+import orjson
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from visit_manager.kafka_utils.producer import AsyncKafkaProducer, get_producer
+from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.settings import KafkaSettings
+from visit_manager.package_utils.tracing import extract_trace_context
+from visit_manager.postgres_utils.models.models import OutboxEvent
+from visit_manager.postgres_utils.timestamps import make_naive
+from visit_manager.postgres_utils.utils import get_session_factory
+
+
+async def _claim_outbox_events(
+    session_factory: async_sessionmaker[AsyncSession], batch_size: int, claim_for: float
+) -> list[OutboxEvent]:
+    """Claim up to `batch_size` of the oldest unclaimed outbox events for `claim_for` seconds."""
+    now = make_naive(datetime.now(timezone.utc))
+    claimable = (
+        select(OutboxEvent.outbox_event_id)
+        .where(or_(OutboxEvent.claimed_until.is_(None), OutboxEvent.claimed_until < now))
+        .order_by(OutboxEvent.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    async with session_factory() as session, session.begin():
+        result = await session.scalars(
+            update(OutboxEvent)
+            .where(OutboxEvent.outbox_event_id.in_(claimable))
+            .values(claimed_until=now + timedelta(seconds=claim_for))
+            .returning(OutboxEvent)
+            .execution_options(synchronize_session=False)
+        )
+        return sorted(result.all(), key=lambda event: event.created_at)
+
+
+async def relay_outbox_batch(
+    session_factory: async_sessionmaker[AsyncSession],
+    producer: AsyncKafkaProducer,
+    batch_size: int,
+    delivery_timeout: float,
+) -> int:
+    """
+    Publish up to `batch_size` of the oldest outbox events and delete the ones the broker acknowledged.
+
+    The events are claimed for twice `delivery_timeout` in a short transaction of their own (their rows are locked
+    with SKIP LOCKED only while claiming), so several replicas can drain the outbox concurrently without
+    publishing the same event twice, and no transaction stays open while the broker acknowledges them.
+    The acknowledged ones are deleted in a second transaction; the others are published again once their
+    claim expired. This gives at-least-once semantics: a crash between the ack and the delete publishes
+    an event again. Returns the number of delivered events.
+    """
+    # claimed past the delivery timeout, messages still queued in the producer may yet be acknowledged
+    events = await _claim_outbox_events(session_factory, batch_size, 2 * delivery_timeout)
+    if not events:
+        return 0
+
+    futures = [
+        producer.produce(
+            e.topic,
+            value=e.payload.encode("utf-8"),
+            key=e.key,
+            trace_context=extract_trace_context(orjson.loads(e.trace_context)) if e.trace_context else None,
+        )
+        for e in events
+    ]
+    done, pending = await asyncio.wait(futures, timeout=delivery_timeout)
+    for future in pending:
+        # still queued in librdkafka; the row stays and is published again once its claim expired
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    delivered = []
+    for event, future in zip(events, futures):
+        if future not in done:
+            continue
+        if future.exception() is not None:
+            logger.error(f"Outbox event {event.outbox_event_id} delivery failed: {future.exception()}")
+            continue
+        delivered.append(event.outbox_event_id)
+
+    if delivered:
+        async with session_factory() as session, session.begin():
+            await session.execute(delete(OutboxEvent).where(OutboxEvent.outbox_event_id.in_(delivered)))
+    return len(delivered)
+
+
+async def run_outbox_relay(
+    stop: asyncio.Event,
+    settings: KafkaSettings | None = None,
+    session_factory: async_sessionmaker[AsyncSession] | None = None,
+    producer: AsyncKafkaProducer | None = None,
+) -> None:
+    """
+    Drain the outbox until `stop` is set.
+    Full batches are followed immediately by the next one, otherwise the relay sleeps for the poll interval.
+    The shared session factory and producer are used unless others are given.
+    """
+    settings = settings or KafkaSettings()
+    session_factory = session_factory or get_session_factory()
+    # an idle producer has a length of 0, hence no `or`
+    producer = get_producer() if producer is None else producer
+    logger.info("Starting outbox relay")
+
+    while not stop.is_set():
+        try:
+            delivered = await relay_outbox_batch(
+                session_factory, producer, settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_DELIVERY_TIMEOUT_S
+            )
+        except Exception as e:
+            logger.error(f"Outbox relay failed: {e}")
+            delivered = 0
+        if delivered < settings.OUTBOX_BATCH_SIZE:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop.wait(), timeout=settings.OUTBOX_POLL_INTERVAL_S)
+
+    logger.info("Outbox relay stopped")
@@ -1,11 +1,24 @@
+import asyncio
 import functools
+import threading
+import time
+from typing import Any
 
 import confluent_kafka  # type: ignore[import-untyped]
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.trace import SpanKind, Status, StatusCode
 
 from visit_manager.kafka_utils.common import KafkaTopics
 from visit_manager.kafka_utils.oauth import KafkaTokenProvider
 from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.metrics import (
+    KAFKA_DELIVERY_SECONDS,
+    KAFKA_PRODUCE_SECONDS,
+    KAFKA_PRODUCER_QUEUE_MESSAGES,
+)
 from visit_manager.package_utils.settings import KafkaSettings, kafka_authentication_scheme_t
+from visit_manager.package_utils.tracing import inject_trace_context, tracer
 
 
 def _get_kafka_config(
@@ -28,33 +41,159 @@ def _get_kafka_config(
     return config
 
 
-def _callback(error: str, message: str) -> None:
+def _resolve(future: "asyncio.Future[Any]", error: Any, message: Any) -> None:
+    # runs on the event loop, scheduled from the producer's poll thread
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(confluent_kafka.KafkaException(error))
+    else:
+        future.set_result(message)
+
+
+def _log_delivery(future: "asyncio.Future[Any]") -> None:
+    if future.cancelled():
+        return
+    error = future.exception()
     if error is not None:
         logger.error(f"Message delivery failed: {error}")
     else:
-        logger.info(f"Delivered message {message}")
+        message = future.result()
+        logger.debug(f"Delivered message to {message.topic()} [{message.partition()}] @ {message.offset()}")
+
+
+class AsyncKafkaProducer:
+    """
+    Non-blocking wrapper around confluent_kafka.Producer.
+
+    `produce` only appends to librdkafka's local queue and returns a future resolved with the delivery
+    report, so publishing never waits for the broker on the event loop. Batching and compression are left
+    to librdkafka (`linger.ms`, `batch.size`, `compression.type`); delivery callbacks are served by a
+    dedicated poll thread and handed back to the loop that produced the message.
+    """
+
+    def __init__(self, config: dict[str, (str | int | bool | object | None)]):
+        self._producer = confluent_kafka.Producer(config)
+        self._closing = threading.Event()
+        self._poll_thread = threading.Thread(target=self._poll_loop, name="kafka-producer-poll", daemon=True)
+        self._poll_thread.start()
+
+    def _poll_loop(self) -> None:
+        while not self._closing.is_set():
+            self._producer.poll(0.1)
+
+    def __len__(self) -> int:
+        """Number of messages waiting in the local queue for delivery."""
+        return len(self._producer)
+
+    def produce(
+        self,
+        topic: str,
+        value: bytes,
+        key: str | None = None,
+        headers: dict[str, str | bytes | None] | None = None,
+        trace_context: Context | None = None,
+    ) -> "asyncio.Future[Any]":
+        """
+        Enqueue a message and return a future resolved with the delivered message.
+        The message is traced from here to its delivery report, as a child of `trace_context` (the current
+        context by default), and carries the trace context in its headers for the consumers.
+        Must be called from a running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[Any] = loop.create_future()
+        start = time.perf_counter()
+        span = tracer.start_span(
+            f"publish {topic}",
+            context=trace_context,
+            kind=SpanKind.PRODUCER,
+            attributes={"messaging.system": "kafka", "messaging.destination.name": topic},
+        )
+        headers = {**(headers or {}), **inject_trace_context(trace.set_span_in_context(span))}
+
+        def on_delivery(error: Any, message: Any) -> None:
+            # runs on the poll thread
+            outcome = "failed" if error is not None else "delivered"
+            KAFKA_DELIVERY_SECONDS.labels(topic, outcome).observe(time.perf_counter() - start)
+            if error is not None:
+                span.set_status(Status(StatusCode.ERROR, str(error)))
+            span.end()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_resolve, future, error, message)
+
+        try:
+            self._producer.produce(topic, value=value, key=key, headers=headers, on_delivery=on_delivery)
+        except (BufferError, confluent_kafka.KafkaException) as e:
+            # local queue is full (queue.buffering.max.messages) or the message was rejected outright
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR))
+            span.end()
+            future.set_exception(e)
+        KAFKA_PRODUCE_SECONDS.labels(topic).observe(time.perf_counter() - start)
+        return future
+
+    def flush(self, timeout: float) -> int:
+        """Block until all queued messages are delivered or `timeout` passes, return the number left."""
+        remaining: int = self._producer.flush(timeout)
+        return remaining
+
+    def close(self, timeout: float) -> int:
+        remaining = self.flush(timeout)
+        self._closing.set()
+        self._poll_thread.join(timeout=1.0)
+        return remaining
 
 
 @functools.lru_cache(maxsize=1)
-def _get_producer() -> confluent_kafka.Producer:  # type: ignore[no-any-unimported]
+def get_producer() -> AsyncKafkaProducer:
     settings = KafkaSettings()
     logger.info("Initializing Kafka producer")
 
     auth_scheme: kafka_authentication_scheme_t = settings.AUTHENTICATION_SCHEME
 
-    config = _get_kafka_config(bootstrap_url=settings.BOOTSTRAP_URL, auth_scheme=auth_scheme)
+    config = _get_kafka_config(bootstrap_url=settings.BOOTSTRAP_URL, auth_scheme=auth_scheme) | {
+        "linger.ms": settings.PRODUCER_LINGER_MS,
+        "batch.size": settings.PRODUCER_BATCH_SIZE,
+        "compression.type": settings.PRODUCER_COMPRESSION_TYPE,
+        "enable.idempotence": True,
+    }
 
-    producer = confluent_kafka.Producer(config)
+    producer = AsyncKafkaProducer(config)
+    KAFKA_PRODUCER_QUEUE_MESSAGES.set_function(producer.__len__)
     logger.info("Initialized Kafka producer")
     return producer
 
 
-def send_message(message: str, topic: KafkaTopics) -> None:
+def send_message(message: str, topic: KafkaTopics, key: str | None = None) -> "asyncio.Future[Any]":
+    """
+    Enqueue a message for the Kafka topic without waiting for the broker.
+    Delivery failures are logged; await the returned future to act on the delivery report.
+    """
+    future = get_producer().produce(topic.topic_name, value=message.encode("utf-8"), key=key)
+    future.add_done_callback(_log_delivery)
+    return future
+
+
+async def publish(message: str, topic: KafkaTopics, key: str | None = None) -> Any:
     """
-    Send a message to the Kafka topic.
+    Send a message to the Kafka topic and wait for the broker to acknowledge it.
+    Raises confluent_kafka.KafkaException if the delivery failed.
     """
+    return await send_message(message, topic, key)
+
 
-    producer = _get_producer()
-    producer.poll(timeout=0.0)
-    producer.produce(topic.topic_name, value=message.encode("utf-8"), key="message", callback=_callback)
-    producer.flush()
+async def close_producer() -> None:
+    """
+    Flush pending messages and stop the producer, if it was ever created.
+    Meant for the application shutdown.
+    """
+    if get_producer.cache_info().currsize == 0:
+        return
+    producer = get_producer()
+    timeout = KafkaSettings().PRODUCER_FLUSH_TIMEOUT_S
+    logger.info(f"Flushing {len(producer)} pending Kafka messages")
+    remaining = await asyncio.to_thread(producer.close, timeout)
+    if remaining:
+        logger.error(f"{remaining} Kafka messages were not delivered before shutdown")
+    KAFKA_PRODUCER_QUEUE_MESSAGES.set_function(lambda: remaining)
+    get_producer.cache_clear()
@@ -0,0 +1,27 @@
+import httpx
+from fastapi import Request
+
+from visit_manager.package_utils.settings import VisitManagerSettings
+
+
+def create_http_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    """
+    Pooled client for outgoing HTTP calls, created once in the app's lifespan.
+    Pass `transport` (e.g. `httpx.MockTransport`) to answer requests locally.
+    """
+    settings = VisitManagerSettings()
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.HTTP_TIMEOUT_S, connect=settings.HTTP_CONNECT_TIMEOUT_S),
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_S,
+        ),
+        transport=transport,
+    )
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    """Dependency returning the app's shared client, override it to stub outgoing calls."""
+    client: httpx.AsyncClient = request.app.state.http_client
+    return client
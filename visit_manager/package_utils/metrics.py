@@ -0,0 +1,66 @@
+from prometheus_client import Gauge, Histogram
+
+# latencies from sub-millisecond cache hits to calls running into their timeouts
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUEST_DURATION_SECONDS = Histogram(
+    "visit_manager_http_request_duration_seconds",
+    "Time spent handling an HTTP request, by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "visit_manager_db_pool_checkout_seconds",
+    "Time spent waiting for a connection from the SQLAlchemy pool",
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_CHECKED_OUT_CONNECTIONS = Gauge(
+    "visit_manager_db_pool_checked_out_connections",
+    "Connections of the SQLAlchemy pool currently in use",
+)
+
+DB_POOL_IDLE_CONNECTIONS = Gauge(
+    "visit_manager_db_pool_idle_connections",
+    "Connections of the SQLAlchemy pool open and waiting to be checked out",
+)
+
+DB_STATEMENT_DURATION_SECONDS = Histogram(
+    "visit_manager_db_statement_duration_seconds",
+    "Time spent executing a SQL statement, by statement kind (SELECT, INSERT...)",
+    ["statement"],
+    buckets=LATENCY_BUCKETS,
+)
+
+KAFKA_PRODUCE_SECONDS = Histogram(
+    "visit_manager_kafka_produce_seconds",
+    "Time spent appending a message to the producer's local queue",
+    ["topic"],
+    buckets=LATENCY_BUCKETS,
+)
+
+KAFKA_DELIVERY_SECONDS = Histogram(
+    "visit_manager_kafka_delivery_seconds",
+    "Time from producing a message to its delivery report",
+    ["topic", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+KAFKA_PRODUCER_QUEUE_MESSAGES = Gauge(
+    "visit_manager_kafka_producer_queue_messages",
+    "Messages waiting in the producer's local queue for delivery",
+)
+
+KAFKA_CONSUMER_LAG_MESSAGES = Gauge(
+    "visit_manager_kafka_consumer_lag_messages",
+    "Messages of a partition not consumed yet, as of the last consumed batch",
+    ["topic", "partition"],
+)
+
+STRIPE_REQUEST_DURATION_SECONDS = Histogram(
+    "visit_manager_stripe_request_duration_seconds",
+    "Time spent on a single attempt of a Stripe call, by operation and outcome",
+    ["operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
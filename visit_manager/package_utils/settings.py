@@ -2,15 +2,44 @@ from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+tracing_exporter_t = Literal["none", "otlp", "file"]
+
 
 class VisitManagerSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="VISIT_MANAGER_", env_file=".env", env_file_encoding="utf-8")
 
     LOG_LEVEL: str = "INFO"
     ROOT_PATH: str = ""
+    TOKEN_CACHE_SIZE: int = 10_000
+    TOKEN_CACHE_TTL_S: float = 300.0
+    # identities are invalidated locally on registration, the ttl bounds staleness on the other replicas
+    IDENTITY_CACHE_SIZE: int = 10_000
+    IDENTITY_CACHE_TTL_S: float = 60.0
+    # calendars are invalidated locally on booking, the ttl bounds staleness on the other replicas
+    AVAILABILITY_CACHE_SIZE: int = 10_000
+    AVAILABILITY_CACHE_TTL_S: float = 30.0
+    # service types are preloaded at startup and reloaded by a `service_types_changed` event on the users topic,
+    # which reaches one replica of the consumer group; the ttl bounds staleness on the others
+    SERVICE_TYPE_CACHE_TTL_S: float = 3600.0
+    HTTP_TIMEOUT_S: float = 10.0
+    HTTP_CONNECT_TIMEOUT_S: float = 5.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY_S: float = 30.0
+    # "none" leaves the no-op tracer of the OpenTelemetry API in place, spans then cost next to nothing
+    TRACING_EXPORTER: tracing_exporter_t = "none"
+    # share of the traces started here that are recorded, traces started upstream follow the caller's decision
+    TRACING_SAMPLE_RATIO: float = 0.05
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    # count the SQL statements of every request, reported in X-DB-* response headers and the logs
+    QUERY_COUNTER: bool = False
+    # a statement repeated this many times within one request is logged as a likely N+1
+    QUERY_COUNTER_N_PLUS_ONE_THRESHOLD: int = 5
 
 
 kafka_authentication_scheme_t = Literal["oauth", "none"]
+kafka_compression_type_t = Literal["none", "gzip", "snappy", "lz4", "zstd"]
 
 
 class KafkaSettings(BaseSettings):
@@ -20,6 +49,20 @@ class KafkaSettings(BaseSettings):
     BOOTSTRAP_URL: str
     GROUP_ID: str = "visit_manager"
     AUTHENTICATION_SCHEME: kafka_authentication_scheme_t = "none"
+    PRODUCER_LINGER_MS: int = 20
+    PRODUCER_BATCH_SIZE: int = 256 * 1024
+    PRODUCER_COMPRESSION_TYPE: kafka_compression_type_t = "lz4"
+    PRODUCER_FLUSH_TIMEOUT_S: float = 10.0
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_S: float = 0.5
+    OUTBOX_DELIVERY_TIMEOUT_S: float = 30.0
+    CONSUMER_BATCH_SIZE: int = 500
+    CONSUMER_POLL_TIMEOUT_S: float = 1.0
+    CONSUMER_WORKERS: int = 4
+    # a failed batch is consumed again after a backoff doubling from CONSUMER_RETRY_BACKOFF_S, kept well
+    # below max.poll.interval.ms so the consumer stays in its group
+    CONSUMER_RETRY_BACKOFF_S: float = 1.0
+    CONSUMER_RETRY_MAX_BACKOFF_S: float = 30.0
 
 
 class PostgresSettings(BaseSettings):
@@ -29,3 +72,46 @@ class PostgresSettings(BaseSettings):
     PASSWORD: str
     HOST: str
     PORT: int = 5432
+
+    # log every SQL statement, only meant for local debugging
+    ECHO: bool = False
+    POOL_SIZE: int = 10
+    MAX_OVERFLOW: int = 10
+    POOL_TIMEOUT_S: float = 30.0
+    POOL_PRE_PING: bool = True
+    POOL_RECYCLE_S: int = 1800
+    STATEMENT_TIMEOUT_MS: int = 30_000
+    # schema changes give up instead of waiting longer for a table lock, queries on the table would queue behind them
+    MIGRATION_LOCK_TIMEOUT_MS: int = 5_000
+
+
+stripe_backend_t = Literal["stripe", "fake"]
+
+
+class StripeSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="STRIPE_", env_file=".env", env_file_encoding="utf-8")
+
+    API_KEY: str | None = None
+    # "fake" answers from memory, for load tests without Stripe
+    BACKEND: stripe_backend_t = "stripe"
+    FAKE_LATENCY_S: float = 0.05
+    FAKE_FAILURE_RATE: float = 0.0
+    # deadline of one gateway call, retries included; each attempt is also capped at ATTEMPT_TIMEOUT_S
+    TIMEOUT_S: float = 10.0
+    ATTEMPT_TIMEOUT_S: float = 4.0
+    MAX_RETRIES: int = 2
+    RETRY_BACKOFF_S: float = 0.2
+    RETRY_MAX_BACKOFF_S: float = 2.0
+    # the breaker opens when at least BREAKER_MIN_CALLS calls in the last BREAKER_WINDOW_S
+    # failed in a ratio of BREAKER_FAILURE_RATIO or more, and lets a probe call through after BREAKER_OPEN_S
+    BREAKER_FAILURE_RATIO: float = 0.5
+    BREAKER_MIN_CALLS: int = 20
+    BREAKER_WINDOW_S: float = 30.0
+    BREAKER_OPEN_S: float = 15.0
+    WEBHOOK_SECRET: str | None = None
+    WEBHOOK_TOLERANCE_S: int = 300
+    # webhook events are applied in batches of up to WEBHOOK_BATCH_SIZE, waiting at most WEBHOOK_MAX_DELAY_S
+    # for a batch to fill; past WEBHOOK_MAX_PENDING queued events Stripe is answered 503 and retries later
+    WEBHOOK_BATCH_SIZE: int = 500
+    WEBHOOK_MAX_DELAY_S: float = 0.05
+    WEBHOOK_MAX_PENDING: int = 10_000
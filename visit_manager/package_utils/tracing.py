@@ -0,0 +1,76 @@
+import os
+from typing import Any, Iterable, Mapping
+
+from opentelemetry import propagate, trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.settings import VisitManagerSettings
+
+SERVICE_NAME = "visit-manager"
+
+# a proxy until configure_tracing installs the SDK provider, spans are no-ops meanwhile
+tracer = trace.get_tracer("visit_manager")
+
+
+def _file_exporter(path: str) -> SpanExporter:
+    # one JSON span per line, appended so restarts keep the earlier traces
+    def formatter(span: ReadableSpan) -> str:
+        line: str = span.to_json(indent=None)
+        return line + os.linesep
+
+    return ConsoleSpanExporter(out=open(path, "a", encoding="utf-8"), formatter=formatter)
+
+
+def _create_exporter(settings: VisitManagerSettings) -> SpanExporter:
+    if settings.TRACING_EXPORTER == "file":
+        return _file_exporter(settings.TRACING_FILE_PATH)
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+    return OTLPSpanExporter(endpoint=settings.TRACING_OTLP_ENDPOINT)
+
+
+def configure_tracing(settings: VisitManagerSettings | None = None) -> TracerProvider | None:
+    """
+    Install the tracer provider exporting the spans of this process, once in the app's lifespan.
+
+    Root spans are sampled with TRACING_SAMPLE_RATIO, the others follow their parent, so a trace is either
+    recorded across every service and Kafka hop or not at all. Spans are exported in batches from a
+    background thread. Returns None when tracing is off, otherwise the provider to shut down on exit.
+    """
+    settings = settings or VisitManagerSettings()
+    if settings.TRACING_EXPORTER == "none":
+        return None
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(_create_exporter(settings)))
+    trace.set_tracer_provider(provider)
+    logger.info(
+        f"Exporting {settings.TRACING_SAMPLE_RATIO:.0%} of the traces with the {settings.TRACING_EXPORTER} exporter"
+    )
+    return provider
+
+
+def inject_trace_context(context: Context | None = None) -> dict[str, str]:
+    """W3C trace context headers (`traceparent`...) of `context`, the current one by default."""
+    carrier: dict[str, str] = {}
+    propagate.inject(carrier, context=context)
+    return carrier
+
+
+def extract_trace_context(headers: Mapping[str, str]) -> Context:
+    """Context of the trace described by W3C trace context headers, an empty one without them."""
+    return propagate.extract(headers)
+
+
+def kafka_trace_context(headers: Iterable[tuple[str, Any]] | None) -> Context:
+    """Context propagated in the headers of a consumed Kafka message."""
+    return extract_trace_context(
+        {name: value.decode("utf-8") for name, value in headers or [] if isinstance(value, bytes)}
+    )
@@ -0,0 +1,12 @@
+from sqlalchemy.exc import DBAPIError
+
+# https://www.postgresql.org/docs/current/errcodes-appendix.html
+UNIQUE_VIOLATION = "23505"
+EXCLUSION_VIOLATION = "23P01"
+DUPLICATE_DATABASE = "42P04"
+
+
+def get_sqlstate(error: DBAPIError) -> str | None:
+    """Postgres error code of a failed statement, None for errors not raised by Postgres."""
+    sqlstate: str | None = getattr(error.orig, "sqlstate", None) or getattr(error.orig, "pgcode", None)
+    return sqlstate
@@ -0,0 +1,132 @@
+"""
+Schema migration command, run once per deployment before the app starts (e.g. as an init container):
+
+    python -m visit_manager.postgres_utils.migrate [revision]
+
+Migrations are Alembic revisions in postgres_utils/migrations/versions. Every replica may run the command:
+the first one to take the migration advisory lock migrates, the others wait for it and find nothing left to do.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Callable
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.settings import PostgresSettings
+from visit_manager.postgres_utils.errors import DUPLICATE_DATABASE, get_sqlstate
+from visit_manager.postgres_utils.utils import get_url
+
+# pg_advisory_lock key of the migrations, the same in every replica
+MIGRATION_LOCK_ID = 7_415_283_602
+# seconds between attempts to take it while another replica migrates
+MIGRATION_LOCK_POLL_S = 1.0
+# revision matching the schema create_tables created before the migrations, stamped on databases created that way
+BASELINE_REVISION = "0001"
+
+
+def alembic_config(connection: Connection | None = None) -> Config:
+    """Alembic configuration of the migrations, running them on `connection` if given."""
+    config = Config()
+    config.set_main_option("script_location", "visit_manager.postgres_utils:migrations")
+    config.attributes["connection"] = connection
+    return config
+
+
+def _wait_for_migration_lock(connection: Connection) -> None:
+    """
+    Take the migration advisory lock, however long another replica holds it. Polled in short transactions rather
+    than waited for in one: a waiting transaction keeps a snapshot, which CREATE INDEX CONCURRENTLY in the replica
+    holding the lock would wait for in turn.
+    """
+    waiting = False
+    while True:
+        acquired = connection.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        connection.commit()
+        if acquired:
+            return
+        if not waiting:
+            logger.info("Waiting for the replica migrating the database")
+            waiting = True
+        time.sleep(MIGRATION_LOCK_POLL_S)
+
+
+def run_locked(connection: Connection, migrate: Callable[[Connection], None]) -> None:
+    """
+    Run `migrate` holding the migration advisory lock, on Postgres. Once the lock is taken, DDL waiting more than
+    MIGRATION_LOCK_TIMEOUT_MS for a table lock fails instead of queueing every query on the table behind it.
+    """
+    if connection.dialect.name == "postgresql":
+        _wait_for_migration_lock(connection)
+        lock_timeout_ms = PostgresSettings().MIGRATION_LOCK_TIMEOUT_MS
+        connection.execute(text(f"SET lock_timeout = {lock_timeout_ms:d}"))
+        # session level setting and lock, the migrations manage their own transactions
+        connection.commit()
+    try:
+        migrate(connection)
+    finally:
+        if connection.dialect.name == "postgresql":
+            connection.rollback()
+            connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            connection.commit()
+
+
+def _upgrade(connection: Connection, revision: str) -> None:
+    tables = inspect(connection).get_table_names()
+    connection.commit()
+    config = alembic_config(connection)
+    if "alembic_version" not in tables and "visit" in tables:
+        logger.info(f"Schema created before migrations, stamping it with revision {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, revision)
+
+
+async def upgrade(engine: AsyncEngine, revision: str = "head") -> None:
+    """Migrate the database of `engine` to `revision`."""
+    async with engine.connect() as connection:
+        await connection.run_sync(run_locked, lambda sync_connection: _upgrade(sync_connection, revision))
+
+
+async def create_database(name: str = "visit_manager") -> None:
+    """Create the app's database on the server if it does not exist yet."""
+    # CREATE DATABASE cannot run in a transaction, nor in the database being created
+    server_engine = create_async_engine(get_url("postgres"), isolation_level="AUTOCOMMIT")
+    try:
+        async with server_engine.connect() as connection:
+            result = await connection.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"), {"name": name})
+            if not result.scalar_one_or_none():
+                try:
+                    await connection.execute(text(f'CREATE DATABASE "{name}"'))
+                    logger.info(f"Database {name} created")
+                except DBAPIError as e:
+                    # created by another replica meanwhile
+                    if get_sqlstate(e) != DUPLICATE_DATABASE:
+                        raise
+    finally:
+        await server_engine.dispose()
+
+
+async def migrate(revision: str = "head") -> None:
+    await create_database()
+    engine = create_async_engine(get_url(), echo=PostgresSettings().ECHO)
+    try:
+        await upgrade(engine, revision)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("revision", nargs="?", default="head", help="revision to upgrade to, the latest by default")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.revision))
+
+
+if __name__ == "__main__":
+    main()
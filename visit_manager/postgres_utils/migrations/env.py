@@ -0,0 +1,47 @@
+"""
+Alembic environment of the migrations in versions/, see visit_manager.postgres_utils.migrate.
+
+Every revision runs in its own transaction, so a revision leaving it to build an index concurrently does not
+commit the ones before it halfway. Offline (`alembic upgrade --sql`) the Postgres script is printed.
+"""
+
+import asyncio
+
+from alembic import context
+from sqlalchemy import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from visit_manager.postgres_utils.migrate import run_locked
+from visit_manager.postgres_utils.models import Base
+from visit_manager.postgres_utils.utils import get_url
+
+
+def run_migrations(connection: Connection) -> None:
+    context.configure(connection=connection, target_metadata=Base.metadata, transaction_per_migration=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online() -> None:
+    # started by the alembic CLI, with a connection of its own
+    engine = create_async_engine(get_url())
+    try:
+        async with engine.connect() as connection:
+            await connection.run_sync(run_locked, run_migrations)
+    finally:
+        await engine.dispose()
+
+
+if context.is_offline_mode():
+    context.configure(
+        dialect_name="postgresql",
+        target_metadata=Base.metadata,
+        literal_binds=True,
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+elif context.config.attributes.get("connection") is not None:
+    run_migrations(context.config.attributes["connection"])
+else:
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,117 @@
+"""Operations for the revisions in versions/ changing tables that are written to while they run."""
+
+from contextlib import contextmanager
+from typing import Any, ContextManager, Iterator, Sequence
+
+from alembic import context, op
+from alembic.operations import BatchOperations
+from sqlalchemy import CheckConstraint, Column, inspect, text
+
+
+def _is_postgresql() -> bool:
+    return bool(op.get_context().dialect.name == "postgresql")
+
+
+def _copy_table(table_name: str) -> ContextManager[BatchOperations]:
+    """
+    `op.batch_alter_table`, which copies the table on SQLite (ALTER TABLE on Postgres); the unnamed CHECK
+    constraints it would leave out of the copy are passed again.
+    """
+    if _is_postgresql():
+        return op.batch_alter_table(table_name)
+    checks = tuple(
+        CheckConstraint(check["sqltext"])
+        for check in inspect(op.get_bind()).get_check_constraints(table_name)
+        if check["name"] is None
+    )
+    return op.batch_alter_table(table_name, table_args=checks)
+
+
+def add_column_if_not_exists(table_name: str, column: Column[Any]) -> None:
+    """Add `column` to the table unless a create_tables run after it was introduced created it already."""
+    if _is_postgresql():
+        op.add_column(table_name, column, if_not_exists=True)
+    elif column.name not in {existing["name"] for existing in inspect(op.get_bind()).get_columns(table_name)}:
+        op.add_column(table_name, column)
+
+
+@contextmanager
+def _without_lock_timeout() -> Iterator[None]:
+    """
+    Lift the migration's lock_timeout: a concurrent build does not block writes, it may wait for the transactions
+    running on the table to end instead of failing after the timeout.
+    """
+    if context.is_offline_mode():
+        yield
+        return
+    connection = op.get_bind()
+    lock_timeout = connection.scalar(text("SHOW lock_timeout"))
+    connection.execute(text("SET lock_timeout = 0"))
+    try:
+        yield
+    finally:
+        connection.execute(text("SELECT set_config('lock_timeout', :value, false)"), {"value": lock_timeout})
+
+
+def create_index_concurrently(index_name: str, table_name: str, columns: Sequence[str], **kwargs: Any) -> None:
+    """
+    Build an index without blocking writes to the table: CREATE INDEX CONCURRENTLY, outside of a transaction.
+    A build that failed before (deploy interrupted, duplicate values) leaves an invalid index behind, it is
+    dropped and built again; an index that already exists and is valid is kept.
+    """
+    if not _is_postgresql():
+        op.create_index(index_name, table_name, list(columns), if_not_exists=True, **kwargs)
+        return
+    with op.get_context().autocommit_block(), _without_lock_timeout():
+        if not context.is_offline_mode():
+            invalid = op.get_bind().scalar(
+                text(
+                    "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+                    "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+                ),
+                {"name": index_name},
+            )
+            if invalid:
+                op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+        op.create_index(
+            index_name, table_name, list(columns), postgresql_concurrently=True, if_not_exists=True, **kwargs
+        )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """Drop an index without blocking the queries on the table, the opposite of `create_index_concurrently`."""
+    if not _is_postgresql():
+        op.drop_index(index_name, table_name=table_name, if_exists=True)
+        return
+    with op.get_context().autocommit_block(), _without_lock_timeout():
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def add_unique_constraint_concurrently(constraint_name: str, table_name: str, columns: Sequence[str]) -> None:
+    """
+    Add a UNIQUE constraint without blocking writes to the table: its index is built with
+    `create_index_concurrently` and the constraint then takes the index over, which only needs a brief lock.
+    A constraint that already exists is kept. On SQLite the table is copied with the constraint added.
+    """
+    if not _is_postgresql():
+        constraints = inspect(op.get_bind()).get_unique_constraints(table_name)
+        if set(columns) not in [set(constraint["column_names"]) for constraint in constraints]:
+            with _copy_table(table_name) as batch:
+                batch.create_unique_constraint(constraint_name, list(columns))
+        return
+    create_index_concurrently(constraint_name, table_name, columns, unique=True)
+    op.execute(
+        f"""
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{constraint_name}') THEN
+                ALTER TABLE {table_name} ADD CONSTRAINT {constraint_name} UNIQUE USING INDEX {constraint_name};
+            END IF;
+        END $$
+        """
+    )
+
+
+def drop_unique_constraint(constraint_name: str, table_name: str) -> None:
+    """The opposite of `add_unique_constraint_concurrently`."""
+    with _copy_table(table_name) as batch:
+        batch.drop_constraint(constraint_name, type_="unique")
@@ -0,0 +1,302 @@
+"""
+Baseline: the schema create_tables created before the migrations. Databases created by create_tables are stamped
+with this revision instead of running it, so it must not change: later schema changes are later revisions.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-06-01 00:00:00
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+import sqlalchemy_utils
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: str | Sequence[str] | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+SERVICE_TYPES = {
+    "electrician": "Electrician for fixing electrical problems",
+    "plumber": "Plumber for fixing plumbing problems",
+    "carpenter": "Carpenter for fixing carpentry problems",
+    "painter": "Painter for painting problems",
+    "cleaner": "Cleaner for cleaning problems",
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "address",
+        sa.Column("address_id", sa.Uuid(), server_default=sa.func.gen_random_uuid(), nullable=False),
+        sa.Column("latitude", sa.Float(), nullable=False),
+        sa.Column("longitude", sa.Float(), nullable=False),
+        sa.Column("street", sa.String(), nullable=False),
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("state_or_region", sa.String(), nullable=False),
+        sa.Column("country", sa.String(), nullable=False),
+        sa.Column("zip_code", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("address_id"),
+    )
+    op.create_table(
+        "attachment",
+        sa.Column("attachment_id", sa.Uuid(), server_default=sa.func.gen_random_uuid(), nullable=False),
+        sa.Column("object_uri", sa.String(), nullable=False),
+        sa.Column("creation_timestamp", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("modification_timestamp", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("attachment_id"),
+    )
+    op.create_table(
+        "payment",
+        sa.Column("payment_id", sa.Uuid(), server_default=sa.func.gen_random_uuid(), nullable=False),
+        sa.Column("stripe_charge_id", sa.String(), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column("currency", sa.String(), nullable=False),
+        sa.Column("transaction_timestamp", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("pending", "succeeded", "failed", "canceled", "refunded", name="payment_status"),
+            nullable=False,
+        ),
+        sa.CheckConstraint("amount > 0"),
+        sa.PrimaryKeyConstraint("payment_id"),
+    )
+    op.create_index(op.f("ix_payment_stripe_charge_id"), "payment", ["stripe_charge_id"], unique=True)
+    op.create_table(
+        "service_type",
+        sa.Column("service_type_id", sa.Uuid(), server_default=sa.func.gen_random_uuid(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("service_type_id"),
+        sa.UniqueConstraint("name"),
+    )
+    op.create_table(
+        "user",
+        sa.Column("user_id", sa.Uuid(), server_default=sa.func.gen_random_uuid(), nullable=False),
+        sa.Column("first_name", sa.String(), nullable=False),
+        sa.Column("last_name", sa.String(), nullable=False),
+        sa.Column("email", sqlalchemy_utils.types.email.EmailType(length=255), nullable=False),
+        sa.Column("registration_timestamp", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.Column("last_login", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_index(op.f("ix_user_email"), "user", ["email"], unique=True)
+    op.create_table(
+        "admin",
+        sa.Column("admin_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["admin_id"],
+            ["user.user_id"],
+        ),
+        sa.PrimaryKeyConstraint("admin_id"),
+    )
+    op.create_table(
+        "client",
+        sa.Column("client_id", sa.Uuid(), nullable=False),
+        sa.Column("registration_fee_payment_id", sa.Uuid(), nullable=True),
+        sa.Column("phone_number", sqlalchemy_utils.types.phone_number.PhoneNumberType(length=20), nullable=False),
+        sa.Column("is_active", sa.Boolean(), server_default="true", nullable=False),
+        sa.Column("address_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["address_id"],
+            ["address.address_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["client_id"],
+            ["user.user_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["registration_fee_payment_id"],
+            ["payment.payment_id"],
+        ),
+        sa.PrimaryKeyConstraint("client_id"),
+    )
+    op.create_index(op.f("ix_client_address_id"), "client", ["address_id"], unique=True)
+    op.create_index(
+        op.f("ix_client_registration_fee_payment_id"), "client", ["registration_fee_payment_id"], unique=True
+    )
+    op.create_table(
+        "vendor",
+        sa.Column("vendor_id", sa.Uuid(), nullable=False),
+        sa.Column("vendor_name", sa.String(), nullable=False),
+        sa.Column("required_deposit_gr", sa.Integer(), nullable=True),
+        sa.Column("registration_fee_payment_id", sa.Uuid(), nullable=True),
+        sa.Column("address_id", sa.Uuid(), nullable=False),
+        sa.Column("phone_number", sqlalchemy_utils.types.phone_number.PhoneNumberType(length=20), nullable=False),
+        sa.Column("is_active", sa.Boolean(), server_default="true", nullable=False),
+        sa.CheckConstraint("required_deposit_gr IS NULL OR required_deposit_gr > 0"),
+        sa.ForeignKeyConstraint(
+            ["address_id"],
+            ["address.address_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["registration_fee_payment_id"],
+            ["payment.payment_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["vendor_id"],
+            ["user.user_id"],
+        ),
+        sa.PrimaryKeyConstraint("vendor_id"),
+    )
+    op.create_index(op.f("ix_vendor_address_id"), "vendor", ["address_id"], unique=True)
+    op.create_index(
+        op.f("ix_vendor_registration_fee_payment_id"), "vendor", ["registration_fee_payment_id"], unique=True
+    )
+    op.create_table(
+        "vendor_offered_service_types",
+        sa.Column("vendor_id", sa.Uuid(), nullable=False),
+        sa.Column("service_type_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["service_type_id"],
+            ["service_type.service_type_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["vendor_id"],
+            ["vendor.vendor_id"],
+        ),
+        sa.PrimaryKeyConstraint("vendor_id", "service_type_id"),
+        sa.UniqueConstraint("vendor_id", "service_type_id"),
+    )
+    op.create_table(
+        "visit",
+        sa.Column("visit_id", sa.Uuid(), server_default=sa.func.gen_random_uuid(), nullable=False),
+        sa.Column("client_id", sa.Uuid(), nullable=False),
+        sa.Column("vendor_id", sa.Uuid(), nullable=False),
+        sa.Column("start_timestamp", sa.DateTime(), nullable=False),
+        sa.Column("end_timestamp", sa.DateTime(), nullable=False),
+        sa.Column("description", sa.String(), nullable=False),
+        sa.Column("service_type_id", sa.Uuid(), nullable=False),
+        sa.Column("address_id", sa.Uuid(), nullable=False),
+        sa.Column("deposit_id", sa.Uuid(), nullable=True),
+        sa.Column("verification_code", sa.String(), nullable=True),
+        sa.Column("review_opinion_score", sa.Integer(), nullable=True),
+        sa.Column("review_comment", sa.String(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "pending",
+                "vendor_rejected",
+                "client_rejected",
+                "confirmed",
+                "in_progress",
+                "completed",
+                "cancelled",
+                name="visit_status",
+            ),
+            nullable=False,
+        ),
+        sa.CheckConstraint("review_opinion_score IS NULL OR review_opinion_score >= 1 AND review_opinion_score <= 5"),
+        sa.CheckConstraint(
+            "(status = 'completed' AND review_opinion_score IS NOT NULL) OR review_opinion_score IS NULL"
+        ),
+        sa.ForeignKeyConstraint(
+            ["address_id"],
+            ["address.address_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["client_id"],
+            ["client.client_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["deposit_id"],
+            ["payment.payment_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["service_type_id"],
+            ["service_type.service_type_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["vendor_id"],
+            ["vendor.vendor_id"],
+        ),
+        sa.PrimaryKeyConstraint("visit_id"),
+    )
+    op.create_index(op.f("ix_visit_address_id"), "visit", ["address_id"], unique=False)
+    op.create_index(op.f("ix_visit_client_id"), "visit", ["client_id"], unique=False)
+    op.create_index(op.f("ix_visit_deposit_id"), "visit", ["deposit_id"], unique=True)
+    op.create_index(op.f("ix_visit_service_type_id"), "visit", ["service_type_id"], unique=False)
+    op.create_index(op.f("ix_visit_vendor_id"), "visit", ["vendor_id"], unique=False)
+    op.create_table(
+        "chat_session",
+        sa.Column("chat_session_id", sa.Uuid(), server_default=sa.func.gen_random_uuid(), nullable=False),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column("vendor_id", sa.Uuid(), nullable=False),
+        sa.Column("visit_id", sa.Uuid(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["user.user_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["vendor_id"],
+            ["vendor.vendor_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["visit_id"],
+            ["visit.visit_id"],
+        ),
+        sa.PrimaryKeyConstraint("chat_session_id"),
+        sa.UniqueConstraint("visit_id", "user_id", "vendor_id"),
+    )
+    op.create_index(op.f("ix_chat_session_user_id"), "chat_session", ["user_id"], unique=False)
+    op.create_index(op.f("ix_chat_session_vendor_id"), "chat_session", ["vendor_id"], unique=False)
+    op.create_index(op.f("ix_chat_session_visit_id"), "chat_session", ["visit_id"], unique=False)
+    op.create_table(
+        "visit_description_attachment",
+        sa.Column("visit_id", sa.Uuid(), nullable=False),
+        sa.Column("attachment_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["attachment_id"],
+            ["attachment.attachment_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["visit_id"],
+            ["visit.visit_id"],
+        ),
+        sa.PrimaryKeyConstraint("visit_id", "attachment_id"),
+        sa.UniqueConstraint("visit_id", "attachment_id"),
+    )
+    op.create_table(
+        "visit_review_attachment",
+        sa.Column("visit_id", sa.Uuid(), nullable=False),
+        sa.Column("attachment_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["attachment_id"],
+            ["attachment.attachment_id"],
+        ),
+        sa.ForeignKeyConstraint(
+            ["visit_id"],
+            ["visit.visit_id"],
+        ),
+        sa.PrimaryKeyConstraint("visit_id", "attachment_id"),
+        sa.UniqueConstraint("visit_id", "attachment_id"),
+    )
+    service_type = sa.table("service_type", sa.column("name", sa.String), sa.column("description", sa.String))
+    op.bulk_insert(
+        service_type, [{"name": name, "description": description} for name, description in SERVICE_TYPES.items()]
+    )
+
+
+def downgrade() -> None:
+    for table in (
+        "visit_review_attachment",
+        "visit_description_attachment",
+        "chat_session",
+        "visit",
+        "vendor_offered_service_types",
+        "vendor",
+        "client",
+        "admin",
+        "user",
+        "service_type",
+        "payment",
+        "attachment",
+        "address",
+    ):
+        op.drop_table(table)
+    if op.get_context().dialect.name == "postgresql":
+        op.execute("DROP TYPE IF EXISTS visit_status")
+        op.execute("DROP TYPE IF EXISTS payment_status")
@@ -0,0 +1,82 @@
+"""
+Tables added after the baseline: the Kafka outbox, the ids of the Stripe webhook events already applied and the
+vendors' running rating totals; and the idempotency key of the visits ingested from Kafka, unique so redelivered
+events are no-ops. Databases created by create_tables after some of these were added keep what they have.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-06-02 00:00:00
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+from visit_manager.postgres_utils.migrations.operations import (
+    add_column_if_not_exists,
+    add_unique_constraint_concurrently,
+    drop_unique_constraint,
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: str | Sequence[str] | None = "0001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox_event",
+        sa.Column("outbox_event_id", sa.Uuid(), server_default=sa.func.gen_random_uuid(), nullable=False),
+        sa.Column("topic", sa.String(), nullable=False),
+        sa.Column("key", sa.String(), nullable=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("trace_context", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("outbox_event_id"),
+        if_not_exists=True,
+    )
+    # trace_context came after the table
+    add_column_if_not_exists("outbox_event", sa.Column("trace_context", sa.Text(), nullable=True))
+    op.create_index(
+        op.f("ix_outbox_event_created_at"), "outbox_event", ["created_at"], unique=False, if_not_exists=True
+    )
+    op.create_table(
+        "stripe_event",
+        sa.Column("event_id", sa.String(), nullable=False),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("received_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint("event_id"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "vendor_rating",
+        sa.Column("vendor_id", sa.Uuid(), nullable=False),
+        sa.Column("ratings_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("ratings_sum", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("score_1_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("score_2_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("score_3_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("score_4_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("score_5_count", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(
+            ["vendor_id"],
+            ["vendor.vendor_id"],
+        ),
+        sa.PrimaryKeyConstraint("vendor_id"),
+        if_not_exists=True,
+    )
+    # nullable without a default, adding it does not rewrite the table
+    add_column_if_not_exists("visit", sa.Column("idempotency_key", sa.String(), nullable=True))
+    add_unique_constraint_concurrently("visit_idempotency_key_key", "visit", ["idempotency_key"])
+
+
+def downgrade() -> None:
+    drop_unique_constraint("visit_idempotency_key_key", "visit")
+    op.drop_column("visit", "idempotency_key")
+    op.drop_table("vendor_rating")
+    op.drop_table("stripe_event")
+    op.drop_index(op.f("ix_outbox_event_created_at"), table_name="outbox_event")
+    op.drop_table("outbox_event")
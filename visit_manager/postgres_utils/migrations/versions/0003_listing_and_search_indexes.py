@@ -0,0 +1,37 @@
+"""
+Indexes of the visit listings (vendor's and client's visits by start time), the payment listing and latest
+payment lookup, and the bounding box prefilter of the vendor search. Built concurrently, `visit` and
+`payment` keep taking writes meanwhile.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-06-03 00:00:00
+"""
+
+from typing import Sequence
+
+from visit_manager.postgres_utils.migrations.operations import create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: str | Sequence[str] | None = "0002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+INDEXES = {
+    "ix_visit_vendor_id_start_timestamp": ("visit", ["vendor_id", "start_timestamp", "visit_id"]),
+    "ix_visit_client_id_start_timestamp": ("visit", ["client_id", "start_timestamp", "visit_id"]),
+    "ix_payment_transaction_timestamp": ("payment", ["transaction_timestamp", "payment_id"]),
+    "ix_payment_status_transaction_timestamp": ("payment", ["status", "transaction_timestamp", "payment_id"]),
+    "ix_address_latitude_longitude": ("address", ["latitude", "longitude"]),
+}
+
+
+def upgrade() -> None:
+    for name, (table, columns) in INDEXES.items():
+        create_index_concurrently(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, (table, _) in INDEXES.items():
+        drop_index_concurrently(name, table)
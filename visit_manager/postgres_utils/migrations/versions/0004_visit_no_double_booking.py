@@ -0,0 +1,66 @@
+"""
+No double booking: booked visits of a vendor must not overlap, enforced on Postgres by the exclusion constraint
+ex_visit_vendor_id_booked_time (see models.Visit).
+
+Postgres can neither build an exclusion constraint concurrently nor add one NOT VALID, so writes to `visit` wait
+while its index is built. The revision holds nothing else, that build is its only blocking step, and the migration's
+lock_timeout makes it give up instead of queueing the app's queries behind a long transaction. Bookings made
+before the constraint that overlap have to be resolved first, the revision lists them and stops.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-06-04 00:00:00
+"""
+
+from typing import Sequence
+
+from alembic import context, op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: str | Sequence[str] | None = "0003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# visits in these statuses occupy the vendor's time, see misc.BOOKED_VISIT_STATUSES
+BOOKED_VISIT_STATUSES = ", ".join(f"'{status}'" for status in ("pending", "confirmed", "in_progress", "completed"))
+
+OVERLAPPING_VISITS = f"""
+SELECT booked.visit_id, other.visit_id
+FROM visit AS booked
+JOIN visit AS other ON other.vendor_id = booked.vendor_id AND other.visit_id > booked.visit_id
+WHERE booked.status IN ({BOOKED_VISIT_STATUSES}) AND other.status IN ({BOOKED_VISIT_STATUSES})
+    AND tsrange(booked.start_timestamp, booked.end_timestamp) && tsrange(other.start_timestamp, other.end_timestamp)
+LIMIT 20
+"""
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        return
+    # GiST has no uuid equality operator of its own, btree_gist provides it for the exclusion constraint
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    if not context.is_offline_mode():
+        overlapping = op.get_bind().execute(text(OVERLAPPING_VISITS)).all()
+        if overlapping:
+            pairs = ", ".join(f"{first} and {second}" for first, second in overlapping)
+            raise RuntimeError(f"Cancel one visit of each overlapping booking before migrating: {pairs}")
+    op.execute(
+        f"""
+        DO $$ BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'ex_visit_vendor_id_booked_time') THEN
+                ALTER TABLE visit ADD CONSTRAINT ex_visit_vendor_id_booked_time EXCLUDE USING gist
+                    (vendor_id WITH =, tsrange(start_timestamp, end_timestamp) WITH &&)
+                    WHERE (status IN ({BOOKED_VISIT_STATUSES}));
+            END IF;
+        END $$
+        """
+    )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != "postgresql":
+        return
+    # btree_gist is left installed, other objects may use it
+    op.execute("ALTER TABLE visit DROP CONSTRAINT IF EXISTS ex_visit_vendor_id_booked_time")
@@ -0,0 +1,30 @@
+"""
+Claims of the outbox events being published, so a relay does not hold their rows locked while waiting for the
+broker (see kafka_utils.outbox).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-06-05 00:00:00
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+from visit_manager.postgres_utils.migrations.operations import add_column_if_not_exists
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: str | Sequence[str] | None = "0004"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # nullable without a default, adding it does not rewrite the table
+    add_column_if_not_exists("outbox_event", sa.Column("claimed_until", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("outbox_event", "claimed_until")
@@ -0,0 +1,30 @@
+"""
+Creation time of the Stripe event that set a payment's status, so an older event delivered in a later batch does
+not overwrite it (see transaction.apply_payment_events).
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-06-06 00:00:00
+"""
+
+from typing import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+from visit_manager.postgres_utils.migrations.operations import add_column_if_not_exists
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: str | Sequence[str] | None = "0005"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # nullable without a default, adding it does not rewrite the table
+    add_column_if_not_exists("payment", sa.Column("status_event_created", sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("payment", "status_event_created")
@@ -1,4 +1,4 @@
 # workaround for Base empty metadata
 
 from .common import Base  # noqa: F401
-from .users import User  # noqa: F401
+from .models import User  # noqa: F401
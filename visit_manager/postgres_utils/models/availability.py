@@ -0,0 +1,124 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from visit_manager.app.models.user_models import TimeSlot, VendorAvailability
+from visit_manager.package_utils.cache import TTLCache
+from visit_manager.package_utils.settings import VisitManagerSettings
+from visit_manager.postgres_utils.models.calendar import get_calendar_version
+from visit_manager.postgres_utils.models.misc import BOOKED_VISIT_STATUSES
+from visit_manager.postgres_utils.models.models import Vendor, Visit
+from visit_manager.postgres_utils.models.visits import time_overlaps
+from visit_manager.postgres_utils.timestamps import make_naive
+
+Interval = tuple[datetime, datetime]
+
+_settings = VisitManagerSettings()
+# merged busy intervals per (vendor, calendar version, window), a new calendar version invalidates all windows at once
+_busy_cache: TTLCache[tuple[uuid.UUID, int, datetime, datetime], list[Interval]] = TTLCache(
+    maxsize=_settings.AVAILABILITY_CACHE_SIZE, ttl=_settings.AVAILABILITY_CACHE_TTL_S
+)
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    """Sorted, non-overlapping union of `intervals`; touching intervals are merged too."""
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_slots(
+    busy: list[Interval], window_start: datetime, window_end: datetime, duration: timedelta, max_slots: int
+) -> list[Interval]:
+    """
+    Consecutive slots of `duration` within the window that do not overlap any of the merged `busy` intervals,
+    each gap is filled from its start.
+    """
+    slots: list[Interval] = []
+    cursor = window_start
+    for busy_start, busy_end in [*busy, (window_end, window_end)]:
+        gap_end = min(busy_start, window_end)
+        while cursor + duration <= gap_end:
+            if len(slots) == max_slots:
+                return slots
+            slots.append((cursor, cursor + duration))
+            cursor += duration
+        cursor = max(cursor, busy_end)
+    return slots
+
+
+async def _get_busy_intervals(
+    session: AsyncSession, vendor_ids: list[uuid.UUID], window_start: datetime, window_end: datetime
+) -> dict[uuid.UUID, list[Interval]]:
+    """
+    Merged busy intervals of the active vendors among `vendor_ids`; the ones not cached are fetched
+    with one range query. Unknown and inactive vendors are left out.
+    """
+    busy: dict[uuid.UUID, list[Interval]] = {}
+    versions: dict[uuid.UUID, int] = {}
+    for vendor_id in vendor_ids:
+        versions[vendor_id] = get_calendar_version(vendor_id)
+        cached = _busy_cache.get((vendor_id, versions[vendor_id], window_start, window_end))
+        if cached is not None:
+            busy[vendor_id] = cached
+    missing = [vendor_id for vendor_id in vendor_ids if vendor_id not in busy]
+    if not missing:
+        return busy
+
+    result = await session.execute(
+        select(Vendor.vendor_id, Visit.start_timestamp, Visit.end_timestamp)
+        .outerjoin(
+            Visit,
+            and_(
+                Visit.vendor_id == Vendor.vendor_id,
+                Visit.status.in_(BOOKED_VISIT_STATUSES),
+                time_overlaps(Visit.start_timestamp, Visit.end_timestamp, window_start, window_end),
+            ),
+        )
+        .where(Vendor.vendor_id.in_(missing), Vendor.is_active)
+        .order_by(Vendor.vendor_id, Visit.start_timestamp)
+    )
+    visits: dict[uuid.UUID, list[Interval]] = {}
+    for vendor_id, start, end in result:
+        intervals = visits.setdefault(vendor_id, [])
+        if start is not None:
+            intervals.append((start, end))
+
+    for vendor_id, intervals in visits.items():
+        busy[vendor_id] = merge_intervals(intervals)
+        # cached under the version read before the query, a booking committed meanwhile makes it unreachable
+        _busy_cache.set((vendor_id, versions[vendor_id], window_start, window_end), busy[vendor_id])
+    return busy
+
+
+async def get_vendors_availability(
+    session: AsyncSession,
+    vendor_ids: list[uuid.UUID],
+    window_start: datetime,
+    window_end: datetime,
+    duration: timedelta,
+    max_slots: int,
+) -> list[VendorAvailability]:
+    """Up to `max_slots` free slots of `duration` for every active vendor, in the order of `vendor_ids`."""
+    window_start, window_end = make_naive(window_start), make_naive(window_end)
+    unique_vendor_ids = list(dict.fromkeys(vendor_ids))
+    busy = await _get_busy_intervals(session, unique_vendor_ids, window_start, window_end)
+    return [
+        VendorAvailability(
+            vendor_id=vendor_id,
+            slots=[
+                TimeSlot(start_time=start, end_time=end)
+                for start, end in free_slots(busy[vendor_id], window_start, window_end, duration, max_slots)
+            ],
+        )
+        for vendor_id in unique_vendor_ids
+        if vendor_id in busy
+    ]
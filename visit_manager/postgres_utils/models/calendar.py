@@ -0,0 +1,26 @@
+import uuid
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from visit_manager.postgres_utils.session_hooks import call_after_commit
+
+# bumped whenever visits of a vendor change, caches derived from the vendor's visits key their entries with it
+_calendar_versions: defaultdict[uuid.UUID, int] = defaultdict(int)
+
+
+def get_calendar_version(vendor_id: uuid.UUID) -> int:
+    # not the defaultdict's [], reading the version of every vendor ever queried would keep an entry for each
+    return _calendar_versions.get(vendor_id, 0)
+
+
+def invalidate_vendor_calendars(session: AsyncSession, vendor_ids: Iterable[uuid.UUID]) -> None:
+    """Bump the calendar versions of `vendor_ids` once the transaction changing their visits commits."""
+    vendor_ids = set(vendor_ids)
+
+    def bump_versions() -> None:
+        for vendor_id in vendor_ids:
+            _calendar_versions[vendor_id] += 1
+
+    call_after_commit(session, bump_versions)
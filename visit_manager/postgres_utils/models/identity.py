@@ -0,0 +1,64 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from visit_manager.app.models.user_models import UserIdentity
+from visit_manager.package_utils.cache import TTLCache
+from visit_manager.package_utils.settings import VisitManagerSettings
+from visit_manager.postgres_utils.models.models import Admin, Client, User, Vendor
+from visit_manager.postgres_utils.session_hooks import call_after_commit
+
+_settings = VisitManagerSettings()
+_identity_cache: TTLCache[str, UserIdentity] = TTLCache(
+    maxsize=_settings.IDENTITY_CACHE_SIZE, ttl=_settings.IDENTITY_CACHE_TTL_S
+)
+
+
+async def get_user_identity(session: AsyncSession, email: str) -> UserIdentity | None:
+    """
+    Id, name and roles of the user with `email`, served from the identity cache when possible.
+    Unknown users are not cached, so a user is found as soon as they log in.
+    """
+    key = email.lower()
+    identity = _identity_cache.get(key)
+    if identity is not None:
+        return identity
+
+    result = await session.execute(
+        select(
+            User.user_id,
+            User.email,
+            User.first_name,
+            User.last_name,
+            Admin.admin_id,
+            Vendor.vendor_id,
+            Client.client_id,
+        )
+        .outerjoin(Admin, Admin.admin_id == User.user_id)
+        .outerjoin(Vendor, Vendor.vendor_id == User.user_id)
+        .outerjoin(Client, Client.client_id == User.user_id)
+        .where(User.email == email)
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+    identity = UserIdentity(
+        user_id=row.user_id,
+        email=row.email,
+        first_name=row.first_name,
+        last_name=row.last_name,
+        is_admin=row.admin_id is not None,
+        vendor_id=row.vendor_id,
+        client_id=row.client_id,
+    )
+    _identity_cache.set(key, identity)
+    return identity
+
+
+def invalidate_user_identity(session: AsyncSession, email: str) -> None:
+    """
+    Forget the cached identity of `email`, now and again when the session commits,
+    so a request racing with the registration cannot cache the identity from before it.
+    """
+    key = email.lower()
+    _identity_cache.pop(key)
+    call_after_commit(session, lambda: _identity_cache.pop(key))
@@ -22,6 +22,10 @@ class VisitStatus(str, enum.Enum):
     cancelled = "cancelled"
 
 
+# visits in these statuses occupy the vendor's time, no two of them may overlap
+BOOKED_VISIT_STATUSES = (VisitStatus.pending, VisitStatus.confirmed, VisitStatus.in_progress, VisitStatus.completed)
+
+
 class PaymentStatus(str, enum.Enum):
     __tablename__ = "payment_status"
     pending = "pending"
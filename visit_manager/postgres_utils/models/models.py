@@ -2,13 +2,14 @@ import uuid
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import CheckConstraint, Enum, ForeignKey, UniqueConstraint
+from sqlalchemy import DDL, BigInteger, CheckConstraint, Enum, ForeignKey, Index, Text, UniqueConstraint, event
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import column, func, text
 from sqlalchemy_utils import EmailType, PhoneNumber, PhoneNumberType
 
 from visit_manager.postgres_utils.models.common import Base
-from visit_manager.postgres_utils.models.misc import PaymentStatus, VisitStatus
+from visit_manager.postgres_utils.models.misc import BOOKED_VISIT_STATUSES, PaymentStatus, VisitStatus
 
 
 class User(Base):
@@ -95,30 +96,13 @@ class Vendor(Base):
     )
     visits: Mapped[List["Visit"]] = relationship(back_populates="vendor")
 
-    def to_dict(self) -> dict:
-        """Convert vendor instance to a dictionary including relationships."""
-        result = super().to_dict()
-        # Add user info
-        if self.user:
-            result["user"] = {
-                "email": self.user.email,
-                "first_name": self.user.first_name,
-                "last_name": self.user.last_name,
-            }
-        # Add address info
-        if self.address:
-            result["address"] = self.address.to_dict()
-        # Add service types
-        result["service_types"] = [
-            {"name": st.name, "description": st.description} for st in self.offered_service_types
-        ]
-        # Remove sensitive or unnecessary fields
-        result.pop("registration_fee_payment_id", None)
-        return result
-
 
 class Address(Base):
     __tablename__ = "address"
+    __table_args__ = (
+        # bounding box prefilter of the distance search, see vendors.search_vendors_nearby
+        Index("ix_address_latitude_longitude", "latitude", "longitude"),
+    )
     address_id: Mapped[uuid.UUID] = mapped_column(primary_key=True, server_default=func.gen_random_uuid())
     latitude: Mapped[float] = mapped_column(nullable=False)
     longitude: Mapped[float] = mapped_column(nullable=False)
@@ -128,22 +112,23 @@ class Address(Base):
     country: Mapped[str] = mapped_column(nullable=False)
     zip_code: Mapped[str] = mapped_column(nullable=False)
 
-    def to_dict(self) -> dict:
-        """Convert address instance to a dictionary."""
-        result = super().to_dict()
-        # Remove unnecessary fields
-        result.pop("address_id", None)
-        return result
-
 
 class Payment(Base):
     __tablename__ = "payment"
+    __table_args__ = (
+        # keyset pagination of the charge listing, newest first, see transaction.list_payments
+        Index("ix_payment_transaction_timestamp", "transaction_timestamp", "payment_id"),
+        # listing filtered by status and the latest succeeded payment, see transaction.get_latest_succeeded_payment
+        Index("ix_payment_status_transaction_timestamp", "status", "transaction_timestamp", "payment_id"),
+    )
     payment_id: Mapped[uuid.UUID] = mapped_column(primary_key=True, server_default=func.gen_random_uuid())
     stripe_charge_id: Mapped[str] = mapped_column(unique=True, index=True)
     amount: Mapped[int] = mapped_column(CheckConstraint("amount > 0"), nullable=False)
     currency: Mapped[str] = mapped_column(nullable=False, default="pln")
     transaction_timestamp: Mapped[datetime] = mapped_column(nullable=False, server_default=func.now())
     status: Mapped[PaymentStatus] = mapped_column(Enum(PaymentStatus, name="payment_status"), nullable=False)
+    # Stripe `created` (unix time) of the webhook event that set `status`, older events delivered late are ignored
+    status_event_created: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
 
 
 class ChatSession(Base):
@@ -177,6 +162,20 @@ class VendorOfferedServiceTypes(Base):
 
 class Visit(Base):
     __tablename__ = "visit"
+    __table_args__ = (
+        # keyset pagination of visit listings, see users._get_visits_page
+        Index("ix_visit_vendor_id_start_timestamp", "vendor_id", "start_timestamp", "visit_id"),
+        Index("ix_visit_client_id_start_timestamp", "client_id", "start_timestamp", "visit_id"),
+        # no double booking: booked visits of a vendor must not overlap, enforced by Postgres even under
+        # concurrent bookings; violations raise sqlstate 23P01 (see postgres_utils.errors)
+        ExcludeConstraint(
+            ("vendor_id", "="),
+            (func.tsrange(column("start_timestamp"), column("end_timestamp")), "&&"),
+            name="ex_visit_vendor_id_booked_time",
+            using="gist",
+            where=text("status IN ({})".format(", ".join(f"'{status.value}'" for status in BOOKED_VISIT_STATUSES))),
+        ).ddl_if(dialect="postgresql"),
+    )
     visit_id: Mapped[uuid.UUID] = mapped_column(primary_key=True, server_default=func.gen_random_uuid())
     client_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("client.client_id"), nullable=False, index=True)
     client: Mapped["Client"] = relationship(back_populates="visits", single_parent=True)
@@ -211,6 +210,32 @@ class Visit(Base):
     chat_session: Mapped[Optional["ChatSession"]] = relationship(
         back_populates="visit", uselist=False, single_parent=True
     )
+    # set by the visit scheduler, makes redelivered visit-create events no-ops
+    idempotency_key: Mapped[Optional[str]] = mapped_column(unique=True, nullable=True)
+
+
+class VendorRating(Base):
+    """
+    Running totals of a vendor's review scores, updated in the same transaction as every review,
+    so the average is read without scanning the vendor's visits.
+    """
+
+    __tablename__ = "vendor_rating"
+    vendor_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("vendor.vendor_id"), primary_key=True)
+    ratings_count: Mapped[int] = mapped_column(nullable=False, server_default="0")
+    ratings_sum: Mapped[int] = mapped_column(nullable=False, server_default="0")
+    # histogram of the scores
+    score_1_count: Mapped[int] = mapped_column(nullable=False, server_default="0")
+    score_2_count: Mapped[int] = mapped_column(nullable=False, server_default="0")
+    score_3_count: Mapped[int] = mapped_column(nullable=False, server_default="0")
+    score_4_count: Mapped[int] = mapped_column(nullable=False, server_default="0")
+    score_5_count: Mapped[int] = mapped_column(nullable=False, server_default="0")
+
+
+# GiST has no uuid equality operator of its own, btree_gist provides it for the exclusion constraint
+event.listen(
+    Visit.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS btree_gist").execute_if(dialect="postgresql")
+)
 
 
 class Attachment(Base):
@@ -235,3 +260,33 @@ class VisitReviewAttachment(Base):
     __table_args__ = (UniqueConstraint("visit_id", "attachment_id"),)
     visit_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("visit.visit_id"), primary_key=True)
     attachment_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("attachment.attachment_id"), primary_key=True)
+
+
+class OutboxEvent(Base):
+    """
+    Kafka message written in the same transaction as the change it announces,
+    published and deleted afterwards by the outbox relay (kafka_utils.outbox).
+    """
+
+    __tablename__ = "outbox_event"
+    outbox_event_id: Mapped[uuid.UUID] = mapped_column(primary_key=True, server_default=func.gen_random_uuid())
+    topic: Mapped[str] = mapped_column(nullable=False)
+    key: Mapped[Optional[str]] = mapped_column(nullable=True)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    # W3C trace context headers of the transaction that wrote the event, as JSON, so the trace continues in Kafka
+    trace_context: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(nullable=False, server_default=func.now(), index=True)
+    # a relay publishing the event, others leave it until then; a relay that crashed lets it go this way
+    claimed_until: Mapped[Optional[datetime]] = mapped_column(nullable=True)
+
+
+class StripeEvent(Base):
+    """
+    Id of a Stripe webhook event already applied, Stripe delivers events at least once.
+    Inserted in the same transaction as the payment changes of the event, see transaction.apply_payment_events.
+    """
+
+    __tablename__ = "stripe_event"
+    event_id: Mapped[str] = mapped_column(primary_key=True)
+    event_type: Mapped[str] = mapped_column(nullable=False)
+    received_at: Mapped[datetime] = mapped_column(nullable=False, server_default=func.now())
@@ -0,0 +1,27 @@
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from visit_manager.kafka_utils.common import KafkaTopics
+from visit_manager.package_utils.tracing import inject_trace_context
+from visit_manager.postgres_utils.models.models import OutboxEvent
+
+
+def add_outbox_event(
+    session: AsyncSession, topic: KafkaTopics, payload: str | bytes, key: str | None = None
+) -> OutboxEvent:
+    """
+    Schedule a Kafka message as part of the session's current transaction.
+    The message is published by the outbox relay only once the transaction commits, in the current trace.
+    `payload` is JSON, as text or as the UTF-8 bytes produced by orjson.
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    trace_context = inject_trace_context()
+    event = OutboxEvent(
+        topic=topic.topic_name,
+        key=key,
+        payload=payload,
+        trace_context=orjson.dumps(trace_context).decode("utf-8") if trace_context else None,
+    )
+    session.add(event)
+    return event
@@ -0,0 +1,115 @@
+import uuid
+from datetime import datetime, timezone
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from visit_manager.app.models.user_models import OpinionCreate, UserSessionData, VendorRatingData
+from visit_manager.kafka_utils.common import KafkaTopics
+from visit_manager.postgres_utils.models.identity import get_user_identity
+from visit_manager.postgres_utils.models.models import VendorRating, Visit, VisitStatus
+from visit_manager.postgres_utils.models.outbox import add_outbox_event
+from visit_manager.postgres_utils.timestamps import make_naive
+
+SCORES = range(1, 6)
+
+# a visit can be reviewed once it ended, unless it never took place
+_REVIEWABLE_STATUSES = (VisitStatus.confirmed, VisitStatus.in_progress, VisitStatus.completed)
+
+
+def _to_rating_data(vendor_id: uuid.UUID, rating: VendorRating | None) -> VendorRatingData:
+    if rating is None or rating.ratings_count == 0:
+        return VendorRatingData(
+            vendor_id=vendor_id, ratings_count=0, average_rating=None, histogram={score: 0 for score in SCORES}
+        )
+    return VendorRatingData(
+        vendor_id=vendor_id,
+        ratings_count=rating.ratings_count,
+        average_rating=rating.ratings_sum / rating.ratings_count,
+        histogram={score: getattr(rating, f"score_{score}_count") for score in SCORES},
+    )
+
+
+async def _review_visit(session: AsyncSession, client_id: uuid.UUID, opinion: OpinionCreate) -> uuid.UUID:
+    """Store the review on the visit and mark it completed, return the reviewed vendor."""
+    result = await session.execute(
+        update(Visit)
+        .where(
+            Visit.visit_id == opinion.visit_id,
+            Visit.client_id == client_id,
+            Visit.review_opinion_score.is_(None),
+            Visit.status.in_(_REVIEWABLE_STATUSES),
+            Visit.end_timestamp <= make_naive(datetime.now(timezone.utc)),
+        )
+        .values(review_opinion_score=opinion.score, review_comment=opinion.comment, status=VisitStatus.completed)
+        .returning(Visit.vendor_id)
+    )
+    vendor_id = result.scalar_one_or_none()
+    if vendor_id is not None:
+        return vendor_id
+
+    # explain why the conditional update matched nothing
+    visit = await session.get(Visit, opinion.visit_id)
+    if visit is None or visit.client_id != client_id:
+        raise HTTPException(status_code=404, detail="Visit not found")
+    if visit.review_opinion_score is not None:
+        raise HTTPException(status_code=409, detail="Visit already reviewed")
+    if visit.status not in _REVIEWABLE_STATUSES:
+        raise HTTPException(status_code=400, detail="Visit cannot be reviewed in its current status")
+    raise HTTPException(status_code=400, detail="Visit has not ended yet")
+
+
+async def add_opinion_in_db(
+    session: AsyncSession, user_session_data: UserSessionData, opinion: OpinionCreate
+) -> VendorRatingData:
+    """
+    Review a visit and fold the score into the vendor's rating with a single upsert,
+    then announce the new average on KafkaTopics.RATINGS once the transaction commits.
+    """
+    user = await get_user_identity(session, user_session_data.user_email)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if user.client_id is None:
+        raise HTTPException(status_code=400, detail="User is not a client")
+
+    vendor_id = await _review_visit(session, user.client_id, opinion)
+
+    score_column = f"score_{opinion.score}_count"
+    result = await session.execute(
+        insert(VendorRating)
+        .values(vendor_id=vendor_id, ratings_count=1, ratings_sum=opinion.score, **{score_column: 1})
+        .on_conflict_do_update(
+            index_elements=[VendorRating.vendor_id],
+            set_={
+                VendorRating.ratings_count: VendorRating.ratings_count + 1,
+                VendorRating.ratings_sum: VendorRating.ratings_sum + opinion.score,
+                getattr(VendorRating, score_column): getattr(VendorRating, score_column) + 1,
+            },
+        )
+        .returning(VendorRating)
+        .execution_options(populate_existing=True)
+    )
+    rating = _to_rating_data(vendor_id, result.scalar_one())
+
+    add_outbox_event(
+        session,
+        KafkaTopics.RATINGS,
+        orjson.dumps(
+            {
+                "event_type": "vendor_rating_updated",
+                "vendor_id": str(vendor_id),
+                "average_rating": rating.average_rating,
+                "ratings_count": rating.ratings_count,
+            }
+        ),
+        key=str(vendor_id),
+    )
+    return rating
+
+
+async def get_vendor_rating(session: AsyncSession, vendor_id: uuid.UUID) -> VendorRatingData:
+    rating = await session.get(VendorRating, vendor_id)
+    return _to_rating_data(vendor_id, rating)
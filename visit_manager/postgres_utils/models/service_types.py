@@ -0,0 +1,112 @@
+import time
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from visit_manager.app.models.user_models import ServiceTypeEnum
+from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.settings import VisitManagerSettings
+from visit_manager.postgres_utils.models.models import ServiceType
+from visit_manager.postgres_utils.utils import get_session_factory
+
+
+@dataclass(frozen=True, slots=True)
+class ServiceTypeRow:
+    service_type_id: uuid.UUID
+    name: ServiceTypeEnum
+    description: str
+
+
+class ServiceTypeCache:
+    """
+    Every row of the service_type table, loaded with one query and kept for `ttl` seconds or until invalidated.
+    The table is reference data of a few rows, so lookups by name or id are answered from memory.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._by_name: dict[ServiceTypeEnum, ServiceTypeRow] = {}
+        self._by_id: dict[uuid.UUID, ServiceTypeRow] = {}
+        self._expires_at = 0.0
+
+    @property
+    def is_stale(self) -> bool:
+        return self._expires_at <= time.monotonic()
+
+    async def load(self, session: AsyncSession) -> None:
+        result = await session.execute(select(ServiceType.service_type_id, ServiceType.name, ServiceType.description))
+        rows = []
+        for service_type_id, name, description in result:
+            try:
+                rows.append(ServiceTypeRow(service_type_id, ServiceTypeEnum(name), description))
+            except ValueError:
+                logger.warning(f"Ignoring service type {name!r} unknown to this version")
+        # swapped at once, a lookup never sees a half loaded cache
+        self._by_name = {row.name: row for row in rows}
+        self._by_id = {row.service_type_id: row for row in rows}
+        self._expires_at = time.monotonic() + self.ttl
+
+    def invalidate(self) -> None:
+        """Reload the rows on the next lookup, the current ones are served until then."""
+        self._expires_at = 0.0
+
+    def clear(self) -> None:
+        self._by_name, self._by_id = {}, {}
+        self.invalidate()
+
+    def by_name(self, name: ServiceTypeEnum) -> ServiceTypeRow | None:
+        return self._by_name.get(name)
+
+    def by_id(self, service_type_id: uuid.UUID) -> ServiceTypeRow | None:
+        return self._by_id.get(service_type_id)
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+
+_settings = VisitManagerSettings()
+_service_type_cache = ServiceTypeCache(ttl=_settings.SERVICE_TYPE_CACHE_TTL_S)
+
+
+async def get_service_types(session: AsyncSession) -> ServiceTypeCache:
+    """The service type cache, reloaded with `session` first if its ttl passed or it was invalidated."""
+    if _service_type_cache.is_stale:
+        await _service_type_cache.load(session)
+    return _service_type_cache
+
+
+async def preload_service_types() -> None:
+    """
+    Load the service types with a session of its own, at startup and when they change.
+    A failure is only logged, the first lookup then loads them.
+    """
+    try:
+        async with get_session_factory()() as session:
+            await _service_type_cache.load(session)
+    except (SQLAlchemyError, OSError) as e:
+        logger.warning(f"Preloading service types failed, they are loaded on first use: {e}")
+        return
+    logger.info(f"Preloaded {len(_service_type_cache)} service types")
+
+
+def invalidate_service_types() -> None:
+    _service_type_cache.invalidate()
+
+
+async def attach_service_types(session: AsyncSession, rows: list[ServiceTypeRow]) -> list[ServiceType]:
+    """
+    ServiceType instances of `rows` in `session`, e.g. to set a relationship, without loading them:
+    they are built from the cached values and merged as if they had been loaded.
+    """
+    service_types = []
+    for row in rows:
+        service_type = ServiceType(
+            service_type_id=row.service_type_id, name=row.name.value, description=row.description
+        )
+        make_transient_to_detached(service_type)
+        service_types.append(await session.merge(service_type, load=False))
+    return service_types
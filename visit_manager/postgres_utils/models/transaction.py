@@ -1,40 +1,161 @@
-from typing import Optional, Sequence
-
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from visit_manager.postgres_utils.models.models import Payment, PaymentStatus
-
-
-async def add_payment(session: AsyncSession, payment: Payment) -> Payment:
-    async with session.begin():
-        session.add(payment)
-    await session.refresh(payment)
-    return payment
-
-
-async def read_all_payments(session: AsyncSession) -> Sequence[Payment]:
-    async with session.begin():
-        result = await session.execute(select(Payment))
-        payments = result.scalars().all()
-        return payments
-
-
-async def update_payment_status(
-    session: AsyncSession,
-    stripe_charge_id: str,
-    status: PaymentStatus,
-) -> Optional[Payment]:
-    async with session.begin():
-        result = await session.execute(select(Payment).where(Payment.stripe_charge_id == stripe_charge_id))
-        payment = result.scalars().first()
-        if not payment:
-            return None
-        payment.status = status
-        return payment
-
-
-async def get_payment_by_stripe_charge_id(session: AsyncSession, stripe_charge_id: str) -> Optional[Payment]:
-    async with session.begin():
-        result = await session.execute(select(Payment).where(Payment.stripe_charge_id == stripe_charge_id))
-        return result.scalars().first()
+from typing import Any, Optional
+
+from sqlalchemy import BigInteger, String, Values, bindparam, column, literal, or_, select, tuple_, update, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+
+from visit_manager.app.models.payment_models import ChargePage, ChargeResponse, PaymentFilters, PaymentStatusEvent
+from visit_manager.postgres_utils.models.models import Payment, PaymentStatus, StripeEvent
+from visit_manager.postgres_utils.pagination import decode_cursor, encode_cursor
+from visit_manager.postgres_utils.timestamps import make_naive
+
+
+async def add_payment(session: AsyncSession, payment: Payment) -> Payment:
+    async with session.begin():
+        session.add(payment)
+    await session.refresh(payment)
+    return payment
+
+
+async def list_payments(session: AsyncSession, filters: PaymentFilters) -> ChargePage:
+    """
+    Return one page of payments, newest first, ordered by (transaction_timestamp, payment_id) descending.
+    Pages are addressed with a keyset cursor and read backwards from the (transaction_timestamp, payment_id)
+    index, or the (status, transaction_timestamp, payment_id) one when filtering by status, so a page costs
+    the same however long the payment history is.
+    """
+    query = select(Payment)
+    if filters.status is not None:
+        query = query.where(Payment.status == filters.status)
+    if filters.currency is not None:
+        query = query.where(Payment.currency == filters.currency.lower())
+    if filters.from_time is not None:
+        query = query.where(Payment.transaction_timestamp >= make_naive(filters.from_time))
+    if filters.to_time is not None:
+        query = query.where(Payment.transaction_timestamp < make_naive(filters.to_time))
+    if filters.cursor is not None:
+        before_timestamp, before_payment_id = decode_cursor(filters.cursor)
+        query = query.where(
+            tuple_(Payment.transaction_timestamp, Payment.payment_id)
+            < tuple_(literal(before_timestamp), literal(before_payment_id))
+        )
+    # fetch one extra row to know whether there is a next page
+    query = query.order_by(Payment.transaction_timestamp.desc(), Payment.payment_id.desc()).limit(filters.limit + 1)
+
+    async with session.begin():
+        payments = list((await session.execute(query)).scalars())
+    next_cursor = None
+    if len(payments) > filters.limit:
+        payments = payments[: filters.limit]
+        next_cursor = encode_cursor(payments[-1].transaction_timestamp, payments[-1].payment_id)
+
+    items = [
+        ChargeResponse(
+            charge_id=payment.stripe_charge_id,
+            status=payment.status,
+            amount=payment.amount,
+            currency=payment.currency,
+            transaction_timestamp=payment.transaction_timestamp,
+        )
+        for payment in payments
+    ]
+    return ChargePage(items=items, next_cursor=next_cursor)
+
+
+async def get_latest_succeeded_payment(session: AsyncSession) -> Optional[Payment]:
+    """The most recent succeeded payment, a single entry read from the (status, transaction_timestamp) index."""
+    async with session.begin():
+        result = await session.execute(
+            select(Payment)
+            .where(Payment.status == PaymentStatus.succeeded)
+            .order_by(Payment.transaction_timestamp.desc(), Payment.payment_id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+
+async def update_payment_status(
+    session: AsyncSession,
+    stripe_charge_id: str,
+    status: PaymentStatus,
+) -> Optional[Payment]:
+    async with session.begin():
+        result = await session.execute(
+            update(Payment)
+            .where(Payment.stripe_charge_id == stripe_charge_id)
+            .values(status=status)
+            .returning(Payment)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one_or_none()
+
+
+async def get_payment_by_stripe_charge_id(session: AsyncSession, stripe_charge_id: str) -> Optional[Payment]:
+    async with session.begin():
+        result = await session.execute(select(Payment).where(Payment.stripe_charge_id == stripe_charge_id))
+        return result.scalars().first()
+
+
+@compiles(Values, "sqlite")
+def _values_sqlite(element: Values, compiler: SQLCompiler, **kw: Any) -> str:
+    """SQLite (the tests' database) takes no column list on a VALUES alias, select the rows instead."""
+    rows = [
+        "SELECT "
+        + ", ".join(
+            f"{compiler.process(bindparam(None, value, type_=col.type), **kw)} AS {col.name}"
+            for col, value in zip(element.columns, row)
+        )
+        for data in element._data
+        for row in data
+    ]
+    return f"({' UNION ALL '.join(rows)}) AS {element.name}"
+
+
+async def apply_payment_events(session: AsyncSession, events: list[PaymentStatusEvent]) -> int:
+    """
+    Apply a batch of Stripe webhook events with two statements, in the caller's transaction.
+
+    Event ids are recorded with `INSERT ... ON CONFLICT DO NOTHING RETURNING`, so events already applied,
+    by this batch or an earlier one, are skipped. Of the remaining events, the most recent one of every charge
+    sets its status with a single `UPDATE payment ... FROM (VALUES ...)` keyed on stripe_charge_id, unless a more
+    recent event of an earlier batch set it already (payment.status_event_created);
+    a refunded payment is never moved back to another status by a late event.
+    Returns the number of payments the events were applied to.
+    """
+    unique_events = {event.event_id: event for event in events}
+    if not unique_events:
+        return 0
+    result = await session.execute(
+        insert(StripeEvent)
+        .values([{"event_id": e.event_id, "event_type": e.event_type} for e in unique_events.values()])
+        .on_conflict_do_nothing(index_elements=[StripeEvent.event_id])
+        .returning(StripeEvent.event_id)
+    )
+    new_event_ids = set(result.scalars())
+
+    latest: dict[str, PaymentStatusEvent] = {}
+    for event in sorted(unique_events.values(), key=lambda e: e.created):
+        if event.event_id in new_event_ids and event.charge_id is not None and event.status is not None:
+            latest[event.charge_id] = event
+    if not latest:
+        return 0
+
+    changes = values(
+        column("stripe_charge_id", String),
+        column("status", Payment.__table__.c.status.type),
+        column("created", BigInteger),
+        name="changes",
+    ).data([(charge_id, event.status, event.created) for charge_id, event in latest.items()])
+    result = await session.execute(
+        update(Payment)
+        .where(
+            Payment.stripe_charge_id == changes.c.stripe_charge_id,
+            or_(Payment.status_event_created.is_(None), Payment.status_event_created < changes.c.created),
+            Payment.status != PaymentStatus.refunded,
+        )
+        .values(status=changes.c.status, status_event_created=changes.c.created)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount  # type: ignore[attr-defined, no-any-return]
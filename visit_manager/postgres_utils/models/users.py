@@ -1,23 +1,38 @@
-import json
 from typing import Sequence
 
+import orjson
 from fastapi import HTTPException
-from sqlalchemy import select
-from sqlalchemy.exc import StatementError
+from sqlalchemy import ColumnElement, Select, literal, select, tuple_
+from sqlalchemy.exc import IntegrityError, StatementError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from visit_manager.app.models.user_models import ServiceTypeEnum, UserCreate, UserInfoModel, UserSessionData, VendorCreate, VisitCreate, ClientCreate, VisitData
+from visit_manager.app.models.user_models import (
+    BookedVisit,
+    ClientCreate,
+    ClientProfile,
+    ServiceTypeEnum,
+    UserCreate,
+    UserInfoModel,
+    UserSessionData,
+    VendorCreate,
+    VendorProfile,
+    VisitCreate,
+    VisitData,
+    VisitFilters,
+    VisitPage,
+)
 from visit_manager.kafka_utils.common import KafkaTopics
-from visit_manager.kafka_utils.producer import send_message
 from visit_manager.package_utils.logger_conf import logger
 from visit_manager.postgres_utils.consts import DEPOSIT_GR
-from visit_manager.postgres_utils.models.models import Address, ServiceType, User, Vendor, Visit, VisitStatus, Client
-
-
-def make_naive(dt):
-    if dt.tzinfo is not None:
-        return dt.replace(tzinfo=None)
-    return dt
+from visit_manager.postgres_utils.errors import EXCLUSION_VIOLATION, get_sqlstate
+from visit_manager.postgres_utils.models.calendar import invalidate_vendor_calendars
+from visit_manager.postgres_utils.models.identity import get_user_identity, invalidate_user_identity
+from visit_manager.postgres_utils.models.models import Address, Client, ServiceType, User, Vendor, Visit, VisitStatus
+from visit_manager.postgres_utils.models.outbox import add_outbox_event
+from visit_manager.postgres_utils.models.service_types import attach_service_types, get_service_types
+from visit_manager.postgres_utils.pagination import decode_cursor, encode_cursor
+from visit_manager.postgres_utils.serializers import CLIENT_SERIALIZER, VENDOR_SERIALIZER, VISIT_SERIALIZER
+from visit_manager.postgres_utils.timestamps import make_naive
 
 
 async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
@@ -50,16 +65,17 @@ async def read_all_users(session: AsyncSession) -> Sequence[User]:
 async def get_service_types_by_name(
     session: AsyncSession, service_type_names: list[ServiceTypeEnum]
 ) -> list[ServiceType]:
-    # Convert enum values to strings
-    service_type_str_names = [st.value for st in service_type_names]
-    result = await session.execute(select(ServiceType).where(ServiceType.name.in_(service_type_str_names)))
-    service_types = result.scalars().all()
-    if len(service_types) != len(service_type_names):
+    """ServiceType instances of `service_type_names` in `session`, from the service type cache."""
+    service_types = await get_service_types(session)
+    rows = [service_types.by_name(name) for name in dict.fromkeys(service_type_names)]
+    if None in rows or len(rows) != len(service_type_names):
         raise HTTPException(status_code=404, detail="Incorrect service types")
-    return service_types
+    return await attach_service_types(session, [row for row in rows if row is not None])
 
 
-async def register_as_vendor(session: AsyncSession, user_session_data: UserSessionData, vendor_data: VendorCreate):
+async def register_as_vendor(
+    session: AsyncSession, user_session_data: UserSessionData, vendor_data: VendorCreate
+) -> VendorProfile:
     user = await get_user_by_email(session, user_session_data.user_email)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
@@ -83,9 +99,12 @@ async def register_as_vendor(session: AsyncSession, user_session_data: UserSessi
 
     vendor = Vendor(
         vendor_id=user.user_id,
+        # set the loaded relationships too, so serializing the vendor needs no lazy loads
+        user=user,
         vendor_name=vendor_data.vendor_name,
         phone_number=vendor_data.phone_number,
         address_id=address.address_id,
+        address=address,
         required_deposit_gr=DEPOSIT_GR,
         offered_service_types=service_types,
     )
@@ -96,12 +115,16 @@ async def register_as_vendor(session: AsyncSession, user_session_data: UserSessi
         logger.error(f"Error creating vendor: {e}")
         raise HTTPException(status_code=400, detail="Incorrect phone number")
 
-    # Send serialized vendor data to Kafka
-    send_message(json.dumps(vendor.to_dict()), KafkaTopics.USERS)
-    return vendor
+    invalidate_user_identity(session, user.email)
+    vendor_dict = VENDOR_SERIALIZER.to_dict(vendor)
+    # Announce the vendor once the registration commits
+    add_outbox_event(session, KafkaTopics.USERS, orjson.dumps(vendor_dict), key=str(vendor.vendor_id))
+    return VendorProfile.model_validate(vendor_dict)
 
 
-async def register_as_client(session: AsyncSession, user_session_data: UserSessionData, client_data: ClientCreate):
+async def register_as_client(
+    session: AsyncSession, user_session_data: UserSessionData, client_data: ClientCreate
+) -> ClientProfile:
     user = await get_user_by_email(session, user_session_data.user_email)
     if user is None:
         create_or_update_user(session, user_session_data)
@@ -125,98 +148,119 @@ async def register_as_client(session: AsyncSession, user_session_data: UserSessi
     )
     session.add(client)
     await session.flush()
-    return client
+    invalidate_user_identity(session, user_session_data.user_email)
+    return ClientProfile.model_validate(CLIENT_SERIALIZER.to_dict(client))
 
 
-async def get_my_visits_from_db_as_vendor(session: AsyncSession, user_session_data: UserSessionData) -> list[VisitData]:
-    user = await get_user_by_email(session, user_session_data.user_email)
+def _select_visit_data() -> Select:
+    """
+    Select everything needed to build VisitData in a single statement, instead of
+    loading the counterparty and the vendor's service types separately for every visit.
+    Service type names are looked up in the service type cache.
+    """
+    return select(
+        Visit.visit_id,
+        Visit.start_timestamp,
+        Visit.end_timestamp,
+        Visit.vendor_id,
+        Visit.client_id,
+        Visit.status,
+        Visit.service_type_id,
+        Vendor.vendor_name,
+    ).join(Vendor, Vendor.vendor_id == Visit.vendor_id)
+
+
+async def _get_visits_page(session: AsyncSession, owner: ColumnElement[bool], filters: VisitFilters) -> VisitPage:
+    """
+    Return one page of visits ordered by (start_timestamp, visit_id).
+    Pages are addressed with a keyset cursor, so the cost of a page does not depend on how deep into
+    the history it is; with the owner column leading the (vendor_id|client_id, start_timestamp) index
+    Postgres reads exactly `limit + 1` index entries.
+    """
+    query = _select_visit_data().where(owner)
+    if filters.from_time is not None:
+        query = query.where(Visit.start_timestamp >= make_naive(filters.from_time))
+    if filters.to_time is not None:
+        query = query.where(Visit.start_timestamp < make_naive(filters.to_time))
+    if filters.status is not None:
+        query = query.where(Visit.status == filters.status)
+    if filters.cursor is not None:
+        after_timestamp, after_visit_id = decode_cursor(filters.cursor)
+        query = query.where(
+            tuple_(Visit.start_timestamp, Visit.visit_id) > tuple_(literal(after_timestamp), literal(after_visit_id))
+        )
+    # fetch one extra row to know whether there is a next page
+    query = query.order_by(Visit.start_timestamp, Visit.visit_id).limit(filters.limit + 1)
+
+    rows = (await session.execute(query)).all()
+    next_cursor = None
+    if len(rows) > filters.limit:
+        rows = rows[: filters.limit]
+        next_cursor = encode_cursor(rows[-1].start_timestamp, rows[-1].visit_id)
+
+    service_types = await get_service_types(session)
+    if any(service_types.by_id(row.service_type_id) is None for row in rows):
+        # a service type added since the cache was loaded
+        service_types.invalidate()
+        service_types = await get_service_types(session)
+    items = [
+        VisitData(
+            visit_id=str(row.visit_id),
+            start_time=row.start_timestamp,
+            end_time=row.end_timestamp,
+            vendor_id=str(row.vendor_id),
+            client_id=str(row.client_id),
+            vendor_name=row.vendor_name,
+            service_type=getattr(service_types.by_id(row.service_type_id), "name", None),
+            status=row.status,
+        )
+        for row in rows
+    ]
+    return VisitPage(items=items, next_cursor=next_cursor)
+
+
+async def get_my_visits_from_db_as_vendor(
+    session: AsyncSession, user_session_data: UserSessionData, filters: VisitFilters = VisitFilters()
+) -> VisitPage:
+    user = await get_user_identity(session, user_session_data.user_email)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    if user.vendor_profile is None:
+    if user.vendor_id is None:
         raise HTTPException(status_code=400, detail="User is not a vendor")
-    
-    # Get all visits for the vendor
-    visits_result = await session.execute(select(Visit).where(Visit.vendor_id == user.user_id))
-    visits = visits_result.scalars().all()
-    
-    # For each visit, get the client info and create VisitData
-    visit_data_list = []
-    for visit in visits:
-        # Get client info for this visit
-        client_result = await session.execute(select(Client).where(Client.client_id == visit.client_id))
-        client = client_result.scalar_one_or_none()
-        if client is None:
-            continue
-            
-        # Load vendor's service types
-        vendor = user.vendor_profile
-        await session.refresh(vendor, ["offered_service_types"])
-        if not vendor.offered_service_types:
-            continue
-            
-        # Create VisitData for this visit
-        visit_data = VisitData(
-            start_time=visit.start_timestamp,
-            end_time=visit.end_timestamp,
-            vendor_id=str(visit.vendor_id),
-            client_id=str(visit.client_id),
-            vendor_name=vendor.vendor_name,
-            service_type=vendor.offered_service_types[0].name
-        )
-        visit_data_list.append(visit_data)
-    
-    return visit_data_list
+    return await _get_visits_page(session, Visit.vendor_id == user.vendor_id, filters)
 
 
-async def get_my_visits_from_db_as_client(session: AsyncSession, user_session_data: UserSessionData) -> list[VisitData]:
-    user = await get_user_by_email(session, user_session_data.user_email)
+async def get_my_visits_from_db_as_client(
+    session: AsyncSession, user_session_data: UserSessionData, filters: VisitFilters = VisitFilters()
+) -> VisitPage:
+    user = await get_user_identity(session, user_session_data.user_email)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    if user.client_profile is None:
+    if user.client_id is None:
         raise HTTPException(status_code=400, detail="User is not a client")
-    
-    # Get all visits for the client
-    visits_result = await session.execute(select(Visit).where(Visit.client_id == user.user_id))
-    visits = visits_result.scalars().all()
-    
-    # For each visit, get the vendor info and create VisitData
-    visit_data_list = []
-    for visit in visits:
-        # Get vendor info for this visit
-        vendor_result = await session.execute(select(Vendor).where(Vendor.vendor_id == visit.vendor_id))
-        vendor = vendor_result.scalar_one_or_none()
-        if vendor is None:
-            continue
-            
-        # Load vendor's service types
-        await session.refresh(vendor, ["offered_service_types"])
-        if not vendor.offered_service_types:
-            continue
-            
-        # Create VisitData for this visit
-        visit_data = VisitData(
-            start_time=visit.start_timestamp,
-            end_time=visit.end_timestamp,
-            vendor_id=str(visit.vendor_id),
-            client_id=str(visit.client_id),
-            vendor_name=vendor.vendor_name,
-            service_type=vendor.offered_service_types[0].name
-        )
-        visit_data_list.append(visit_data)
-    
-    return visit_data_list
+    return await _get_visits_page(session, Visit.client_id == user.client_id, filters)
 
 
-async def get_my_visits_from_db(session: AsyncSession, user_session_data: UserSessionData) -> list[Visit]:
-    user = await get_user_by_email(session, user_session_data.user_email)
+async def get_my_visits_from_db(
+    session: AsyncSession, user_session_data: UserSessionData, filters: VisitFilters = VisitFilters()
+) -> VisitPage:
+    user = await get_user_identity(session, user_session_data.user_email)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    if user.vendor_profile is not None:
-        return await get_my_visits_from_db_as_vendor(session, user_session_data)
-    return await get_my_visits_from_db_as_client(session, user_session_data)
+    if user.vendor_id is not None:
+        return await _get_visits_page(session, Visit.vendor_id == user.vendor_id, filters)
+    if user.client_id is not None:
+        return await _get_visits_page(session, Visit.client_id == user.client_id, filters)
+    raise HTTPException(status_code=400, detail="User is not a client")
 
 
-async def book_visit_in_db(session: AsyncSession, user_session_data: UserSessionData, visit_data: VisitCreate) -> Visit:
+async def book_visit_in_db(
+    session: AsyncSession, user_session_data: UserSessionData, visit_data: VisitCreate
+) -> BookedVisit:
+    # stored as naive wall-clock values, checked as such whatever offsets the request gave
+    start_timestamp, end_timestamp = make_naive(visit_data.start_time), make_naive(visit_data.end_time)
+    if end_timestamp <= start_timestamp:
+        raise HTTPException(status_code=400, detail="Visit must end after it starts")
     client_user = await get_user_by_email(session, user_session_data.user_email)
     vendor_user = await get_user_by_email(session, visit_data.vendor_email)
     if client_user is None or vendor_user is None:
@@ -225,16 +269,16 @@ async def book_visit_in_db(session: AsyncSession, user_session_data: UserSession
         raise HTTPException(status_code=400, detail="User is not a client or vendor")
     client = client_user.client_profile
     vendor = vendor_user.vendor_profile
-    
+
     # Load the vendor's offered service types
     await session.refresh(vendor, ["offered_service_types"])
     if not vendor.offered_service_types:
         raise HTTPException(status_code=400, detail="Vendor has no service types")
-    await session.refresh(client, ["address"]) # random shit making it work, dont delete
-    
+    await session.refresh(client, ["address"])  # random shit making it work, dont delete
+
     visit = Visit(
-        start_timestamp=make_naive(visit_data.start_time),
-        end_timestamp=make_naive(visit_data.end_time),
+        start_timestamp=start_timestamp,
+        end_timestamp=end_timestamp,
         vendor_id=vendor.vendor_id,
         client_id=client.client_id,
         description="Example description",
@@ -245,19 +289,26 @@ async def book_visit_in_db(session: AsyncSession, user_session_data: UserSession
     try:
         session.add(visit)
         await session.flush()
+    except IntegrityError as e:
+        if get_sqlstate(e) == EXCLUSION_VIOLATION:
+            raise HTTPException(status_code=409, detail="Vendor is already booked at that time")
+        logger.error(f"Error creating visit: {e}")
+        raise HTTPException(status_code=400, detail="Incorrect visit data")
     except StatementError as e:
         logger.error(f"Error creating visit: {e}")
         raise HTTPException(status_code=400, detail="Incorrect visit data")
-    return visit
+    invalidate_vendor_calendars(session, [vendor.vendor_id])
+    return BookedVisit.model_validate(VISIT_SERIALIZER.to_dict(visit))
 
 
 async def get_me_from_db(session: AsyncSession, user_session_data: UserSessionData) -> UserInfoModel:
-    user = await get_user_by_email(session, user_session_data.user_email)
+    """Served from the identity cache, the session is only used on a cache miss."""
+    user = await get_user_identity(session, user_session_data.user_email)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return UserInfoModel(
         first_name=user.first_name,
         last_name=user.last_name,
         email=user.email,
-        user_type="vendor" if user.vendor_profile is not None else "client",
-    )
\ No newline at end of file
+        user_type="vendor" if user.vendor_id is not None else "client",
+    )
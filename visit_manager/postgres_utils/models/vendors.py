@@ -0,0 +1,107 @@
+import math
+
+from sqlalchemy import ColumnElement, and_, func, literal, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from visit_manager.app.models.user_models import VendorSearchFilters, VendorSearchPage, VendorSearchResult
+from visit_manager.postgres_utils.models.models import Address, Vendor, VendorOfferedServiceTypes
+from visit_manager.postgres_utils.models.service_types import get_service_types
+from visit_manager.postgres_utils.pagination import decode_distance_cursor, encode_distance_cursor
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+
+def _bounding_box(latitude: float, longitude: float, radius_km: float) -> ColumnElement[bool]:
+    """
+    Latitude/longitude box containing the search circle, answered by the (latitude, longitude) index
+    before any distance is computed. Handles circles crossing the antimeridian or reaching a pole.
+    """
+    delta_latitude = radius_km / KM_PER_DEGREE
+    in_latitude_range = Address.latitude.between(latitude - delta_latitude, latitude + delta_latitude)
+    if abs(latitude) + delta_latitude >= 90:
+        # the circle contains a pole, every longitude is in range
+        return in_latitude_range
+
+    conditions: list[ColumnElement[bool]] = [in_latitude_range]
+
+    # widest at the circle's edge nearest to the pole
+    delta_longitude = delta_latitude / math.cos(math.radians(abs(latitude) + delta_latitude))
+    if delta_longitude < 180:
+        west, east = longitude - delta_longitude, longitude + delta_longitude
+        if west < -180:
+            conditions.append(or_(Address.longitude >= west + 360, Address.longitude <= east))
+        elif east > 180:
+            conditions.append(or_(Address.longitude >= west, Address.longitude <= east - 360))
+        else:
+            conditions.append(Address.longitude.between(west, east))
+    return and_(*conditions)
+
+
+def _distance_km(latitude: float, longitude: float) -> ColumnElement[float]:
+    """Haversine distance between the vendor's address and the given point."""
+    latitude_rad, longitude_rad = math.radians(latitude), math.radians(longitude)
+    address_latitude, address_longitude = func.radians(Address.latitude), func.radians(Address.longitude)
+    half_delta_latitude = func.sin((address_latitude - latitude_rad) / 2)
+    half_delta_longitude = func.sin((address_longitude - longitude_rad) / 2)
+    haversine = (
+        half_delta_latitude * half_delta_latitude
+        + math.cos(latitude_rad) * func.cos(address_latitude) * half_delta_longitude * half_delta_longitude
+    )
+    distance: ColumnElement[float] = 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(haversine))
+    return distance
+
+
+async def search_vendors_nearby(session: AsyncSession, filters: VendorSearchFilters) -> VendorSearchPage:
+    """
+    Active vendors offering `filters.service_type` within `filters.radius_km` of the given point, nearest first.
+    The bounding box is resolved on the address index, so only the vendors inside it get their distance computed;
+    pages are chained with a (distance, vendor_id) keyset cursor. The service type's id comes from the
+    service type cache, sparing a join.
+    """
+    service_type = (await get_service_types(session)).by_name(filters.service_type)
+    if service_type is None:
+        return VendorSearchPage(items=[], next_cursor=None)
+    distance = _distance_km(filters.latitude, filters.longitude).label("distance_km")
+    query = (
+        select(
+            Vendor.vendor_id,
+            Vendor.vendor_name,
+            Address.city,
+            Address.street,
+            Address.latitude,
+            Address.longitude,
+            distance,
+        )
+        .join(Address, Address.address_id == Vendor.address_id)
+        .join(VendorOfferedServiceTypes, VendorOfferedServiceTypes.vendor_id == Vendor.vendor_id)
+        .where(
+            Vendor.is_active,
+            VendorOfferedServiceTypes.service_type_id == service_type.service_type_id,
+            _bounding_box(filters.latitude, filters.longitude, filters.radius_km),
+            distance <= filters.radius_km,
+        )
+    )
+    if filters.cursor is not None:
+        cursor_distance, cursor_id = decode_distance_cursor(filters.cursor)
+        query = query.where(tuple_(distance, Vendor.vendor_id) > tuple_(literal(cursor_distance), literal(cursor_id)))
+    query = query.order_by(distance, Vendor.vendor_id).limit(filters.limit + 1)
+
+    rows = (await session.execute(query)).all()
+    next_cursor = None
+    if len(rows) > filters.limit:
+        rows = rows[: filters.limit]
+        next_cursor = encode_distance_cursor(rows[-1].distance_km, rows[-1].vendor_id)
+    items = [
+        VendorSearchResult(
+            vendor_id=row.vendor_id,
+            vendor_name=row.vendor_name,
+            distance_km=row.distance_km,
+            city=row.city,
+            street=row.street,
+            latitude=row.latitude,
+            longitude=row.longitude,
+        )
+        for row in rows
+    ]
+    return VendorSearchPage(items=items, next_cursor=next_cursor)
@@ -0,0 +1,189 @@
+import uuid
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import Boolean, exists, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.functions import FunctionElement
+
+from visit_manager.app.models.user_models import BulkVisitFailure, BulkVisitResult, VisitCreateEvent
+from visit_manager.postgres_utils.models.calendar import invalidate_vendor_calendars
+from visit_manager.postgres_utils.models.misc import BOOKED_VISIT_STATUSES
+from visit_manager.postgres_utils.models.models import (
+    Client,
+    ServiceType,
+    User,
+    Vendor,
+    VendorOfferedServiceTypes,
+    Visit,
+    VisitStatus,
+)
+from visit_manager.postgres_utils.timestamps import make_naive
+
+# keeps a single INSERT well below Postgres' limit of 32767 bind parameters
+INSERT_CHUNK_SIZE = 1000
+
+
+class time_overlaps(FunctionElement[bool]):
+    """
+    `time_overlaps(start, end, other_start, other_end)`: the half-open ranges [start, end) and
+    [other_start, other_end) overlap. On Postgres it is the same `tsrange && tsrange` expression
+    as in the visit's exclusion constraint, so the constraint's GiST index answers it.
+    """
+
+    type = Boolean()
+    name = "time_overlaps"
+    inherit_cache = True
+
+
+@compiles(time_overlaps, "postgresql")
+def _time_overlaps_postgresql(element: time_overlaps, compiler: SQLCompiler, **kw: Any) -> str:
+    start, end, other_start, other_end = (compiler.process(c, **kw) for c in element.clauses)
+    return f"tsrange({start}, {end}) && tsrange({other_start}, {other_end})"
+
+
+@compiles(time_overlaps)
+def _time_overlaps_default(element: time_overlaps, compiler: SQLCompiler, **kw: Any) -> str:
+    start, end, other_start, other_end = (compiler.process(c, **kw) for c in element.clauses)
+    return f"({start} < {other_end} AND {end} > {other_start})"
+
+
+async def is_slot_free(session: AsyncSession, vendor_id: uuid.UUID, start_time: datetime, end_time: datetime) -> bool:
+    """Whether the vendor has no booked visit overlapping [start_time, end_time), a single index probe."""
+    result = await session.execute(
+        select(
+            ~exists().where(
+                Visit.vendor_id == vendor_id,
+                Visit.status.in_(BOOKED_VISIT_STATUSES),
+                time_overlaps(Visit.start_timestamp, Visit.end_timestamp, make_naive(start_time), make_naive(end_time)),
+            )
+        )
+    )
+    return bool(result.scalar_one())
+
+
+async def _get_vendors_by_email(
+    session: AsyncSession, emails: set[str]
+) -> dict[str, tuple[uuid.UUID, dict[str, uuid.UUID]]]:
+    """vendor email -> (vendor_id, {offered service type name: service_type_id}), in one query"""
+    result = await session.execute(
+        select(User.email, Vendor.vendor_id, ServiceType.name, ServiceType.service_type_id)
+        .join(Vendor, Vendor.vendor_id == User.user_id)
+        .outerjoin(VendorOfferedServiceTypes, VendorOfferedServiceTypes.vendor_id == Vendor.vendor_id)
+        .outerjoin(ServiceType, ServiceType.service_type_id == VendorOfferedServiceTypes.service_type_id)
+        .where(User.email.in_(emails), Vendor.is_active)
+        .order_by(User.email, ServiceType.name)
+    )
+    vendors: dict[str, tuple[uuid.UUID, dict[str, uuid.UUID]]] = {}
+    for email, vendor_id, service_type_name, service_type_id in result:
+        _, service_types = vendors.setdefault(email, (vendor_id, {}))
+        if service_type_name is not None:
+            service_types[service_type_name] = service_type_id
+    return vendors
+
+
+async def _get_clients_by_email(session: AsyncSession, emails: set[str]) -> dict[str, tuple[uuid.UUID, uuid.UUID]]:
+    """client email -> (client_id, address_id), in one query"""
+    result = await session.execute(
+        select(User.email, Client.client_id, Client.address_id)
+        .join(Client, Client.client_id == User.user_id)
+        .where(User.email.in_(emails), Client.is_active)
+    )
+    return {email: (client_id, address_id) for email, client_id, address_id in result}
+
+
+def _to_row(
+    event: VisitCreateEvent,
+    vendors: dict[str, tuple[uuid.UUID, dict[str, uuid.UUID]]],
+    clients: dict[str, tuple[uuid.UUID, uuid.UUID]],
+) -> dict[str, Any] | str:
+    """Visit row for the event, or the reason why it cannot be inserted."""
+    # EmailType stores addresses lowercased
+    vendor_email, client_email = event.vendor_email.lower(), event.client_email.lower()
+    if vendor_email not in vendors:
+        return "Vendor not found"
+    if client_email not in clients:
+        return "Client not found"
+    # stored as naive wall-clock values, checked as such whatever offsets the event gave
+    start_timestamp, end_timestamp = make_naive(event.start_time), make_naive(event.end_time)
+    if end_timestamp <= start_timestamp:
+        return "Visit must end after it starts"
+
+    vendor_id, offered = vendors[vendor_email]
+    if event.service_type is not None:
+        service_type_id = offered.get(event.service_type.value)
+    else:
+        service_type_id = next(iter(offered.values()), None)
+    if service_type_id is None:
+        return "Service type not offered by the vendor"
+
+    client_id, address_id = clients[client_email]
+    return {
+        "idempotency_key": event.idempotency_key,
+        "vendor_id": vendor_id,
+        "client_id": client_id,
+        "address_id": address_id,
+        "service_type_id": service_type_id,
+        "start_timestamp": start_timestamp,
+        "end_timestamp": end_timestamp,
+        "description": event.description,
+        "status": VisitStatus.confirmed,
+    }
+
+
+async def bulk_ingest_visits(session: AsyncSession, events: list[VisitCreateEvent]) -> BulkVisitResult:
+    """
+    Insert a batch of visits booked by the visit scheduler.
+
+    Vendors and clients are resolved with one query each and the visits are written with multi-row
+    `INSERT ... ON CONFLICT DO NOTHING`, so the cost does not grow with per-visit round trips.
+    The conflict target is left out so that both the idempotency key and the no-overlap exclusion constraint
+    skip rows instead of failing the batch: skipped keys already stored are duplicates (redeliveries),
+    the others collided with a booked visit and are reported in `failures` like every other rejected event.
+    """
+    report = BulkVisitResult()
+    unique_events: dict[str, VisitCreateEvent] = {}
+    for event in events:
+        if event.idempotency_key in unique_events:
+            report.duplicates.append(event.idempotency_key)
+        else:
+            unique_events[event.idempotency_key] = event
+    if not unique_events:
+        return report
+
+    vendors = await _get_vendors_by_email(session, {e.vendor_email.lower() for e in unique_events.values()})
+    clients = await _get_clients_by_email(session, {e.client_email.lower() for e in unique_events.values()})
+
+    rows: list[dict[str, Any]] = []
+    for key, event in unique_events.items():
+        row = _to_row(event, vendors, clients)
+        if isinstance(row, str):
+            report.failures.append(BulkVisitFailure(idempotency_key=key, reason=row))
+        else:
+            rows.append(row)
+
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        chunk = rows[start : start + INSERT_CHUNK_SIZE]
+        statement = insert(Visit).values(chunk).on_conflict_do_nothing().returning(Visit.idempotency_key)
+        inserted = set((await session.execute(statement)).scalars())
+        skipped = [row["idempotency_key"] for row in chunk if row["idempotency_key"] not in inserted]
+        report.inserted.extend(row["idempotency_key"] for row in chunk if row["idempotency_key"] in inserted)
+        invalidate_vendor_calendars(session, {row["vendor_id"] for row in chunk if row["idempotency_key"] in inserted})
+        if not skipped:
+            continue
+
+        stored = set(
+            (await session.execute(select(Visit.idempotency_key).where(Visit.idempotency_key.in_(skipped)))).scalars()
+        )
+        for key in skipped:
+            if key in stored:
+                report.duplicates.append(key)
+            else:
+                report.failures.append(
+                    BulkVisitFailure(idempotency_key=key, reason="Vendor is already booked at that time")
+                )
+
+    return report
@@ -0,0 +1,55 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException
+
+
+def _encode(values: list[Any]) -> str:
+    raw = json.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str) -> Any:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    return json.loads(raw)
+
+
+def encode_cursor(timestamp: datetime, row_id: uuid.UUID) -> str:
+    """
+    Encode the sort key of the last row of a page as an opaque keyset cursor.
+    """
+    return _encode([timestamp.isoformat(), str(row_id)])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """
+    Decode a cursor produced by `encode_cursor`.
+    Raises 400 if the cursor is malformed.
+    """
+    try:
+        timestamp, row_id = _decode(cursor)
+        return datetime.fromisoformat(timestamp), uuid.UUID(row_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+
+def encode_distance_cursor(distance: float, row_id: uuid.UUID) -> str:
+    """
+    Like `encode_cursor`, for pages sorted by distance.
+    """
+    return _encode([distance, str(row_id)])
+
+
+def decode_distance_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    """
+    Decode a cursor produced by `encode_distance_cursor`.
+    Raises 400 if the cursor is malformed.
+    """
+    try:
+        distance, row_id = _decode(cursor)
+        return float(distance), uuid.UUID(row_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
@@ -0,0 +1,84 @@
+import contextlib
+import contextvars
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# bind parameters as rendered by the drivers: ?, %s, %(name)s, $1
+_PARAMETER = r"(?:\?|%s|%\(\w+\)s|\$\d+)"
+_PARAMETER_LIST = re.compile(rf"\(\s*{_PARAMETER}(?:\s*,\s*{_PARAMETER})*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    The statement with its IN lists collapsed, so the same query run for 1 or 50 ids has one shape.
+    Parameters are never part of the text, the statement of a query repeated in a loop is identical.
+    """
+    return _PARAMETER_LIST.sub("(?)", _WHITESPACE.sub(" ", statement.strip()))
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Statements executed while counting, see `count_queries`."""
+
+    statements: int = 0
+    duration_s: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Shapes executed at least `threshold` times, most likely one query per item of a loop (N+1)."""
+        return {shape: count for shape, count in self.shapes.most_common() if count >= threshold}
+
+
+_current_stats: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_counter_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    stats = _current_stats.get()
+    starts = conn.info.get("query_counter_start")
+    if stats is None or not starts:
+        return
+    stats.statements += 1
+    stats.duration_s += time.perf_counter() - starts.pop()
+    stats.shapes[statement_shape(statement)] += 1
+
+
+def _handle_error(context: Any) -> None:
+    connection = context.connection
+    if connection is not None and connection.info.get("query_counter_start"):
+        connection.info["query_counter_start"].pop()
+
+
+def instrument_query_counter(engine: AsyncEngine) -> None:
+    """Count the statements `engine` executes inside `count_queries`, outside of it the hooks do nothing."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+@contextlib.contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """
+    Collect the statements executed in this context, including the tasks it starts, on the engines passed to
+    `instrument_query_counter`.
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
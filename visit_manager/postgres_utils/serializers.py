@@ -0,0 +1,92 @@
+from typing import Any, Callable, Generic, Iterable, TypeVar
+
+import orjson
+from sqlalchemy import inspect
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy_utils import PhoneNumberType
+
+from visit_manager.app.models.user_models import BookedVisit
+from visit_manager.postgres_utils.models.common import Base
+from visit_manager.postgres_utils.models.models import Address, Client, ServiceType, User, Vendor, Visit
+
+M = TypeVar("M", bound=Base)
+
+
+class ModelSerializer(Generic[M]):
+    """
+    Serializer of one model, the columns to emit and their conversions are resolved once, when it is created.
+
+    Only the instance's already loaded state (`__dict__`) is read, so serializing never triggers a lazy load:
+    instances must have every emitted column and nested relationship loaded, an expired or unloaded one raises
+    InvalidRequestError instead of being left out of the output. Values orjson encodes natively
+    (uuid, datetime, enums) are passed through untouched.
+    """
+
+    def __init__(
+        self,
+        model: type[M],
+        include: Iterable[str] | None = None,
+        exclude: Iterable[str] = (),
+        nested: dict[str, tuple[str, "ModelSerializer[Any]"]] | None = None,
+    ):
+        """
+        :param include: columns to emit, all of them if None
+        :param exclude: columns not to emit
+        :param nested: output key -> (relationship name, serializer of the related model)
+        """
+        columns = inspect(model).column_attrs
+        keys = [column.key for column in columns] if include is None else list(include)
+        converters: dict[str, Callable[[Any], Any]] = {
+            column.key: str for column in columns if isinstance(column.columns[0].type, PhoneNumberType)
+        }
+
+        self.model = model
+        self._plain = tuple(key for key in keys if key not in exclude and key not in converters)
+        self._converted = tuple((key, converters[key]) for key in keys if key not in exclude and key in converters)
+        self._nested = tuple(
+            (output_key, name, serializer) for output_key, (name, serializer) in (nested or {}).items()
+        )
+
+    def to_dict(self, instance: M) -> dict[str, Any]:
+        state = instance.__dict__
+        try:
+            result = {key: state[key] for key in self._plain}
+            for key, convert in self._converted:
+                value = state[key]
+                result[key] = None if value is None else convert(value)
+            for output_key, name, serializer in self._nested:
+                related = state[name]
+                if related is None:
+                    result[output_key] = None
+                elif isinstance(related, list):
+                    result[output_key] = [serializer.to_dict(item) for item in related]
+                else:
+                    result[output_key] = serializer.to_dict(related)
+        except KeyError as e:
+            raise InvalidRequestError(
+                f"{type(instance).__name__}.{e.args[0]} is not loaded, load it before serializing the instance"
+            ) from None
+        return result
+
+    def dumps(self, instance: M) -> bytes:
+        return orjson.dumps(self.to_dict(instance))
+
+    def dumps_many(self, instances: Iterable[M]) -> bytes:
+        return orjson.dumps([self.to_dict(instance) for instance in instances])
+
+
+ADDRESS_SERIALIZER = ModelSerializer(Address, exclude=["address_id"])
+VENDOR_SERIALIZER = ModelSerializer(
+    Vendor,
+    exclude=["registration_fee_payment_id"],
+    nested={
+        "user": ("user", ModelSerializer(User, include=["email", "first_name", "last_name"])),
+        "address": ("address", ADDRESS_SERIALIZER),
+        "service_types": ("offered_service_types", ModelSerializer(ServiceType, include=["name", "description"])),
+    },
+)
+CLIENT_SERIALIZER = ModelSerializer(
+    Client, exclude=["registration_fee_payment_id"], nested={"address": ("address", ADDRESS_SERIALIZER)}
+)
+# the columns of the booking response, the others of a visit just booked are not loaded
+VISIT_SERIALIZER = ModelSerializer(Visit, include=BookedVisit.model_fields)
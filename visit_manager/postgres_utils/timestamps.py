@@ -0,0 +1,8 @@
+from datetime import datetime
+
+
+def make_naive(dt: datetime) -> datetime:
+    """`dt` without its offset: timestamps are stored as naive wall-clock values."""
+    if dt.tzinfo is not None:
+        return dt.replace(tzinfo=None)
+    return dt
@@ -1,23 +1,41 @@
 import functools
-from typing import Any, AsyncGenerator
+import time
+from typing import TYPE_CHECKING, Any, AsyncGenerator, cast
 
-from kubernetes import client, config
-from kubernetes.config.config_exception import ConfigException
-from sqlalchemy import URL, text
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from sqlalchemy import URL, event, text
 from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
 from visit_manager.app.models.user_models import ServiceTypeEnum
-from visit_manager.package_utils.logger_conf import logger
-from visit_manager.package_utils.settings import PostgresSettings
-from visit_manager.postgres_utils.models import Base
+from visit_manager.package_utils.metrics import (
+    DB_POOL_CHECKED_OUT_CONNECTIONS,
+    DB_POOL_CHECKOUT_SECONDS,
+    DB_POOL_IDLE_CONNECTIONS,
+    DB_STATEMENT_DURATION_SECONDS,
+)
+from visit_manager.package_utils.settings import PostgresSettings, VisitManagerSettings
+from visit_manager.package_utils.tracing import tracer
+from visit_manager.postgres_utils.query_counter import instrument_query_counter
 
+if TYPE_CHECKING:
+    from kubernetes import client
 
-def get_k8s_es_credits(v1: client.CoreV1Api) -> tuple[str, str, str, int]:
+
+def get_k8s_es_credits(v1: "client.CoreV1Api") -> tuple[str, str, str, int]:
     print("K8s...")
     return "", "", "", 5432
 
 
+@functools.lru_cache(maxsize=1)
 def get_creds() -> tuple[str, str, str, int]:
+    """
+    Database credentials, from the cluster when a kube config is found, otherwise from PostgresSettings.
+    Resolved once per process: loading the kube config reads files and the kubernetes client is a heavy import.
+    """
+    from kubernetes import client, config
+    from kubernetes.config.config_exception import ConfigException
+
     try:
         config.load_kube_config()  # type: ignore[attr-defined]
     except ConfigException:
@@ -67,40 +85,110 @@ async def create_service_types(conn: AsyncConnection) -> None:
         )
 
 
-async def create_tables() -> None:
-    """Create database tables asynchronously"""
-    db_user, db_password, db_host, db_port = get_creds()
+class _TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool recording how long each checkout waited for a connection."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start)
+
+
+_STATEMENT_KINDS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"})
+
+
+def _statement_kind(statement: str) -> str:
+    # bounded label values, the statement itself would blow up the metric's cardinality
+    kind = statement.lstrip()[:6].upper()
+    if kind.startswith("WITH"):
+        return "WITH"
+    return kind if kind in _STATEMENT_KINDS else "OTHER"
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    kind = _statement_kind(statement)
+    span = tracer.start_span(
+        kind,
+        kind=SpanKind.CLIENT,
+        attributes={"db.system": conn.dialect.name, "db.operation.name": kind, "db.query.text": statement},
+    )
+    conn.info.setdefault("statement_start", []).append((time.perf_counter(), kind, span))
 
-    temp_engine = create_async_engine(get_url("postgres"), echo=True)
 
-    async with temp_engine.connect() as conn:
-        result = await conn.execute(text("SELECT 1 FROM pg_database WHERE datname='visit_manager'"))
-        if not result.scalar_one_or_none():
-            await conn.execute(text("COMMIT"))  # End transaction
-            await conn.execute(text("CREATE DATABASE visit_manager"))
-            logger.info("Database created")
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    start, kind, span = conn.info["statement_start"].pop()
+    DB_STATEMENT_DURATION_SECONDS.labels(kind).observe(time.perf_counter() - start)
+    span.end()
 
-    await temp_engine.dispose()
 
-    tmp_create_engine = create_async_engine(get_url(), echo=True)
+def _handle_error(context: Any) -> None:
+    # a failed statement never reaches after_cursor_execute
+    connection = context.connection
+    if connection is not None and connection.info.get("statement_start"):
+        _, _, span = connection.info["statement_start"].pop()
+        span.record_exception(context.original_exception)
+        span.set_status(Status(StatusCode.ERROR))
+        span.end()
 
-    async with tmp_create_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        await create_service_types(conn)
-        logger.info("Tables created")
-    await tmp_create_engine.dispose()
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Time every statement executed by `engine`, see DB_STATEMENT_DURATION_SECONDS, and trace it as a child
+    of the current span. Statements are traced without their parameters.
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+# engine set by use_engine, under the "engine" key
+_engine_override: dict[str, AsyncEngine] = {}
+
+
+def use_engine(engine: AsyncEngine) -> None:
+    """
+    Make `engine` the process-wide engine instead of the one configured by PostgresSettings,
+    for tools running the app against another database (see benchmarks/load.py). Call it before the first session.
+    """
+    _engine_override["engine"] = engine
+    get_async_engine.cache_clear()
+    get_session_factory.cache_clear()
 
 
 @functools.lru_cache(maxsize=1)
 def get_async_engine() -> AsyncEngine:
-    engine = create_async_engine(get_url(), echo=True)
+    if "engine" in _engine_override:
+        return _engine_override["engine"]
+    settings = PostgresSettings()
+    engine = create_async_engine(
+        get_url(),
+        echo=settings.ECHO,
+        poolclass=_TimedAsyncAdaptedQueuePool,
+        pool_size=settings.POOL_SIZE,
+        max_overflow=settings.MAX_OVERFLOW,
+        pool_timeout=settings.POOL_TIMEOUT_S,
+        pool_pre_ping=settings.POOL_PRE_PING,
+        pool_recycle=settings.POOL_RECYCLE_S,
+        connect_args={"server_settings": {"statement_timeout": str(settings.STATEMENT_TIMEOUT_MS)}},
+    )
+    instrument_engine(engine)
+    if VisitManagerSettings().QUERY_COUNTER:
+        instrument_query_counter(engine)
+    pool = cast(_TimedAsyncAdaptedQueuePool, engine.pool)
+    DB_POOL_CHECKED_OUT_CONNECTIONS.set_function(pool.checkedout)
+    DB_POOL_IDLE_CONNECTIONS.set_function(pool.checkedin)
     return engine
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, Any]:
-    engine = get_async_engine()
-    AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+@functools.lru_cache(maxsize=1)
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Process-wide session factory bound to the shared engine."""
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False)
+
 
+async def get_db() -> AsyncGenerator[AsyncSession, Any]:
     """Get a database session"""
-    async with AsyncSessionLocal() as session:
+    async with get_session_factory()() as session:
         yield session
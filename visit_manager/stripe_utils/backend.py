@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Protocol
+
+if TYPE_CHECKING:
+    import stripe
+
+
+@dataclass(frozen=True, slots=True)
+class ChargeResult:
+    charge_id: str
+    status: str
+
+
+@dataclass(frozen=True, slots=True)
+class RefundResult:
+    refund_id: str
+    charge_id: str
+    status: str
+
+
+class PaymentBackend(Protocol):
+    """
+    Calls the payment provider, once per method call: retries, deadlines and the circuit breaker belong to
+    `PaymentGateway`. Errors are raised as the Stripe SDK's exceptions, whatever the backend.
+    """
+
+    async def create_charge(self, amount: int, currency: str, source: str, idempotency_key: str) -> ChargeResult: ...
+
+    async def create_refund(self, charge_id: str, idempotency_key: str) -> RefundResult: ...
+
+    async def close(self) -> None: ...
+
+
+class StripeBackend:
+    """
+    Stripe API through the SDK's httpx based async client, with the SDK's own retries disabled.
+    The SDK takes about a second to import, the client is created on the first request instead of at startup.
+    """
+
+    def __init__(self, api_key: str, timeout_s: float):
+        self._api_key = api_key
+        self._timeout_s = timeout_s
+        self._http_client: "stripe.HTTPXClient | None" = None
+        self._stripe_client: "stripe.StripeClient | None" = None
+
+    @property
+    def _client(self) -> "stripe.StripeClient":
+        if self._stripe_client is None:
+            import stripe
+
+            self._http_client = stripe.HTTPXClient(timeout=self._timeout_s)
+            self._stripe_client = stripe.StripeClient(
+                self._api_key, http_client=self._http_client, max_network_retries=0
+            )
+        return self._stripe_client
+
+    async def create_charge(self, amount: int, currency: str, source: str, idempotency_key: str) -> ChargeResult:
+        charge = await self._client.charges.create_async(
+            params={"amount": amount, "currency": currency, "source": source},
+            options={"idempotency_key": idempotency_key},
+        )
+        return ChargeResult(charge_id=charge.id, status=charge.status)
+
+    async def create_refund(self, charge_id: str, idempotency_key: str) -> RefundResult:
+        refund = await self._client.refunds.create_async(
+            params={"charge": charge_id}, options={"idempotency_key": idempotency_key}
+        )
+        return RefundResult(refund_id=refund.id, charge_id=charge_id, status=refund.status or "pending")
+
+    async def close(self) -> None:
+        if self._http_client is not None:
+            await self._http_client.close_async()
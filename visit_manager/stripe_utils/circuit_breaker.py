@@ -0,0 +1,96 @@
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable
+
+
+class CircuitState(str, Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Failure-ratio circuit breaker over a sliding time window.
+
+    Closed, it lets every call through and records the outcomes of the last `window_s`. Once at least `min_calls`
+    were recorded and `failure_ratio` of them failed, it opens and rejects calls for `open_s`. Then, half-open,
+    it lets a single probe call through: a success closes it again, a failure reopens it.
+
+    Outcomes of calls let through before it opened are ignored once it is open, a probe that never reports back
+    is given up on after another `open_s`. Not thread-safe, it is meant to be used from the event loop only.
+    """
+
+    def __init__(
+        self,
+        failure_ratio: float,
+        min_calls: int,
+        window_s: float,
+        open_s: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window_s = window_s
+        self.open_s = open_s
+        self._clock = clock
+        # (time, failed) of the calls recorded while closed
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._probe_started_at = 0.0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._opened_at is None:
+            return CircuitState.closed
+        if self._clock() - self._opened_at < self.open_s:
+            return CircuitState.open
+        return CircuitState.half_open
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; a half-open breaker allows a single probe at a time."""
+        state = self.state
+        if state is CircuitState.closed:
+            return True
+        if state is CircuitState.half_open:
+            now = self._clock()
+            if not self._probing or now - self._probe_started_at >= self.open_s:
+                self._probing = True
+                self._probe_started_at = now
+                return True
+        return False
+
+    def record_success(self) -> None:
+        if self._probing:
+            self._close()
+        elif self._opened_at is None:
+            self._record(failed=False)
+
+    def record_failure(self) -> None:
+        if self._probing:
+            self._open()
+        elif self._opened_at is None:
+            self._record(failed=True)
+            if len(self._outcomes) >= self.min_calls and self._failures >= self.failure_ratio * len(self._outcomes):
+                self._open()
+
+    def _record(self, failed: bool) -> None:
+        now = self._clock()
+        self._outcomes.append((now, failed))
+        self._failures += failed
+        while self._outcomes[0][0] <= now - self.window_s:
+            _, expired_failed = self._outcomes.popleft()
+            self._failures -= expired_failed
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._probing = False
+
+    def _close(self) -> None:
+        self._opened_at = None
+        self._probing = False
+        self._outcomes.clear()
+        self._failures = 0
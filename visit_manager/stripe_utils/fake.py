@@ -0,0 +1,76 @@
+import asyncio
+import random
+import uuid
+
+import stripe
+
+from visit_manager.stripe_utils.backend import ChargeResult, RefundResult
+
+DECLINED_SOURCE = "tok_chargeDeclined"
+
+
+class FakeStripeBackend:
+    """
+    In-memory stand-in for Stripe, to exercise the gateway and load-test the payment endpoints offline.
+
+    Every request waits `latency_s` and fails with a 503 at `failure_rate` (or for the next `fail_next` calls),
+    like a degraded Stripe would. Idempotency keys are honoured the way Stripe does: a key seen before replays
+    the first successful result. Charges from `DECLINED_SOURCE` are declined.
+    """
+
+    def __init__(self, latency_s: float = 0.0, failure_rate: float = 0.0, seed: int | None = None):
+        self.latency_s = latency_s
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.charges: dict[str, ChargeResult] = {}
+        self.refunds: dict[str, RefundResult] = {}
+        self._responses: dict[str, ChargeResult | RefundResult] = {}
+        self._failures_left = 0
+        self._random = random.Random(seed)
+
+    def fail_next(self, count: int) -> None:
+        """Make the next `count` requests fail as an outage would."""
+        self._failures_left = count
+
+    async def _request(self) -> None:
+        self.requests += 1
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        if self._failures_left:
+            self._failures_left -= 1
+            raise stripe.APIError("Simulated Stripe outage", http_status=503)
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            raise stripe.APIError("Simulated Stripe outage", http_status=503)
+
+    async def create_charge(self, amount: int, currency: str, source: str, idempotency_key: str) -> ChargeResult:
+        await self._request()
+        replayed = self._responses.get(idempotency_key)
+        if isinstance(replayed, ChargeResult):
+            return replayed
+        if source == DECLINED_SOURCE:
+            raise stripe.CardError("Your card was declined.", "source", "card_declined", http_status=402)
+
+        charge = ChargeResult(charge_id=f"ch_{uuid.uuid4().hex[:24]}", status="succeeded")
+        self.charges[charge.charge_id] = charge
+        self._responses[idempotency_key] = charge
+        return charge
+
+    async def create_refund(self, charge_id: str, idempotency_key: str) -> RefundResult:
+        await self._request()
+        replayed = self._responses.get(idempotency_key)
+        if isinstance(replayed, RefundResult):
+            return replayed
+        if charge_id not in self.charges:
+            raise stripe.InvalidRequestError(f"No such charge: '{charge_id}'", "charge", http_status=404)
+        if charge_id in self.refunds:
+            raise stripe.InvalidRequestError(
+                f"Charge {charge_id} has already been refunded.", "charge", http_status=400
+            )
+
+        refund = RefundResult(refund_id=f"re_{uuid.uuid4().hex[:24]}", charge_id=charge_id, status="succeeded")
+        self.refunds[charge_id] = refund
+        self._responses[idempotency_key] = refund
+        return refund
+
+    async def close(self) -> None:
+        pass
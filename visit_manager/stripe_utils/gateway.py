@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from fastapi import HTTPException, Request
+from opentelemetry.trace import SpanKind
+
+from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.metrics import STRIPE_REQUEST_DURATION_SECONDS
+from visit_manager.package_utils.settings import StripeSettings
+from visit_manager.package_utils.tracing import tracer
+from visit_manager.stripe_utils.backend import ChargeResult, PaymentBackend, RefundResult, StripeBackend
+from visit_manager.stripe_utils.circuit_breaker import CircuitBreaker
+
+T = TypeVar("T")
+
+UNAVAILABLE_DETAIL = "Payment provider is unavailable, try again later"
+
+
+class PaymentError(Exception):
+    """Base of the errors raised by `PaymentGateway`, `detail` can be shown to the user."""
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class PaymentRejectedError(PaymentError):
+    """Stripe answered and refused the request: declined card, unknown or already refunded charge..."""
+
+
+class PaymentUnavailableError(PaymentError):
+    """Stripe did not answer in time or the circuit breaker is open, the same request can be retried later."""
+
+
+def _is_transient(error: Exception) -> bool:
+    """Errors worth retrying, which also count as failures for the circuit breaker."""
+    import stripe
+
+    if isinstance(error, (TimeoutError, stripe.APIConnectionError, stripe.RateLimitError)):
+        return True
+    if isinstance(error, stripe.StripeError):
+        return error.http_status is None or error.http_status >= 500
+    return False
+
+
+def charge_idempotency_key(user_id: str, request_key: str) -> str:
+    """
+    Idempotency key of a charge: the client's `Idempotency-Key` header, scoped to the user,
+    so a request retried by the client is not charged twice.
+    """
+    return hashlib.sha256(f"charge:{user_id}:{request_key}".encode()).hexdigest()
+
+
+def refund_idempotency_key(charge_id: str) -> str:
+    """A charge is refunded in full at most once, so its id is the key."""
+    return f"refund:{charge_id}"
+
+
+class PaymentGateway:
+    """
+    Resilient access to the payment provider.
+
+    Every call has a deadline of `timeout_s`, retries included, and each attempt is capped at `attempt_timeout_s`.
+    Transient errors (timeouts, connection errors, rate limiting, 5xx) are retried up to `max_retries` times
+    with full-jitter exponential backoff; the attempts share the idempotency key, so an attempt that timed out
+    after Stripe processed it is answered with the original result instead of being executed twice.
+    The circuit breaker counts transient errors only and, once open, makes calls fail fast.
+    """
+
+    def __init__(
+        self,
+        backend: PaymentBackend,
+        breaker: CircuitBreaker,
+        timeout_s: float = 10.0,
+        attempt_timeout_s: float = 4.0,
+        max_retries: int = 2,
+        retry_backoff_s: float = 0.2,
+        retry_max_backoff_s: float = 2.0,
+    ):
+        self.backend = backend
+        self.breaker = breaker
+        self.timeout_s = timeout_s
+        self.attempt_timeout_s = attempt_timeout_s
+        self.max_retries = max_retries
+        self.retry_backoff_s = retry_backoff_s
+        self.retry_max_backoff_s = retry_max_backoff_s
+
+    async def charge(self, amount: int, currency: str, source: str, idempotency_key: str) -> ChargeResult:
+        return await self._call("charge", lambda: self.backend.create_charge(amount, currency, source, idempotency_key))
+
+    async def refund(self, charge_id: str, idempotency_key: str) -> RefundResult:
+        return await self._call("refund", lambda: self.backend.create_refund(charge_id, idempotency_key))
+
+    async def close(self) -> None:
+        await self.backend.close()
+
+    @staticmethod
+    def _observe(operation: str, outcome: str, start: float) -> None:
+        STRIPE_REQUEST_DURATION_SECONDS.labels(operation, outcome).observe(time.perf_counter() - start)
+
+    async def _call(self, operation: str, request: Callable[[], Awaitable[T]]) -> T:
+        # on the first call rather than with this module, the SDK takes about a second to import
+        import stripe
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_s
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise PaymentUnavailableError(UNAVAILABLE_DETAIL)
+            start = time.perf_counter()
+            try:
+                with tracer.start_as_current_span(
+                    f"stripe {operation}", kind=SpanKind.CLIENT, attributes={"stripe.attempt": attempt + 1}
+                ):
+                    async with asyncio.timeout(min(self.attempt_timeout_s, deadline - loop.time())):
+                        result = await request()
+            except stripe.StripeError as error:
+                if not _is_transient(error):
+                    # Stripe is healthy, it refused this particular request
+                    self._observe(operation, "rejected", start)
+                    self.breaker.record_success()
+                    raise PaymentRejectedError(getattr(error, "user_message", None) or str(error)) from error
+                self._observe(operation, "error", start)
+                last_error: Exception = error
+            except TimeoutError as error:
+                self._observe(operation, "timeout", start)
+                last_error = error
+            else:
+                self._observe(operation, "success", start)
+                self.breaker.record_success()
+                return result
+
+            self.breaker.record_failure()
+            attempt += 1
+            backoff = random.uniform(0, min(self.retry_max_backoff_s, self.retry_backoff_s * 2 ** (attempt - 1)))
+            if attempt > self.max_retries or loop.time() + backoff >= deadline:
+                logger.error(f"Stripe {operation} failed after {attempt} attempt(s): {last_error!r}")
+                raise PaymentUnavailableError(UNAVAILABLE_DETAIL) from last_error
+            logger.warning(f"Stripe {operation} attempt {attempt} failed, retrying in {backoff:.2f}s: {last_error!r}")
+            await asyncio.sleep(backoff)
+
+
+def create_payment_gateway(settings: StripeSettings | None = None) -> PaymentGateway | None:
+    """Gateway of the configured backend, created once in the app's lifespan; None without a Stripe API key."""
+    settings = settings or StripeSettings()
+    backend: PaymentBackend
+    if settings.BACKEND == "fake":
+        from visit_manager.stripe_utils.fake import FakeStripeBackend
+
+        logger.warning("Payments are answered by the fake Stripe backend")
+        backend = FakeStripeBackend(latency_s=settings.FAKE_LATENCY_S, failure_rate=settings.FAKE_FAILURE_RATE)
+    elif settings.API_KEY:
+        backend = StripeBackend(settings.API_KEY, timeout_s=settings.ATTEMPT_TIMEOUT_S)
+    else:
+        logger.warning("STRIPE_API_KEY is not set; payment endpoints will return 500 at runtime")
+        return None
+    return PaymentGateway(
+        backend,
+        CircuitBreaker(
+            failure_ratio=settings.BREAKER_FAILURE_RATIO,
+            min_calls=settings.BREAKER_MIN_CALLS,
+            window_s=settings.BREAKER_WINDOW_S,
+            open_s=settings.BREAKER_OPEN_S,
+        ),
+        timeout_s=settings.TIMEOUT_S,
+        attempt_timeout_s=settings.ATTEMPT_TIMEOUT_S,
+        max_retries=settings.MAX_RETRIES,
+        retry_backoff_s=settings.RETRY_BACKOFF_S,
+        retry_max_backoff_s=settings.RETRY_MAX_BACKOFF_S,
+    )
+
+
+def get_payment_gateway(request: Request) -> PaymentGateway:
+    """Dependency returning the app's shared gateway, override it to use another backend."""
+    gateway: PaymentGateway | None = getattr(request.app.state, "payment_gateway", None)
+    if gateway is None:
+        raise HTTPException(status_code=500, detail="Stripe API key not configured")
+    return gateway
@@ -0,0 +1,143 @@
+import asyncio
+
+import orjson
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from visit_manager.app.models.payment_models import PaymentStatusEvent
+from visit_manager.package_utils.logger_conf import logger
+from visit_manager.package_utils.settings import StripeSettings
+from visit_manager.postgres_utils.models.misc import PaymentStatus
+from visit_manager.postgres_utils.models.transaction import apply_payment_events
+from visit_manager.postgres_utils.utils import get_session_factory
+
+# status a charge has after each of these events, the other events are recorded but change nothing
+CHARGE_EVENT_STATUSES = {
+    "charge.pending": PaymentStatus.pending,
+    "charge.succeeded": PaymentStatus.succeeded,
+    "charge.failed": PaymentStatus.failed,
+    "charge.refunded": PaymentStatus.refunded,
+}
+
+
+def parse_payment_event(payload: bytes, signature: str, secret: str, tolerance_s: int) -> PaymentStatusEvent:
+    """
+    Verify the `Stripe-Signature` header of a webhook request and extract the payment status change.
+    Raises stripe.SignatureVerificationError for a bad signature and ValueError for a malformed payload.
+    """
+    import stripe
+
+    stripe.WebhookSignature.verify_header(payload.decode("utf-8"), signature, secret, tolerance=tolerance_s)
+    event = orjson.loads(payload)
+    try:
+        event_id, event_type, created = event["id"], event["type"], event["created"]
+        data_object = event["data"]["object"]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Malformed Stripe event: {e!r}") from e
+
+    charge_id = data_object.get("id") if data_object.get("object") == "charge" else None
+    status = CHARGE_EVENT_STATUSES.get(event_type) if charge_id is not None else None
+    if status is PaymentStatus.refunded and not data_object.get("refunded"):
+        # partial refund, the charge keeps its status
+        status = None
+    return PaymentStatusEvent(
+        event_id=event_id, event_type=event_type, charge_id=charge_id, status=status, created=created
+    )
+
+
+class PaymentEventBatcher:
+    """
+    Group commit of Stripe webhook events.
+
+    Requests queue their event and wait for the batch containing it: up to `batch_size` events, collected for
+    at most `max_delay_s` after the first one, are applied in a single transaction (see
+    `apply_payment_events`). Stripe is answered only once the event is committed, so a failed batch is simply
+    redelivered by Stripe, and a burst of events costs a few transactions instead of one per event.
+    Past `max_pending` queued events `submit` raises asyncio.QueueFull.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: int,
+        max_delay_s: float,
+        max_pending: int,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.max_delay_s = max_delay_s
+        # None is the stop sentinel
+        self._queue: asyncio.Queue[tuple[PaymentStatusEvent, asyncio.Future[None]] | None] = asyncio.Queue(
+            maxsize=max_pending
+        )
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Apply the events still queued, then stop."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, event: PaymentStatusEvent) -> None:
+        """Queue `event` and wait until it is committed, raises the batch's error if it failed."""
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((event, future))
+        await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_delay_s
+            while len(batch) < self.batch_size:
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._apply(batch)
+
+    async def _apply(self, batch: list[tuple[PaymentStatusEvent, asyncio.Future[None]]]) -> None:
+        try:
+            async with self.session_factory() as session, session.begin():
+                updated = await apply_payment_events(session, [event for event, _ in batch])
+        except Exception as e:
+            logger.error(f"Applying a batch of {len(batch)} Stripe events failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        logger.info(f"Applied {len(batch)} Stripe events, {updated} payments updated")
+        for _, future in batch:
+            # the request may have been cancelled meanwhile
+            if not future.done():
+                future.set_result(None)
+
+
+def create_payment_event_batcher(settings: StripeSettings | None = None) -> PaymentEventBatcher:
+    """Batcher of the webhook endpoint, created and started once in the app's lifespan."""
+    settings = settings or StripeSettings()
+    return PaymentEventBatcher(
+        get_session_factory(),
+        batch_size=settings.WEBHOOK_BATCH_SIZE,
+        max_delay_s=settings.WEBHOOK_MAX_DELAY_S,
+        max_pending=settings.WEBHOOK_MAX_PENDING,
+    )
+
+
+def get_payment_event_batcher(request: Request) -> PaymentEventBatcher:
+    """Dependency returning the app's batcher."""
+    batcher: PaymentEventBatcher = request.app.state.payment_event_batcher
+    return batcher